@@ -15,6 +15,7 @@ from smart_tests.commands.inspect import inspect
 from smart_tests.commands.record import record
 from smart_tests.commands.stats import stats
 from smart_tests.commands.subset import subset
+from smart_tests.commands.subset_multi import multi  # noqa: F401 (registers `subset multi`)
 from smart_tests.commands.update import update
 from smart_tests.commands.verify import verify
 from smart_tests.commands.view import view
@@ -81,16 +81,44 @@ class Command:
         '''
         self.check_consistency()
 
+        invoker = self._parse(_Invoker(self), ArgList(list(_args)))
+
+        r = invoker.invoke()
+        if r is None:
+            r = 0  # if no return value is provided, assume success
+
+        if isinstance(invoker.command, Group):
+            # group invoked without sub-command. we want to deal with this after `invoker.invoke()`
+            # to give the parent command callbacks the opportunity to execute.
+            click.secho("Command is missing", fg='red', err=True)
+            print(invoker.command.format_help())
+            raise Exit(1)
+
+        return r
+
+    def bind(self, parent: Any, *_args: str) -> Callable[[], Any]:
+        '''
+        Given the command line arguments of this sub-command alone, without those of its parent commands, parse them
+        and return a function that invokes the user function with 'parent' in place of the return value of the parent
+        command. This lets a command run other sub-commands of its group in the same process.
+        '''
+        self.check_consistency()
+
         invoker = _Invoker(self)
-        args = ArgList(list(_args))
+        invoker.given_parent = (parent,)
+        return self._parse(invoker, ArgList(list(_args))).invoke
 
+    def _parse(self, invoker: _Invoker, args: ArgList) -> _Invoker:
+        '''
+        Feed the arguments to 'invoker', and return the invoker of the command they end up selecting
+        '''
         while args.has_more():
             a = args.eat(None)
             if a == "--":
                 # everything after this is a positional argument
                 while args.has_more():
                     invoker.eat_arg(args.eat(None))
-            elif a.startswith("-"):
+            elif a.startswith("-") and a != "-":  # a lone '-' is an argument, usually meaning the standard input
                 # Handle built-in help options
                 if a in ["--help", "-h"]:
                     print(invoker.command.format_help())
@@ -106,18 +134,7 @@ class Command:
             else:
                 invoker.eat_arg(a)
 
-        r = invoker.invoke()
-        if r is None:
-            r = 0  # if no return value is provided, assume success
-
-        if isinstance(invoker.command, Group):
-            # group invoked without sub-command. we want to deal with this after `invoker.invoke()`
-            # to give the parent command callbacks the opportunity to execute.
-            click.secho("Command is missing", fg='red', err=True)
-            print(invoker.command.format_help())
-            raise Exit(1)
-
-        return r
+        return invoker
 
     def main(self, args=sys.argv[1:], prog_name=None):
         '''
@@ -591,6 +608,7 @@ class _Invoker:
     '''
     command: Command
     parent: _Invoker | None = None
+    given_parent: tuple[Any, ...] = ()  # return value of the parent command, when it's given instead of invoked. See bind()
     kwargs: dict[str, Any]
 
     nargs = 0  # number of arguments consumed, used to identify the processor of the next argument
@@ -663,7 +681,7 @@ class _Invoker:
         if self.parent is not None:
             return self.command.callback(self.parent.invoke(), **self.kwargs)
         else:
-            return self.command.callback(**self.kwargs)
+            return self.command.callback(*self.given_parent, **self.kwargs)
 
 
 def _maybe(given: str, candidates: Sequence[str]) -> Optional[str]:
@@ -9,6 +9,7 @@ from junitparser import Error, Failure, IntAttr, Skipped, TestCase, TestSuite
 from smart_tests.utils.common_tz import COMMON_TIMEZONES  # type: ignore
 
 from ...testpath import FilePathNormalizer, TestPath
+from ...utils.log_retention import get_log_retention
 
 POSSIBLE_RESULTS = (Failure, Error, Skipped)
 
@@ -86,6 +87,8 @@ class CaseEvent:
     ) -> Dict:
         "Builds a JSON representation of CaseEvent from JUnitPaser objects"
 
+        retention = get_log_retention()
+
         # TODO: reconsider the initial value of the status.
         status = CaseEvent.TEST_PASSED
         for r in case.result:
@@ -110,7 +113,7 @@ class CaseEvent:
                 </testcase>
             """
             if case.system_out is not None:
-                return case.system_out
+                return retention.truncate(case.system_out)
 
             return ""
 
@@ -122,7 +125,7 @@ class CaseEvent:
                 </testcase>
             """
             if case.system_err is not None:
-                return case.system_err
+                return retention.truncate(case.system_err)
 
             """
             case for:
@@ -130,17 +133,17 @@ class CaseEvent:
                 <failure message="...">...</failure>
                 </testcase>
             """
-            stderr = ""
+            stderr = retention.buffer()
             for result in case.result:
                 if type(result) in POSSIBLE_RESULTS:
                     # Since the `message` property is a summary of the `text` property,
                     # we should attempt to retrieve the `text` property first in order to obtain a detailed log.
                     if result.text:
-                        stderr = stderr + result.text
+                        stderr.write(result.text)
                     elif result.message:
-                        stderr = stderr + result.message + "\n"
+                        stderr.write(result.message + "\n")
 
-            return stderr
+            return stderr.getvalue()
 
         return CaseEvent.create(
             test_path=path_canonicalizer(path_builder(case, suite, report_file)),
@@ -173,14 +176,16 @@ class CaseEvent:
         status:    TEST_FAILED or TEST_PASSED
         timestamp: ISO-8601 formatted date
         data:      arbitrary data to be submitted to the server. reserved for future enhancement.
+        stdout/stderr: truncated according to the log retention policy. See set_log_retention()
         """
+        retention = get_log_retention()
         return {
             "type": cls.EVENT_TYPE,
             "testPath": test_path,
             "duration": duration_secs if duration_secs and duration_secs >= 0.0 else 0.0,
             "status": status,
-            "stdout": stdout or "",
-            "stderr": stderr or "",
+            "stdout": retention.truncate(stdout or ""),
+            "stderr": retention.truncate(stderr or ""),
             "createdAt": _timestamp(timestamp),
             "data": data
         }
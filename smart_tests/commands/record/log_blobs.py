@@ -0,0 +1,85 @@
+"""Content-addressed deduplication of stdout/stderr within a `record tests` request.
+
+Some test runners attach the same log to many test cases (e.g. Bazel copies the whole test.log into every test
+case of the target), and parameterized tests tend to repeat the same failure text. Instead of repeating those
+logs, a request carries each of them once in a blob table keyed by its content hash, and the events refer to it:
+
+    {
+        "events": [{..., "stdout": "", "stdoutBlob": "<sha256>"}, ...],
+        "logBlobs": {"<sha256>": "<log>"}
+    }
+"""
+import hashlib
+from typing import Dict, List, Tuple
+
+from .case_event import CaseEventType
+
+LOG_FIELDS = ("stdout", "stderr")
+BLOB_SUFFIX = "Blob"
+
+# logs shorter than this aren't worth the indirection
+MIN_BLOB_SIZE = 256
+
+
+def dedupe_logs(events: List[CaseEventType]) -> Tuple[List[CaseEventType], Dict[str, str]]:
+    """
+    Replace logs that appear more than once among the given events with references to a blob table.
+
+    Returns the rewritten events and the blob table. Events that don't have duplicated logs are returned as is,
+    and the given events are never modified.
+    """
+    # the same log is often the very same str object, so remember hashes by identity to avoid rehashing.
+    # the events (and hence the strings) are alive throughout this function, so ids don't get reused
+    digests: Dict[int, str] = {}
+    counts: Dict[str, int] = {}
+
+    def digest(log: str) -> str:
+        d = digests.get(id(log))
+        if d is None:
+            d = hashlib.sha256(log.encode('utf-8', errors='surrogatepass')).hexdigest()
+            digests[id(log)] = d
+        return d
+
+    for e in events:
+        for f in LOG_FIELDS:
+            log = e.get(f)
+            if log and len(log) >= MIN_BLOB_SIZE:
+                d = digest(log)
+                counts[d] = counts.get(d, 0) + 1
+
+    if not any(c > 1 for c in counts.values()):
+        return events, {}
+
+    blobs: Dict[str, str] = {}
+    result = []
+    for e in events:
+        rewritten = None
+        for f in LOG_FIELDS:
+            log = e.get(f)
+            if not log or len(log) < MIN_BLOB_SIZE:
+                continue
+            d = digest(log)
+            if counts[d] < 2:
+                continue
+            if rewritten is None:
+                rewritten = dict(e)
+            blobs[d] = log
+            rewritten[f] = ""
+            rewritten[f + BLOB_SUFFIX] = d
+        result.append(rewritten if rewritten is not None else e)
+
+    return result, blobs
+
+
+def restore_logs(events: List[CaseEventType], blobs: Dict[str, str]) -> List[CaseEventType]:
+    """The inverse of dedupe_logs(). This is what the server does upon receiving the request"""
+    result = []
+    for e in events:
+        if any(f + BLOB_SUFFIX in e for f in LOG_FIELDS):
+            e = dict(e)
+            for f in LOG_FIELDS:
+                d = e.pop(f + BLOB_SUFFIX, None)
+                if d is not None:
+                    e[f] = blobs[d]
+        result.append(e)
+    return result
@@ -1,17 +1,17 @@
 import datetime
-import glob
+import hashlib
 import os
 import re
+import stat
 import xml.etree.ElementTree as ET
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from time import time_ns
-from typing import Annotated, Callable, Dict, Generator, List, Tuple, Union
+from typing import Annotated, Callable, Dict, Generator, Iterable, Iterator, List, Set, Tuple, Union
 
 import click
 from dateutil.parser import ParserError, parse
 from junitparser import JUnitXml, TestCase, TestSuite  # type: ignore  # noqa: F401
-from more_itertools import ichunked
 from tabulate import tabulate
 
 import smart_tests.args4p.converters as converters
@@ -25,14 +25,24 @@ from ...app import Application
 from ...args4p.command import Group
 from ...args4p.exceptions import BadCmdLineException
 from ...testpath import FilePathNormalizer, TestPathComponent, unparse_test_path
+from ...utils import file_scanner
+from ...utils.chunker import FLUSH, AdaptiveChunker
 from ...utils.commands import Command
 from ...utils.exceptions import InvalidJUnitXMLException, print_error_and_die
 from ...utils.fail_fast_mode import (FailFastModeValidateParams, fail_fast_mode_validate,
                                      set_fail_fast_mode, warn_and_exit_if_fail_fast_mode)
+from ...utils.log_retention import DEFAULT_HEAD_SIZE, DEFAULT_TAIL_SIZE, LogRetention, set_log_retention
 from ...utils.logger import Logger
 from ...utils.smart_tests_client import SmartTestsClient
+from . import log_blobs
 from .case_event import CaseEvent, CaseEventGenerator, CaseEventType, DataBuilder, TestPathBuilder
 
+# keeps each `events` request small enough to finish well within the read timeout
+DEFAULT_POST_CHUNK_BYTES = 4 * 1024 * 1024
+
+# report file name that stands for the standard input
+STDIN = "-"
+
 GROUP_NAME_RULE = re.compile("^[a-zA-Z0-9][a-zA-Z0-9_-]*$")
 RESERVED_GROUP_NAMES = ["group", "groups", "nogroup", "nogroups"]
 
@@ -135,6 +145,31 @@ class RecordTests:
                 "--post-chunk",
                 help="Post chunk"
             )] = 1000,
+            post_chunk_bytes: Annotated[int, typer.Option(
+                "--post-chunk-bytes",
+                help="Approximate upper bound of the compressed size of each request in bytes. "
+                     "Test results are split into more requests when they have large stdout/stderr. 0 for no limit",
+                hidden=True
+            )] = DEFAULT_POST_CHUNK_BYTES,
+            log_head_size: Annotated[int, typer.Option(
+                "--log-head-size",
+                help="Keep at most this many KB from the beginning of stdout/stderr of each test case",
+                metavar="KB"
+            )] = DEFAULT_HEAD_SIZE // 1024,
+            log_tail_size: Annotated[int, typer.Option(
+                "--log-tail-size",
+                help="Keep at most this many KB from the end of stdout/stderr of each test case",
+                metavar="KB"
+            )] = DEFAULT_TAIL_SIZE // 1024,
+            no_log_limit: Annotated[bool, typer.Option(
+                "--no-log-limit",
+                help="Record stdout/stderr of each test case in full, ignoring --log-head-size and --log-tail-size"
+            )] = False,
+            dedupe_logs: Annotated[bool, typer.Option(
+                "--dedupe-logs",
+                help="Send stdout/stderr shared by multiple test cases only once per request",
+                hidden=True
+            )] = False,
             no_base_path_inference: Annotated[bool, typer.Option(
                 "--no-base-path-inference",
                 help="Do not guess the base path to relativize the test file paths. By default, if the test file paths are "
@@ -178,6 +213,14 @@ class RecordTests:
         ))
 
         self.post_chunk = post_chunk
+        self.post_chunk_bytes = post_chunk_bytes
+        self.dedupe_logs = dedupe_logs
+        if no_log_limit:
+            set_log_retention(LogRetention.unlimited())
+        else:
+            if log_head_size < 0 or log_tail_size < 0:
+                raise BadCmdLineException("--log-head-size and --log-tail-size must not be negative")
+            set_log_retention(LogRetention(head=log_head_size * 1024, tail=log_tail_size * 1024))
         self.report_paths = report_paths
 
         # Validate group if provided and ensure it's never None
@@ -215,6 +258,10 @@ class RecordTests:
 
         self.reports: List[str] = []
         self.skipped_reports: List[str] = []
+        # reports that are produced while this command is running. See follow()
+        self._followed_reports: List[Iterable[str]] = []
+        # stat() results obtained while scanning directories, so that report() doesn't need to stat again
+        self._scanned_stats: Dict[str, os.stat_result] = {}
         self.path_builder = CaseEvent.default_path_builder(self.file_path_normalizer)
         self.junitxml_parse_func = None
         self.check_timestamp = True
@@ -234,8 +281,17 @@ class RecordTests:
         return {"type": "file", "name": filepath}
 
     def report(self, junit_report_file: str):
-        ctime = datetime.datetime.fromtimestamp(
-            os.path.getctime(junit_report_file))
+        """
+        Add a report file to be recorded. '-' stands for the standard input, which can only be used with
+        a parse_func that knows how to read it.
+        """
+        if junit_report_file == STDIN:
+            # there's no timestamp to check
+            self.reports.append(junit_report_file)
+            return
+
+        st = self._scanned_stats.pop(junit_report_file, None) or os.stat(junit_report_file)
+        ctime = datetime.datetime.fromtimestamp(st.st_ctime)
 
         if (
                 not self.is_allow_test_before_build  # nlqa: W503
@@ -258,8 +314,19 @@ class RecordTests:
 
         scan('build/test-reports', '**/*.xml')
         """
-        for t in glob.iglob(os.path.join(base, pattern), recursive=True):
-            self.report(t)
+        for f in file_scanner.scan(base, pattern, with_stat=True):
+            if f.stat is not None:
+                self._scanned_stats[f.path] = f.stat
+            self.report(f.path)
+
+    def follow(self, reports: Iterable[str]):
+        """
+        Add report files that keep appearing while tests are still running, e.g. as announced by a build event stream.
+
+        Unlike report(), 'reports' is consumed lazily by run(), and each report is sent as soon as it appears,
+        instead of waiting for the entire test run to finish. A report that's announced again is only sent once.
+        """
+        self._followed_reports.append(reports)
 
     def upload_raw_file(self, file_path: str) -> bool:
 
@@ -300,31 +367,96 @@ class RecordTests:
             self.logger.warning(f"Error uploading raw test result file {file_path}: {str(e)}")
             return False
 
+    def deduplicate_reports(self):
+        """
+        Drop report files whose contents are identical to another report file.
+
+        Some tools write the same report into multiple directories (for example TestNG writes both
+        surefire-reports/TEST-*.xml and surefire-reports/junitreports/TEST-*.xml), and CI steps often copy
+        reports around. Recording those more than once double-counts tests and their durations.
+
+        Files are grouped by size first, so only files that share a size with another file get hashed.
+        """
+        by_size: Dict[int, List[str]] = {}
+        for r in self.reports:
+            if r == STDIN:
+                continue
+            try:
+                st = os.stat(r)
+            except OSError:
+                # let the parser report the problem
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                # e.g. named pipes, which can be read only once
+                continue
+            by_size.setdefault(st.st_size, []).append(r)
+
+        duplicates = set()
+        for same_size in by_size.values():
+            if len(same_size) < 2:
+                continue
+            seen: Dict[bytes, str] = {}
+            for r in same_size:
+                try:
+                    with open(r, 'rb') as f:
+                        digest = hashlib.file_digest(f, 'blake2b').digest()
+                except OSError:
+                    continue
+                if digest in seen:
+                    self.logger.warning(f"skip: {r} has the same contents as {seen[digest]}")
+                    duplicates.add(r)
+                else:
+                    seen[digest] = r
+
+        if duplicates:
+            self.reports = [r for r in self.reports if r not in duplicates]
+
     def upload_raw_files(self) -> None:
 
         if self.reports and not self.dry_run:
             self.logger.debug(f"Uploading {len(self.reports)} raw test result file(s)")
             for report_file in self.reports:
-                self.upload_raw_file(report_file)
+                if _is_regular_file(report_file):
+                    self.upload_raw_file(report_file)
 
     def run(self):
+        self.deduplicate_reports()
+
         # Upload raw test result files before parsing
         self.upload_raw_files()
 
         count = 0  # count number of test cases sent
+        # summary of the test cases sent
+        success_count = 0
+        fail_count = 0
+        duration = float(0)  # sec
         is_observation = False
 
-        def testcases(reports: List[str]) -> Generator[CaseEventType, None, None]:
+        def testcases(reports: Iterable[str]) -> Generator[CaseEventType, None, None]:
             exceptions = []
+            # (test path, createdAt) -> the report file it was first seen in. The same test execution showing up
+            # in another report file means the result was reported twice, e.g. by overlapping reporters
+            seen: Dict[Tuple[str, str], str] = {}
             for report in reports:
                 try:
                     for tc in self.parse_func(report):
+                        if tc is FLUSH:
+                            # for the chunker
+                            yield tc
+                            continue
+
                         # trim empty test path
                         if len(tc.get('testPath', [])) == 0:
                             continue
 
                         # Timestamp option has been removed
 
+                        key = (unparse_test_path(tc['testPath']), str(tc.get('createdAt')))  # type: ignore
+                        first = seen.setdefault(key, report)
+                        if first != report:
+                            self.logger.debug(f"skip: {key[0]} in {report} was already reported in {first}")
+                            continue
+
                         yield tc
 
                 except Exception as e:
@@ -337,11 +469,11 @@ class RecordTests:
 
         # generator that creates the payload incrementally
         def payload(
-                cases: Generator[TestCase, None, None],
+                cases: Generator[CaseEventType, None, None],
                 test_runner, group: str,
                 test_suite_name: str,
                 flavors: Dict[str, str]) -> Tuple[Dict[str, Union[str, List, dict, bool]], List[Exception]]:
-            nonlocal count
+            nonlocal count, success_count, fail_count, duration
             cs = []
             exs = []
 
@@ -354,6 +486,14 @@ class RecordTests:
                     exs.append(ex)
 
             count += len(cs)
+            for c in cs:
+                status = c.get("status")
+                if status == 0:
+                    fail_count += 1
+                elif status == 1:
+                    success_count += 1
+                duration += float(c.get("duration") or 0)
+
             return {
                 "events": cs,
                 "testRunner": test_runner,
@@ -366,34 +506,56 @@ class RecordTests:
                 "flavors": flavors,
             }, exs
 
+        chunker = AdaptiveChunker(max_items=self.post_chunk, max_bytes=self.post_chunk_bytes, sizer=_estimate_event_size)
+
         def send(payload: Dict[str, Union[str, List]]) -> None:
+            events = payload["events"]
+            if self.dedupe_logs:
+                deduped, blobs = log_blobs.dedupe_logs(events)  # type: ignore
+                if blobs:
+                    payload = {**payload, "events": deduped, "logBlobs": blobs}  # type: ignore
+
             res = self.client.request(
                 "post", self.session.subpath("events"), payload=payload, compress=True)
             res.raise_for_status()
 
+            # feed the actual compressed size back, so that later chunks are cut closer to the budget. Unless logs were
+            # deduplicated, in which case the body no longer compares with the size estimate of the events
+            body = getattr(getattr(res, "request", None), "body", None)
+            if isinstance(body, bytes) and payload["events"] is events:
+                chunker.observe(events, len(body))  # type: ignore
+
             nonlocal is_observation
             is_observation = res.json().get("testSession", {}).get("isObservation", False)
 
-        def recorded_result() -> Tuple[int, int, int, float]:
-            test_count = 0
-            success_count = 0
-            fail_count = 0
-            duration = float(0)
-
-            for tc in testcases(self.reports):
-                test_count += 1
-                status = tc.get("status")
-                if status == 0:
-                    fail_count += 1
-                elif status == 1:
-                    success_count += 1
-                duration += float(tc.get("duration") or 0)  # sec
-
-            return test_count, success_count, fail_count, duration / 60   # sec to min
+        announced: Set[str] = set()
+
+        def followed_reports() -> Generator[str, None, None]:
+            for followed in self._followed_reports:
+                for report in followed:
+                    # the same report may be announced more than once, e.g. as Bazel announces every attempt of a test
+                    key = os.path.realpath(report)
+                    if key in announced:
+                        continue
+                    announced.add(key)
+
+                    n = len(self.reports)
+                    self.report(report)
+                    if len(self.reports) == n:
+                        continue  # skipped
+                    if not self.dry_run:
+                        self.upload_raw_file(report)
+                    yield report
+
+        def chunks() -> Iterator[Iterator[CaseEventType]]:
+            yield from chunker.chunks(tc)
+            # send each followed report right away rather than waiting for more test cases to fill the chunk
+            for report in followed_reports():
+                yield from chunker.chunks(testcases([report]))
 
         try:
             start = time_ns()
-            tc = testcases(self.reports)
+            tc = testcases(list(self.reports))
             end = time_ns()
             self.tracking_client.send_event(
                 event_name=Tracking.Event.PERFORMANCE,
@@ -405,8 +567,9 @@ class RecordTests:
 
             if self.report_paths:
                 # diagnostics mode to just report test paths
-                for t in tc:
-                    print(unparse_test_path(t['testPath']))
+                for c in chunks():
+                    for t in c:
+                        print(unparse_test_path(t['testPath']))
                 return
 
             MAX_UPLOAD_WORKERS = 3
@@ -416,7 +579,7 @@ class RecordTests:
             with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as executor:
                 futures = []
 
-                for chunk in ichunked(tc, self.post_chunk):
+                for chunk in chunks():
                     p, es = payload(
                         cases=chunk,
                         test_runner=self.app.test_runner,
@@ -464,7 +627,8 @@ class RecordTests:
                 return
 
         file_count = len(self.reports)
-        test_count, success_count, fail_count, duration = recorded_result()
+        test_count = count
+        duration = duration / 60  # sec to min
 
         click.echo(
             f"Smart Tests recorded tests for build "
@@ -536,6 +700,27 @@ def parse_launchable_timeformat(t: str) -> datetime.datetime:
         return INVALID_TIMESTAMP
 
 
+def _estimate_event_size(event: CaseEventType) -> int:
+    """Cheap approximation of the size of the JSON serialization of a case event, good enough for chunking"""
+    size = 200  # keys, status, duration, timestamps and so on
+    for k in ("stdout", "stderr"):
+        size += len(event.get(k) or "")
+    for c in event.get("testPath", []):
+        size += 30 + sum(len(v) for v in c.values())  # type: ignore
+    return size
+
+
+def _is_regular_file(path: str) -> bool:
+    """False for the standard input, named pipes and such, which can be read only once"""
+    if path == STDIN:
+        return False
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        # let the upload report the problem
+        return True
+
+
 def get_env_values(client: SmartTestsClient) -> Dict[str, str]:
     sub_path = "slack/notification/key/list"
     res = client.request("get", sub_path=sub_path)
@@ -3,14 +3,13 @@ import json
 import os
 import pathlib
 import random
-import re
 import subprocess
 import sys
 from enum import Enum
 from io import TextIOWrapper
 from multiprocessing import Process
 from os.path import join
-from typing import Annotated, Any, Callable, Dict, Iterable, List
+from typing import IO, Annotated, Any, Callable, Dict, Iterable, List, Set, TextIO
 
 import click
 from tabulate import tabulate
@@ -26,18 +25,24 @@ from ..app import Application
 from ..args4p.command import Group
 from ..args4p.converters import fileText, floatType, intType
 from ..testpath import FilePathNormalizer, TestPath
+from ..utils import json_stream, test_path_table, tests_mapping
+from ..utils.discovery_cache import DiscoveryCache
 from ..utils.env_keys import REPORT_ERROR_KEY
 from ..utils.fail_fast_mode import (FailFastModeValidateParams, fail_fast_mode_validate,
                                     set_fail_fast_mode, warn_and_exit_if_fail_fast_mode)
+from ..utils.guess_tests import guess_test_files
 from ..utils.input_snapshot import InputSnapshotId
 from ..utils.smart_tests_client import SmartTestsClient
 from ..utils.typer_types import Duration, Fraction, Percentage, parse_duration, parse_fraction, parse_percentage
-from .test_path_writer import TestPathWriter
+from .test_path_writer import DEFAULT_OUTPUT_CHUNKS_DIR, TestPathWriter
 
 LARGE_TEST_PATHS_THRESHOLD = 100000
 DEFAULT_CONNECT_TIMEOUT = 5
 LARGE_PAYLOAD_CONNECT_TIMEOUT = 60
 
+# size of the pieces the subset response is read in
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
 
 class SubsetUseCase(str, Enum):
     ONE_COMMIT = "one-commit"
@@ -66,18 +71,79 @@ class SubsetResult:
         self.summary = summary or {}
         self.is_brainless = is_brainless
         self.is_observation = is_observation
+        # the number of tests in the subset and the rest, including those written out as the response was read and
+        # therefore not kept in the lists above
+        self.subset_count = len(self.subset)
+        self.rest_count = len(self.rest)
+        # keys of the response read so far
+        self.received: Set[str] = set()
 
     @classmethod
     def from_response(cls, response: Dict[str, Any]) -> 'SubsetResult':
+        subset = response.get("testPaths", [])
+        rest = response.get("rest", [])
+        if "testPathTable" in response:
+            table = test_path_table.Table(response["testPathTable"])
+            subset = [table.test_path(p) for p in subset]
+            rest = [table.test_path(p) for p in rest]
         return cls(
-            subset=response.get("testPaths", []),
-            rest=response.get("rest", []),
+            subset=subset,
+            rest=rest,
             subset_id=response.get("subsettingId", ""),
             summary=response.get("summary", {}),
             is_brainless=response.get("isBrainless", False),
             is_observation=response.get("isObservation", False)
         )
 
+    @classmethod
+    def from_stream(cls, f: IO[str], output: '_StreamingOutput | None' = None) -> 'SubsetResult':
+        """
+        Reads the response as it arrives, one test path at a time. Test paths that 'output' writes out right away
+        are only counted.
+
+        Raises json.JSONDecodeError or ValueError if the response is malformed.
+        """
+        result = cls()
+        # for test paths in the compact encoding. See --compact-test-paths
+        table: test_path_table.Table | None = None
+        undecoded = False
+        for path, value in json_stream.items(f, "testPaths.item", "rest.item", "testPathTable", "subsettingId",
+                                             "summary", "isBrainless", "isObservation"):
+            if path == "testPaths.item" or path == "rest.item":
+                key = path.split(".")[0]
+                if key == "testPaths":
+                    result.subset_count += 1
+                else:
+                    result.rest_count += 1
+                if _is_encoded(value):
+                    if table is None:
+                        # the table comes later. Decode it at the end
+                        undecoded = True
+                        (result.subset if key == "testPaths" else result.rest).append(value)
+                        continue
+                    value = table.test_path(value)
+                if output is None or not output.accept(result, key, value):
+                    (result.subset if key == "testPaths" else result.rest).append(value)
+            elif path == "testPathTable":
+                table = test_path_table.Table(value)
+            else:
+                if path == "subsettingId":
+                    result.subset_id = value
+                elif path == "summary":
+                    result.summary = value or {}
+                elif path == "isBrainless":
+                    result.is_brainless = value
+                elif path == "isObservation":
+                    result.is_observation = value
+                result.received.add(path)
+
+        if undecoded:
+            if table is None:
+                raise ValueError("The response has test paths in the compact encoding, but no table for them")
+            result.subset = [table.test_path(t) if _is_encoded(t) else t for t in result.subset]
+            result.rest = [table.test_path(t) if _is_encoded(t) else t for t in result.rest]
+        return result
+
     @classmethod
     def from_test_paths(cls, test_paths: List[TestPath]) -> 'SubsetResult':
         return cls(
@@ -98,6 +164,118 @@ class SubsetResult:
         return cls(subset=sampled, rest=rest, subset_id='', summary={}, is_brainless=False, is_observation=False)
 
 
+def _is_encoded(test_path: Any) -> bool:
+    """Whether a test path of the response is in the compact encoding, i.e. indices rather than components"""
+    return bool(test_path) and not isinstance(test_path[0], dict)
+
+
+class _ResponseReader:
+    """A file-like view of a streamed response, for json_stream to read"""
+
+    def __init__(self, res):
+        # JSON is always UTF-8, whatever the Content-Type says
+        res.encoding = "utf-8"
+        self.chunks = res.iter_content(chunk_size=RESPONSE_CHUNK_SIZE, decode_unicode=True)
+
+    def read(self, size: int = -1) -> str:
+        return next(self.chunks, "")
+
+
+class _StreamingOutput:
+    """
+    Writes out the subset while the response is still being read, rather than after all of it has arrived, so that
+    the first tests show up early and the test paths written out needn't be kept in memory.
+
+    This is only for the plain output: the default output handler, without --output-exclusion-rules,
+    --compact-output, --output-max-bytes or --print-input-snapshot-id. Test paths are only written out once the
+    response has told whether the model is in training and whether the session is under observation, as either
+    changes what to output. If it hasn't by the time the test paths arrive, they are output at the end as usual.
+    """
+    # bytes of output to gather before writing them to stdout
+    FLUSH_SIZE = 64 * 1024
+
+    def __init__(self, writer: 'Subset'):
+        self.writer = writer
+        # the result being read, once test paths of it are written out
+        self.result: SubsetResult | None = None
+        self.rest_file: TextIO | None = None
+        self.rest_written = 0
+        # entries printed to stdout so far, in case the response breaks off halfway. See finish()
+        self.printed: Set[str] = set()
+        self.buf: List[str] = []
+        self.buf_size = 0
+
+    @property
+    def started(self) -> bool:
+        return self.result is not None
+
+    def accept(self, result: SubsetResult, key: str, test_path: TestPath) -> bool:
+        """Writes out a test path of the response if possible. Returns False if it has to be output later instead"""
+        if not {"isBrainless", "isObservation"} <= result.received:
+            return False
+        if result.is_brainless and self.writer.fallback_mode != FallbackMode.RANDOM_SAMPLE:
+            # the subset will be replaced by the fallback
+            return False
+
+        if key == "testPaths":
+            self.result = result
+            self._print(test_path)
+            return True
+
+        # the rest can only follow the subset written out. If it came first, we don't know yet if the subset is empty,
+        # in which case the rest isn't output at all
+        if self.result is not result:
+            return False
+        if result.is_observation:
+            self._print(test_path)
+        elif self.writer.rest:
+            if self.rest_file is None:
+                self.rest_file = open(self.writer.rest, "w+", encoding="utf-8")
+            if self.rest_written:
+                self.rest_file.write(self.writer.separator)
+            self.rest_file.write(self.writer.formatter(test_path))
+            self.rest_written += 1
+        return True
+
+    def finish(self, result: SubsetResult):
+        """
+        Writes out what's left of the result once the response is read. If the response broke off and 'result' is
+        the fallback, tests already printed aren't printed again.
+        """
+        fallback = result is not self.result
+        for t in result.subset:
+            if not (fallback and self.writer.formatter(t) in self.printed):
+                self._print(t)
+        if result.is_observation:
+            for t in result.rest:
+                self._print(t)
+        self._flush()
+        click.echo("")
+
+        if self.rest_file is not None:
+            self.rest_file.close()
+            if not fallback:
+                return
+        if self.writer.rest:
+            # under observation, the rest is a part of the subset
+            self.writer.write_file(self.writer.rest, [] if result.is_observation else result.rest)
+
+    def _print(self, test_path: TestPath):
+        entry = self.writer.formatter(test_path)
+        if self.printed:
+            self.buf.append(self.writer.separator)
+        self.buf.append(entry)
+        self.printed.add(entry)
+        self.buf_size += len(entry)
+        if self.buf_size >= self.FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        click.echo("".join(self.buf), nl=False)
+        self.buf = []
+        self.buf_size = 0
+
+
 # Where we take TestPath, we also accept a path name as a string.
 TestPathLike = str | TestPath
 
@@ -151,6 +329,24 @@ class Subset(TestPathWriter):
                 help="Output the subset remainder to a file, e.g. --rest=remainder.txt",
                 metavar="FILE"
             )] = None,
+            compact_output: Annotated[bool, typer.Option(
+                "--compact-output",
+                help="Output a class, package, or directory in place of its tests when all of them are in the "
+                     "output, for test runners that support it"
+            )] = False,
+            max_output_bytes: Annotated[int | None, typer.Option(
+                "--output-max-bytes",
+                help="When the subset is larger than N bytes, write it to files of at most N bytes each, and "
+                     "print their names instead",
+                type=intType(min=1),
+                metavar="N"
+            )] = None,
+            output_chunks_dir: Annotated[str, typer.Option(
+                "--output-chunks-dir",
+                help="Directory to write the files of --output-max-bytes to. The files this command wrote to it for an "
+                     "earlier subset are removed first",
+                metavar="DIR"
+            )] = DEFAULT_OUTPUT_CHUNKS_DIR,
             # TODO(Konboi): omit from the smart-tests command initial release
             # split: Annotated[bool, typer.Option(
             #        help="split"
@@ -198,6 +394,24 @@ class Subset(TestPathWriter):
                 type=fileText(mode="r"),
                 metavar="FILE"
             )] = None,
+            changed_files_file: Annotated[TextIOWrapper | None, typer.Option(
+                "--changed-files",
+                help="With --prioritized-tests-mapping, only send the parts of the mapping for directories these files "
+                     "are in. One file per line, relative to the root of the repository",
+                type=fileText(mode="r"),
+                metavar="FILE"
+            )] = None,
+            changed_files_base: Annotated[str | None, typer.Option(
+                "--changed-files-base",
+                help="With --prioritized-tests-mapping, only send the parts of the mapping for directories with "
+                     "changes since this commit, as `git diff --name-only COMMIT` lists them",
+                metavar="COMMIT"
+            )] = None,
+            compact_test_paths: Annotated[bool, typer.Option(
+                "--compact-test-paths",
+                help="(Advanced) Send test paths to the server, and have them sent back, in a compact encoding that "
+                     "is smaller and faster to process for a large number of tests. Requires the server to support it"
+            )] = False,
             input_snapshot_id: Annotated[InputSnapshotId | None, InputSnapshotId.as_option()] = None,
             print_input_snapshot_id: Annotated[bool, typer.Option(
                 "--print-input-snapshot-id",
@@ -225,6 +439,19 @@ class Subset(TestPathWriter):
                 "--get-tests-from-guess",
                 help="Get subset list from guessed tests"
             )] = False,
+            guess_pathspecs: Annotated[List[str], typer.Option(
+                "--guess-pathspec",
+                help="With --get-tests-from-guess, only look at files that match this git pathspec. "
+                     "Can be specified multiple times",
+                metavar="PATHSPEC",
+                multiple=True
+            )] = [],
+            discovery_cache_dir: Annotated[str | None, typer.Option(
+                "--discovery-cache",
+                help="Cache the scan of test files in this directory, so that later runs only re-list "
+                     "directories that have changed since",
+                metavar="DIR"
+            )] = None,
             use_case: Annotated[SubsetUseCase | None, typer.Option(
                 "--use-case",
                 hidden=True
@@ -280,6 +507,27 @@ class Subset(TestPathWriter):
                 Tracking.ErrorEvent.USER_ERROR
             )
 
+        if guess_pathspecs and not is_get_tests_from_guess:
+            print_error_and_die(
+                "--guess-pathspec requires --get-tests-from-guess",
+                self.tracking_client,
+                Tracking.ErrorEvent.USER_ERROR
+            )
+
+        if (changed_files_file or changed_files_base) and not prioritized_tests_mapping_file:
+            print_error_and_die(
+                "--changed-files and --changed-files-base require --prioritized-tests-mapping",
+                self.tracking_client,
+                Tracking.ErrorEvent.USER_ERROR
+            )
+
+        if changed_files_file and changed_files_base:
+            print_error_and_die(
+                "--changed-files and --changed-files-base are mutually exclusive",
+                self.tracking_client,
+                Tracking.ErrorEvent.USER_ERROR
+            )
+
         if is_observation and is_output_exclusion_rules:
             warn("--observation and --output-exclusion-rules are set. No output will be generated.")
 
@@ -304,6 +552,9 @@ class Subset(TestPathWriter):
         self.base_path = base_path
         self.base_path_explicitly_set = (base_path is not None)
         self.rest = rest
+        self.compact_output = compact_output
+        self.max_output_bytes = max_output_bytes
+        self.output_chunks_dir = output_chunks_dir
         self.ignore_new_tests = ignore_new_tests
         self.is_get_tests_from_previous_sessions = is_get_tests_from_previous_sessions
         self.is_output_exclusion_rules = is_output_exclusion_rules
@@ -311,23 +562,32 @@ class Subset(TestPathWriter):
         self.ignore_flaky_tests_above = ignore_flaky_tests_above
         self.prioritize_tests_failed_within_hours = prioritize_tests_failed_within_hours
         self.prioritized_tests_mapping_file = prioritized_tests_mapping_file
+        self.changed_files_file = changed_files_file
+        self.changed_files_base = changed_files_base
+        self.compact_test_paths = compact_test_paths
         self.input_snapshot_id = input_snapshot_id.value if input_snapshot_id else None
         self.print_input_snapshot_id = print_input_snapshot_id
         self.subset_id_file = subset_id_file
         self.bin_target = bin_target
         self.same_bin_files = list(same_bin_files)
         self.is_get_tests_from_guess = is_get_tests_from_guess
+        self.guess_pathspecs = list(guess_pathspecs)
         self.use_case = use_case
         self.fallback_mode = fallback_mode
 
         self._validate_print_input_snapshot_option()
 
+        self.no_base_path_inference = no_base_path_inference
         self.file_path_normalizer = FilePathNormalizer(base_path, no_base_path_inference=no_base_path_inference)
+        self.discovery_cache = DiscoveryCache(discovery_cache_dir) if discovery_cache_dir else None
 
         self.test_paths: list[list[dict[str, str]]] = []
         self.output_handler = self._default_output_handler
         self.exclusion_output_handler = self._default_exclusion_output_handler
 
+    def compaction_candidates(self) -> list[TestPath]:
+        return self.test_paths
+
     def _default_output_handler(self, output: list[TestPath], rests: list[TestPath]):
         if self.rest:
             self.write_file(self.rest, rests)
@@ -389,7 +649,8 @@ class Subset(TestPathWriter):
             return x
 
     def scan(self, base: str, pattern: str,
-             path_builder: Callable[[str], TestPathLike | None] | None = None):
+             path_builder: Callable[[str], TestPathLike | None] | None = None,
+             cache_key: str | None = None):
         """
         Starting at the 'base' path, recursively add everything that matches the given GLOB pattern
 
@@ -402,6 +663,10 @@ class Subset(TestPathWriter):
             - if a str is returned, that's interpreted as a path name and
               converted to the default test path representation. Typically, `os.path.join(base,file_name)
             - if a TestPath is returned, that's added as is
+
+        'cache_key' identifies the behavior of 'path_builder', such as options that affect it. Giving one declares
+        that the result of 'path_builder' depends only on the file name and the key, which lets --discovery-cache
+        remember its results. Without it, a custom 'path_builder' is always run on a full scan.
         """
 
         self.input_given = True
@@ -413,10 +678,14 @@ class Subset(TestPathWriter):
                 return pathlib.Path(self.file_path_normalizer.relativize(join(base, file_name))).as_posix()
 
             path_builder = default_path_builder
+            cache_key = json.dumps(["default", base, self.base_path, self.no_base_path_inference])
 
         for b in glob.iglob(base):
-            for t in glob.iglob(join(b, pattern), recursive=True):
-                path = path_builder(os.path.relpath(t, b))
+            if self.discovery_cache is not None and cache_key is not None:
+                paths: Iterable[TestPathLike | None] = self.discovery_cache.scan(b, pattern, path_builder, cache_key)
+            else:
+                paths = (path_builder(os.path.relpath(t, b)) for t in glob.iglob(join(b, pattern), recursive=True))
+            for path in paths:
                 if path:
                     self.test_paths.append(self.to_test_path(path))
 
@@ -468,7 +737,12 @@ class Subset(TestPathWriter):
             payload["hoursToPrioritizeFailedTest"] = self.prioritize_tests_failed_within_hours
 
         if self.prioritized_tests_mapping_file:
-            payload['prioritizedTestsMapping'] = json.load(self.prioritized_tests_mapping_file)
+            payload['prioritizedTestsMapping'] = self._prioritized_tests_mapping(self.prioritized_tests_mapping_file)
+
+        if self.compact_test_paths:
+            # the response uses the same encoding
+            payload["testPathEncoding"] = test_path_table.ENCODING
+            payload["testPathTable"], payload["testPaths"] = test_path_table.encode(self.test_paths)
 
         if self.use_case:
             payload['changesUnderTest'] = self.use_case.value
@@ -482,6 +756,26 @@ class Subset(TestPathWriter):
 
         return payload
 
+    def _prioritized_tests_mapping(self, f: TextIOWrapper) -> dict[str, Any]:
+        changed_files = self._changed_files()
+        if changed_files is None:
+            return json.load(f)
+        cache_dir = self.discovery_cache.cache_dir if self.discovery_cache is not None else None
+        return tests_mapping.prune(f, changed_files, cache_dir=cache_dir)
+
+    def _changed_files(self) -> list[str] | None:
+        """Files changed in the build, as given by --changed-files or --changed-files-base, if any"""
+        if self.changed_files_file:
+            return [line.strip() for line in self.changed_files_file if line.strip()]
+        if self.changed_files_base:
+            try:
+                return tests_mapping.changed_files_since(self.changed_files_base)
+            except (subprocess.CalledProcessError, OSError) as e:
+                warn_and_exit_if_fail_fast_mode(
+                    f"Failed to list the files changed since {self.changed_files_base}: {e}. "
+                    "Sending the whole prioritized tests mapping")
+        return None
+
     def _build_split_subset_payload(self) -> dict[str, Any] | None:
         if self.bin_target is None:
             if self.same_bin_files:
@@ -571,12 +865,12 @@ class Subset(TestPathWriter):
         return same_bins
 
     def _collect_potential_test_files(self):
-        LOOSE_TEST_FILE_PATTERN = r'(\.(test|spec)\.|_test\.|Test\.|Spec\.|test/|tests/|__tests__/|src/test/)'
-        EXCLUDE_PATTERN = r'(BUILD|Makefile|Dockerfile|LICENSE|.gitignore|.gitkeep|.keep|id_rsa|rsa|blank|taglib)|\.(xml|json|jsonl|txt|yml|yaml|toml|md|png|jpg|jpeg|gif|svg|sql|html|css|graphql|proto|gz|zip|rz|bzl|conf|config|snap|pem|crt|key|lock|jpi|hpi|jelly|properties|jar|ini|mod|sum|bmp|env|envrc|sh|csv|list)$'  # noqa E501
-
+        cache_dir = self.discovery_cache.cache_dir if self.discovery_cache is not None else None
+        found = False
         try:
-            git_managed_files = subprocess.run(['git', 'ls-files'], stdout=subprocess.PIPE,
-                                               universal_newlines=True, check=True).stdout.strip().split('\n')
+            for f in guess_test_files(self.guess_pathspecs, cache_dir=cache_dir):
+                self.test_paths.append(self.to_test_path(f))
+                found = True
         except subprocess.CalledProcessError as e:
             warn_and_exit_if_fail_fast_mode(f"git ls-files failed (exit code={e.returncode})")
             return
@@ -584,12 +878,6 @@ class Subset(TestPathWriter):
             warn_and_exit_if_fail_fast_mode(f"git ls-files failed: {e}")
             return
 
-        found = False
-        for f in git_managed_files:
-            if re.search(LOOSE_TEST_FILE_PATTERN, f) and not re.search(EXCLUDE_PATTERN, f):
-                self.test_paths.append(self.to_test_path(f))
-                found = True
-
         if not found:
             warn_and_exit_if_fail_fast_mode("Nothing that looks like a test file in the current git repository.")
 
@@ -609,7 +897,8 @@ class Subset(TestPathWriter):
         else:
             return SubsetResult.from_test_paths(self.test_paths)
 
-    def request_subset(self) -> SubsetResult:
+    def request_subset(self, output: _StreamingOutput | None = None) -> SubsetResult:
+        """Requests the subset. 'output' writes out the subset as the response arrives, see _StreamingOutput"""
         # temporarily extend the timeout because subset API response has become slow
         # TODO: remove this line when API response return response
         # within 300 sec
@@ -629,14 +918,19 @@ class Subset(TestPathWriter):
             sys.exit(0)
 
         try:
-            res = subset_request(client=self.client, timeout=timeout, payload=payload)
-            # The status code 422 is returned when validation error of the test mapping file occurs.
-            if res.status_code == 422:
-                print_error_and_die("Error: {}".format(res.reason), self.tracking_client, Tracking.ErrorEvent.USER_ERROR)
+            # a large subset is read as it arrives, rather than all at once
+            res = subset_request(client=self.client, timeout=timeout, payload=payload, stream=True)
+            try:
+                # The status code 422 is returned when validation error of the test mapping file occurs.
+                if res.status_code == 422:
+                    print_error_and_die("Error: {}".format(res.reason), self.tracking_client,
+                                        Tracking.ErrorEvent.USER_ERROR)
 
-            res.raise_for_status()
+                res.raise_for_status()
 
-            return SubsetResult.from_response(res.json())
+                return SubsetResult.from_stream(_ResponseReader(res), output)  # type: ignore
+            finally:
+                res.close()
         except Exception as e:
             self.tracking_client.send_error_event(
                 event_name=Tracking.ErrorEvent.INTERNAL_CLI_ERROR,
@@ -722,13 +1016,16 @@ class Subset(TestPathWriter):
 
     def run(self):
         """called after tests are scanned to compute the optimized order"""
+        output = _StreamingOutput(self) if self._can_stream_output() else None
+        self._output(self._get_subset_result(output), output)
 
+    def _get_subset_result(self, output: _StreamingOutput | None = None) -> SubsetResult:
         if self.is_get_tests_from_guess:
             self._collect_potential_test_files()
 
         if self._requires_test_input():
             if self.input_given:
-                print_error_and_die("ERROR: Given arguments did not match any tests. They appear to be incorrect/non-existent.", tracking_client, Tracking.ErrorEvent.USER_ERROR)  # noqa E501
+                print_error_and_die("ERROR: Given arguments did not match any tests. They appear to be incorrect/non-existent.", self.tracking_client, Tracking.ErrorEvent.USER_ERROR)  # noqa E501
             else:
                 print_error_and_die(
                     "ERROR: Expecting tests to be given, but none provided. See https://help.launchableinc.com/features/predictive-test-selection/requesting-and-running-a-subset-of-tests/ and provide ones, or use the `--get-tests-from-previous-sessions` option",  # noqa E501
@@ -739,12 +1036,12 @@ class Subset(TestPathWriter):
         if not self.session_id:
             # Session ID in --session is missing. It might be caused by
             # Launchable API errors.
-            subset_result = self._fallback_result()
-        else:
-            subset_result = self.request_subset()
+            return self._fallback_result()
+        return self.request_subset(output)
 
-        if len(subset_result.subset) == 0:
-            if len(subset_result.rest) > 0 and self.client.is_pts_v2_enabled() and self.confidence is not None:
+    def _output(self, subset_result: SubsetResult, output: _StreamingOutput | None = None):
+        if subset_result.subset_count == 0:
+            if subset_result.rest_count > 0 and self.client.is_pts_v2_enabled() and self.confidence is not None:
                 # Adaptive Dynamic Subset can return an empty subset when the model
                 # determines no tests in that suite are relevant to the code change.
                 click.echo(click.style("No tests were selected for this code change.", fg="yellow"), err=True)
@@ -774,6 +1071,12 @@ class Subset(TestPathWriter):
             if self.fallback_mode != FallbackMode.RANDOM_SAMPLE:
                 subset_result = self._fallback_result()
 
+        if output is not None and output.started:
+            # most of the subset has been written out as the response arrived
+            output.finish(subset_result)
+            self._print_summary(subset_result)
+            return
+
         output_subset, output_rests = subset_result.subset, subset_result.rest
 
         if subset_result.is_observation:
@@ -785,10 +1088,15 @@ class Subset(TestPathWriter):
         else:
             self.output_handler(output_subset, output_rests)
 
+        self._print_summary(subset_result)
+
+    def _can_stream_output(self) -> bool:
+        plain = self.output_handler == self._default_output_handler and not self.is_output_exclusion_rules
+        return plain and not self.compact_output and self.max_output_bytes is None and not self.print_input_snapshot_id
+
+    def _print_summary(self, subset_result: SubsetResult):
         # When Launchable returns an error, the cli skips showing summary
         # report
-        original_subset = subset_result.subset
-        original_rest = subset_result.rest
         summary = subset_result.summary
         if "subset" not in summary.keys() or "rest" not in summary.keys():
             return
@@ -800,20 +1108,20 @@ class Subset(TestPathWriter):
         rows = [
             [
                 "Subset",
-                len(original_subset),
+                subset_result.subset_count,
                 summary["subset"].get("rate", 0.0),
                 summary["subset"].get("duration", 0.0),
             ],
             [
                 "Remainder",
-                len(original_rest),
+                subset_result.rest_count,
                 summary["rest"].get("rate", 0.0),
                 summary["rest"].get("duration", 0.0),
             ],
             [],
             [
                 "Total",
-                len(original_subset) + len(original_rest),
+                subset_result.subset_count + subset_result.rest_count,
                 summary["subset"].get("rate", 0.0) + summary["rest"].get("rate", 0.0),
                 summary["subset"].get("duration", 0.0) + summary["rest"].get("duration", 0.0),
             ],
@@ -843,5 +1151,5 @@ class Subset(TestPathWriter):
 subset = Group(callback=Subset, help="Subsetting tests")
 
 
-def subset_request(client: SmartTestsClient, timeout: tuple[int, int], payload: dict[str, Any]):
-    return client.request("post", "subset", timeout=timeout, payload=payload, compress=True)
+def subset_request(client: SmartTestsClient, timeout: tuple[int, int], payload: dict[str, Any], stream: bool = False):
+    return client.request("post", "subset", timeout=timeout, payload=payload, compress=True, stream=stream)
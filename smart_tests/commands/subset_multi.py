@@ -0,0 +1,204 @@
+"""`smart-tests subset multi`, which subsets the tests of several test runners in one invocation.
+
+The test runners are listed in a TOML file, each with the arguments it takes in `smart-tests subset RUNNER ...`
+and the file to write its subset to:
+
+    [[subset]]
+    runner = "maven"
+    args = ["--test-compile-created-file", "createdFiles.lst"]
+    output = "maven-subset.txt"
+
+    [[subset]]
+    runner = "go-test"
+    input = "go-tests.txt"      # what the test runner would read from the standard input
+    output = "go-subset.txt"
+    rest = "go-rest.txt"        # optional, like --rest
+
+The test runners collect their tests and request their subsets concurrently, in the test session and with the
+options given to `subset`, over the connections to the server they share. The subset API takes the tests of one test
+runner at a time, so there's a request for each. Each subset is then written to its file just like the test runner
+prints it.
+"""
+import contextlib
+import copy
+import os
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import TextIOWrapper
+from typing import Annotated, Any, Iterable, List, NoReturn
+
+import click
+
+import smart_tests.args4p.typer as typer
+from smart_tests.utils.exceptions import print_error_and_die
+from smart_tests.utils.tracking import Tracking
+
+from ..args4p.converters import fileText
+from ..testpath import FilePathNormalizer
+from ..utils.discovery_cache import DiscoveryCache
+from .subset import Subset, SubsetResult, subset
+from .test_path_writer import TestPathWriter
+
+
+@dataclass
+class SpecEntry:
+    runner: str
+    output: str
+    args: List[str] = field(default_factory=list)
+    input: str | None = None
+    rest: str | None = None
+
+
+class RunnerSubset(Subset):
+    """
+    Subset of one of the test runners of `subset multi`. It takes the test session, the client, and the options of
+    `subset multi` as they are, and only starts afresh on what a test runner sets up.
+    """
+
+    def __init__(self, parent: Subset, entry: SpecEntry, output_chunks_dir: str,
+                 prioritized_tests_mapping: dict[str, Any] | None):
+        self.__dict__.update(parent.__dict__)
+        app = copy.copy(parent.app)
+        app.test_runner = entry.runner
+        TestPathWriter.__init__(self, app)
+
+        self.entry = entry
+        self.rest = entry.rest
+        self.output_chunks_dir = output_chunks_dir
+        self.test_paths = []
+        self.input_given = False
+        self.output_handler = self._default_output_handler
+        self.exclusion_output_handler = self._default_exclusion_output_handler
+        self.file_path_normalizer = FilePathNormalizer(self.base_path, no_base_path_inference=self.no_base_path_inference)
+        if parent.discovery_cache is not None:
+            self.discovery_cache = DiscoveryCache(parent.discovery_cache.cache_dir)
+        self.prioritized_tests_mapping = prioritized_tests_mapping
+        # set once the test runner has requested the subset. It doesn't when it finds nothing to subset
+        self.subset_result: SubsetResult | None = None
+
+    def stdin(self) -> Iterable[str]:
+        if self._should_skip_stdin():
+            return []
+        if self.entry.input is None:
+            print_error_and_die(
+                f"The {self.entry.runner} test runner reads tests from the standard input. "
+                "Give the file to read them from as `input` in the spec",
+                self.tracking_client,
+                Tracking.ErrorEvent.USER_ERROR,
+            )
+        try:
+            with open(self.entry.input, encoding="utf-8") as f:
+                return f.readlines()
+        except OSError as e:
+            print_error_and_die(f"Failed to read {self.entry.input}: {e}", self.tracking_client,
+                                Tracking.ErrorEvent.USER_ERROR)
+
+    def _prioritized_tests_mapping(self, f: TextIOWrapper) -> dict[str, Any]:
+        # the file is read once for all the test runners
+        assert self.prioritized_tests_mapping is not None
+        return self.prioritized_tests_mapping
+
+    def _can_stream_output(self) -> bool:
+        # the output is written after every test runner has got its subset
+        return False
+
+    def run(self):
+        self.subset_result = self._get_subset_result()
+
+    def write_output(self):
+        with open(self.entry.output, "w", encoding="utf-8") as f, contextlib.redirect_stdout(f):
+            if self.subset_result is not None:
+                self._output(self.subset_result)
+
+
+@subset.command(name="multi")
+def multi(
+        client: Subset,
+        spec_file: Annotated[TextIOWrapper, typer.Option(
+            "--spec",
+            help="TOML file that lists the test runners to subset the tests of, with their arguments and the files "
+                 "to write their subsets to",
+            type=fileText(mode="r"),
+            metavar="FILE",
+            required=True
+        )],
+):
+    """Subset the tests of several test runners at once"""
+    _validate_options(client)
+    entries = _read_spec(client, spec_file)
+
+    mapping = None
+    if client.prioritized_tests_mapping_file:
+        mapping = client._prioritized_tests_mapping(client.prioritized_tests_mapping_file)
+
+    runners = []
+    invocations = []
+    for i, e in enumerate(entries):
+        r = RunnerSubset(client, e, os.path.join(client.output_chunks_dir, f"{i + 1}-{e.runner}"), mapping)
+        # parse the arguments of every test runner before any of them starts
+        invocations.append(subset.find_subcommand(e.runner).bind(r, *e.args))
+        runners.append(r)
+
+    with ThreadPoolExecutor(max_workers=len(invocations)) as executor:
+        for f in [executor.submit(invoke) for invoke in invocations]:
+            f.result()
+
+    for r in runners:
+        click.echo(f"Subset of {r.entry.runner} to {r.entry.output}", err=True)
+        r.write_output()
+
+
+def _validate_options(client: Subset):
+    conflicts = [name for name, is_set in [
+        ("--rest", client.rest is not None),
+        ("--input-snapshot-id", client.input_snapshot_id is not None),
+        ("--print-input-snapshot-id", client.print_input_snapshot_id),
+        ("--subset-id-file", client.subset_id_file is not None),
+        ("--non-blocking", client.is_non_blocking),
+    ] if is_set]
+    if conflicts:
+        print_error_and_die(
+            f"subset multi cannot be used with {', '.join(conflicts)}. Give `rest` of each test runner in the spec "
+            "in place of --rest",
+            client.tracking_client,
+            Tracking.ErrorEvent.USER_ERROR,
+        )
+
+
+def _read_spec(client: Subset, f: TextIOWrapper) -> List[SpecEntry]:
+    def die(msg: str) -> NoReturn:
+        print_error_and_die(f"Invalid spec {f.name}: {msg}", client.tracking_client, Tracking.ErrorEvent.USER_ERROR)
+
+    try:
+        with f:
+            spec = tomllib.loads(f.read())
+    except tomllib.TOMLDecodeError as e:
+        die(str(e))
+
+    tables = spec.get("subset")
+    if not isinstance(tables, list) or len(tables) == 0:
+        die("expecting [[subset]] tables, one for each test runner")
+
+    entries = []
+    for i, t in enumerate(tables, 1):
+        unknown = set(t) - set(SpecEntry.__dataclass_fields__)
+        if unknown:
+            die(f"unknown keys in [[subset]] #{i}: {', '.join(sorted(unknown))}")
+        for key in ("runner", "output"):
+            if not isinstance(t.get(key), str):
+                die(f"[[subset]] #{i} is missing `{key}`")
+        for key in ("input", "rest"):
+            if key in t and not isinstance(t[key], str):
+                die(f"`{key}` of [[subset]] #{i} isn't a file name")
+        if not isinstance(t.get("args", []), list) or not all(isinstance(a, str) for a in t.get("args", [])):
+            die(f"`args` of [[subset]] #{i} isn't a list of strings")
+        if t["runner"] == "multi":
+            die(f"[[subset]] #{i} can't be another subset multi")
+        entries.append(SpecEntry(**t))
+
+    outputs = [e.output for e in entries] + [e.rest for e in entries if e.rest]
+    if len(outputs) != len(set(outputs)):
+        die("test runners can't write to the same file")
+
+    return entries
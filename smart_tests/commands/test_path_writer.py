@@ -1,5 +1,6 @@
+import os
 from os.path import join
-from typing import Callable, List
+from typing import Callable, Dict, Iterator, List
 
 import click
 
@@ -7,6 +8,12 @@ from ..app import Application
 from ..testpath import TestPath
 
 
+# where the files of max_output_bytes go, unless told otherwise
+DEFAULT_OUTPUT_CHUNKS_DIR = "smart-tests-subset"
+# lists the files written to the output chunks directory, so that only those are removed for the next subset
+CHUNK_MANIFEST = ".smart-tests-chunks"
+
+
 class TestPathWriter(object):
     base_path: str | None = None
     base_path_explicitly_set: bool = False  # Track if base_path was explicitly provided
@@ -17,8 +24,21 @@ class TestPathWriter(object):
     # pluggable logic to convert TestPath to a printable form
     formatter: Callable[[TestPath], str]
 
+    # pluggable logic to list the groups a test belongs to, such as its class and package, from the closest to the
+    # farthest. Each group is a TestPath that the formatter turns into an entry selecting every test in the group.
+    # Test runners that set this let --compact-output print a group in place of its tests when all of them are selected
+    ancestors: Callable[[TestPath], List[TestPath]] | None
+
+    # collapse groups of tests whose tests are all selected. See `ancestors`
+    compact_output: bool = False
+
+    # when the printed output would be larger than this, it's written to files of at most this size instead
+    max_output_bytes: int | None = None
+    output_chunks_dir: str = DEFAULT_OUTPUT_CHUNKS_DIR
+
     def __init__(self, app: Application):
         self.formatter = self.default_formatter
+        self.ancestors = None
         self._same_bin_formatter: Callable[[str], TestPath] | None = None
         self.separator = "\n"
         self.app = app
@@ -34,13 +54,114 @@ class TestPathWriter(object):
             file_name = join(str(self.base_path), file_name)
         return file_name
 
+    def compaction_candidates(self) -> List[TestPath]:
+        """
+        All the tests there are, which tells if every test of a group is selected. Without them, nothing is collapsed
+        """
+        return []
+
+    def format(self, test_paths: List[TestPath]) -> List[str]:
+        """
+        Formats test paths into entries to print. With compact_output, a group of tests whose tests are all
+        selected is formatted into one entry of its farthest such group instead, where the first of them was.
+        """
+        if not self.compact_output or self.ancestors is None:
+            return [self.formatter(t) for t in test_paths]
+
+        # groups are told apart by their formatted form, which is what selects tests in the end. So if two groups
+        # look the same, e.g. the same namespace in two assemblies, they are counted as one
+        groups: Dict[str, List[str]] = {}
+
+        def groups_of(entry: str, t: TestPath) -> List[str]:
+            g = groups.get(entry)
+            if g is None:
+                g = groups[entry] = [self.formatter(a) for a in self.ancestors(t)]  # type: ignore
+            return g
+
+        total: Dict[str, int] = {}
+        for t in self.compaction_candidates():
+            entry = self.formatter(t)
+            if entry in groups:
+                # counted already
+                continue
+            for g in groups_of(entry, t):
+                total[g] = total.get(g, 0) + 1
+
+        selected = {self.formatter(t): t for t in test_paths}
+        chosen: Dict[str, int] = {}
+        for entry in selected:
+            # tests that aren't among the candidates can't make a group complete
+            if entry in groups:
+                for g in groups[entry]:
+                    chosen[g] = chosen.get(g, 0) + 1
+
+        entries: Dict[str, None] = {}
+        for entry, t in selected.items():
+            compacted = entry
+            for g in groups_of(entry, t):
+                if chosen.get(g, 0) == total.get(g):
+                    compacted = g
+            entries[compacted] = None
+        return list(entries)
+
     def write_file(self, file: str, test_paths: List[TestPath]):
         open(file, "w+", encoding="utf-8").write(
-            self.separator.join(self.formatter(t) for t in test_paths))
+            self.separator.join(self.format(test_paths)))
 
     def print(self, test_paths: List[TestPath]):
-        click.echo(self.separator.join(self.formatter(t)
-                                       for t in test_paths))
+        self.print_entries(self.format(test_paths))
+
+    def print_entries(self, entries: List[str]):
+        """Prints formatted entries, or writes them to files if they are too long. See max_output_bytes"""
+        if self.max_output_bytes is not None and \
+                len(self.separator.join(entries).encode("utf-8")) > self.max_output_bytes:
+            # too long to be passed on a command line. Leave it to the caller to run them one by one
+            os.makedirs(self.output_chunks_dir, exist_ok=True)
+            # files of an earlier subset would otherwise be taken for a part of this one
+            self._remove_chunk_files()
+            names = []
+            for i, chunk in enumerate(self._chunks(entries, self.max_output_bytes)):
+                names.append(f"subset_{i}")
+                file = join(self.output_chunks_dir, names[-1])
+                with open(file, "w", encoding="utf-8") as f:
+                    f.write(self.separator.join(chunk))
+                click.echo(file)
+            with open(join(self.output_chunks_dir, CHUNK_MANIFEST), "w", encoding="utf-8") as f:
+                f.write("\n".join(names))
+            return
+        click.echo(self.separator.join(entries))
+
+    def _remove_chunk_files(self):
+        """Removes the files written to output_chunks_dir before, as listed in its manifest, and nothing else"""
+        manifest = join(self.output_chunks_dir, CHUNK_MANIFEST)
+        try:
+            with open(manifest, encoding="utf-8") as f:
+                names = f.read().split("\n")
+        except FileNotFoundError:
+            return
+        for name in names:
+            # only ever file names of our own, even if the manifest is tampered with
+            if name.startswith("subset_") and os.path.basename(name) == name:
+                try:
+                    os.remove(join(self.output_chunks_dir, name))
+                except FileNotFoundError:
+                    pass
+        os.remove(manifest)
+
+    def _chunks(self, entries: List[str], max_bytes: int) -> Iterator[List[str]]:
+        """Groups entries so that each group joined by the separator is at most 'max_bytes', unless an entry alone is"""
+        separator_size = len(self.separator.encode("utf-8"))
+        chunk: List[str] = []
+        size = 0
+        for e in entries:
+            n = len(e.encode("utf-8"))
+            if chunk and size + separator_size + n > max_bytes:
+                yield chunk
+                chunk = []
+            size = n if not chunk else size + separator_size + n
+            chunk.append(e)
+        if chunk:
+            yield chunk
 
     @property
     def same_bin_formatter(self) -> Callable[[str], TestPath] | None:
@@ -0,0 +1,86 @@
+"""
+pytest plugin that `smart-tests subset pytest` loads into `pytest --collect-only` to split the collection across
+processes, and to skip test files whose collection result it already knows.
+
+pytest may well be installed in a different environment than this package, so this file is copied into a temporary
+directory and loaded with `-p`. It must not import anything but the standard library and pytest.
+
+    --smart-tests-shard=I/N   only collect the test files that fall into the I-th of N shards
+    --smart-tests-skip=FILE   don't collect the test files listed in FILE, one absolute path per line
+    --smart-tests-report=FILE write the rootdir and the test files collected, as JSON, to FILE
+
+Which files are test files is still up to pytest, its configuration, and conftest.py files. This plugin only ever
+excludes files from what pytest would otherwise collect.
+"""
+import json
+import zlib
+
+import pytest  # type: ignore
+
+# pytest relies on these for packages and fixtures, so they are never left out
+_ALWAYS_COLLECTED = ("conftest.py", "__init__.py")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("smart-tests-collect")
+    group.addoption("--smart-tests-shard", default="0/1", metavar="I/N")
+    group.addoption("--smart-tests-skip", metavar="FILE")
+    group.addoption("--smart-tests-report", metavar="FILE")
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(_Collection(config), "smart-tests-collect")
+
+
+class _Collection:
+    def __init__(self, config):
+        self.config = config
+        index, count = config.getoption("smart_tests_shard").split("/")
+        self.shard_index = int(index)
+        self.shard_count = int(count)
+        self.skip = set()
+        skip_file = config.getoption("smart_tests_skip")
+        if skip_file:
+            with open(skip_file, encoding="utf-8", errors="surrogateescape") as f:
+                self.skip = set(f.read().split("\n"))
+        # node ID of each test module to its path
+        self.modules = {}
+        self.failed = []
+
+    def pytest_ignore_collect(self, collection_path, config):
+        # only files are split, whatever collects them: doctests, and other collectors of plugins, too
+        if collection_path.name in _ALWAYS_COLLECTED or collection_path.is_dir():
+            return None
+        path = str(collection_path)
+        if path in self.skip:
+            return True
+        if not self._in_shard(path):
+            return True
+        # None, not False, so that other ignore rules still apply
+        return None
+
+    def pytest_collection_modifyitems(self, session, config, items):
+        # pytest doesn't ask pytest_ignore_collect about files given on the command line, and conftest.py and
+        # __init__.py are never ignored. Their tests are left to the shard of the file here instead
+        deselected = [item for item in items if not self._in_shard(str(item.path))]
+        if deselected:
+            items[:] = [item for item in items if self._in_shard(str(item.path))]
+            config.hook.pytest_deselected(items=deselected)
+
+    def _in_shard(self, path):
+        return zlib.crc32(path.encode("utf-8", "surrogateescape")) % self.shard_count == self.shard_index
+
+    def pytest_collectstart(self, collector):
+        if isinstance(collector, pytest.Module):
+            self.modules[collector.nodeid] = str(collector.path)
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.failed.append(report.nodeid)
+
+    def pytest_collection_finish(self, session):
+        report_file = self.config.getoption("smart_tests_report")
+        if not report_file:
+            return
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump({"rootdir": str(self.config.rootpath), "modules": self.modules, "failed": self.failed}, f)
@@ -0,0 +1,39 @@
+"""
+pytest plugin that records test results while tests are still running, instead of parsing report files after the fact.
+
+    $ smart-tests record session --build $BUILD > session.txt
+    $ pytest --smart-tests-session @session.txt
+
+The plugin is registered through the `pytest11` entry point, so pytest picks it up once this package is installed
+in the same environment, but it stays inactive unless --smart-tests-session is given. Until then, it imports no more
+than it takes to add its options, so that it doesn't slow down every pytest run in the environment. What records
+test results is in `pytest_recorder`.
+"""
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("smart-tests", "Smart Tests")
+    group.addoption(
+        "--smart-tests-session",
+        metavar="SESSION",
+        help="Record test results to this test session while tests are running. "
+             "Session ID obtained by calling 'smart-tests record session'. It also accepts '@path/to/file'")
+    group.addoption(
+        "--smart-tests-batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        metavar="N",
+        help="Send test results in batches of up to this many tests")
+
+
+def pytest_configure(config):
+    session = config.getoption("smart_tests_session", None)
+    if not session:
+        return
+    from .pytest_recorder import SmartTestsRecorder
+    from .utils.session import SessionId
+
+    recorder = SmartTestsRecorder(SessionId(session), batch_size=config.getoption("smart_tests_batch_size"))
+    config.pluginmanager.register(recorder, "smart-tests-recorder")
@@ -0,0 +1,165 @@
+"""
+Records test results of pytest while tests are running, for the pytest plugin in `pytest_plugin`.
+
+Each test result is turned into a case event right in the `pytest_runtest_logreport` hook, and handed over to a
+background thread that sends them in batches. Under pytest-xdist, each worker records its own test results with its
+own uploader, and the controller ignores the results relayed from the workers.
+"""
+import pathlib
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+from .commands.record.case_event import CaseEvent, CaseEventType
+from .commands.record.tests import get_env_values
+from .pytest_plugin import DEFAULT_BATCH_SIZE
+from .test_runners.pytest import _parse_pytest_nodeid, _timestamp_to_iso
+from .utils.logger import Logger
+from .utils.session import SessionId
+from .utils.smart_tests_client import SmartTestsClient
+
+# send what we have at least this often, so that results show up while tests are running
+DEFAULT_FLUSH_INTERVAL_SECS = 5.0
+
+
+class SmartTestsRecorder:
+    def __init__(self, session: SessionId, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECS):
+        self.uploader = BackgroundUploader(SmartTestsClient(), session, batch_size=batch_size,
+                                           flush_interval=flush_interval)
+
+    def pytest_runtest_logreport(self, report):
+        if getattr(report, "node", None) is not None:
+            # pytest-xdist relays worker results to the controller with the worker node attached.
+            # the worker has already recorded it
+            return
+        event = case_event_from_report(report)
+        if event is not None:
+            self.uploader.put(event)
+
+    def pytest_unconfigure(self, config):
+        self.uploader.close()
+
+
+def case_event_from_report(report) -> CaseEventType | None:
+    """
+    Turns pytest's TestReport into a case event, in the same way as recording the output of pytest-reportlog.
+    Returns None for reports that don't represent the outcome of a test, e.g. successful setup/teardown.
+    """
+    when = report.when
+    outcome = report.outcome
+    if not (when == "call" or (when == "setup" and outcome != "passed")):
+        return None
+
+    status = CaseEvent.TEST_FAILED
+    if outcome == "passed":
+        status = CaseEvent.TEST_PASSED
+    elif outcome == "skipped":
+        status = CaseEvent.TEST_SKIPPED
+
+    stderr = ""
+    longrepr = report.longrepr
+    if isinstance(longrepr, tuple) and len(longrepr) == 3:
+        # (path, lineno, message) for skipped tests
+        stderr = str(longrepr[2])
+    elif longrepr:
+        stderr = report.longreprtext
+    if report.capstderr:
+        stderr = stderr + "\n" + report.capstderr if stderr else report.capstderr
+
+    test_path = _parse_pytest_nodeid(report.nodeid)
+    for path in test_path:
+        if path.get("type") == "file":
+            path["name"] = pathlib.Path(path["name"]).as_posix()
+
+    start = _timestamp_to_iso(getattr(report, "start", None))
+    stop = _timestamp_to_iso(getattr(report, "stop", None))
+    data: Dict[str, Any] = {}
+    if start:
+        data["start_timestamp"] = start
+    if stop:
+        data["stop_timestamp"] = stop
+
+    return CaseEvent.create(
+        test_path=test_path,
+        duration_secs=report.duration,
+        status=status,
+        stdout=report.capstdout,
+        stderr=stderr,
+        timestamp=stop,
+        data=data if data else None)
+
+
+class BackgroundUploader:
+    """
+    Sends case events to the `events` API from a background thread, so that tests don't wait for the network.
+
+    Events are sent in batches of 'batch_size', or whatever has accumulated in 'flush_interval' seconds since
+    the first event of the batch arrived, whichever comes first. Failures to send are logged, but never fail tests.
+    """
+
+    def __init__(self, client: SmartTestsClient, session: SessionId, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECS, test_runner: str = "pytest"):
+        self.client = client
+        self.session = session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.test_runner = test_runner
+        self.sent = 0
+        self.errors: List[Exception] = []
+        self._metadata: Dict[str, str] | None = None
+        # None signals the end
+        self._queue: queue.Queue[CaseEventType | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="smart-tests-uploader", daemon=True)
+        self._thread.start()
+
+    def put(self, event: CaseEventType):
+        self._queue.put(event)
+
+    def close(self):
+        """Send everything that's left, then stop the background thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        batch: List[CaseEventType] = []
+        deadline = 0.0
+        while True:
+            try:
+                event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+            except queue.Empty:
+                self._send(batch)
+                batch = []
+                continue
+
+            if event is None:
+                break
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                self._send(batch)
+                batch = []
+
+        if batch:
+            self._send(batch)
+
+    def _send(self, events: List[CaseEventType]):
+        try:
+            if self._metadata is None:
+                self._metadata = get_env_values(self.client)
+            res = self.client.request("post", self.session.subpath("events"), payload={
+                "events": events,
+                "testRunner": self.test_runner,
+                "group": "",
+                "metadata": self._metadata,
+                "noBuild": False,
+                "testSuite": "",
+                "flavors": {},
+            }, compress=True)
+            res.raise_for_status()
+            self.sent += len(events)
+        except Exception as e:
+            self.errors.append(e)
+            Logger().warning(f"Failed to record {len(events)} test results: {e}")
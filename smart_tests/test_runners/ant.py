@@ -27,7 +27,7 @@ def subset(
             return None
 
     for root in source_roots:
-        client.scan(root.rstrip('/'), "**/*Test.java", file2test)
+        client.scan(root.rstrip('/'), "**/*Test.java", file2test, cache_key="ant")
 
     client.run()
 
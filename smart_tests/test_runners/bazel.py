@@ -1,21 +1,29 @@
 import json
+import re
 import sys
+import time
 import xml.etree.ElementTree as ET
 from os import path
 from pathlib import Path
-from typing import Annotated, Generator, List
+from typing import Annotated, Any, Dict, Generator, List
 
 from junitparser import TestCase, TestSuite  # type: ignore
 
 import smart_tests.args4p.converters as converters
 import smart_tests.args4p.typer as typer
 
+from ..args4p.exceptions import BadCmdLineException
 from ..commands.subset import Subset
 from ..testpath import TestPath
+from ..utils.log_retention import get_log_retention
 from ..utils.logger import Logger
 from . import smart_tests
 
 
+# directories Bazel gives each shard and run of a test target, e.g. shard_1_of_2, run_1_of_3, or shard_1_of_2_run_1_of_3
+SHARD_RUN_DIR = re.compile(r'shard_\d+_of_\d+(_run_\d+_of_\d+)?|run_\d+_of_\d+')
+
+
 def make_test_path(pkg, target) -> TestPath:
     return [{'type': 'package', 'name': pkg}, {'type': 'target', 'name': target}]
 
@@ -47,6 +55,12 @@ def record_tests(
         multiple=True,
         type=converters.path(exists=True)
     )] = None,
+    follow_bep: Annotated[Path | None, typer.Option(
+        "--follow-bep",
+        help="set file path given to --build_event_json_file of a Bazel invocation that's still running. "
+             "Test results are recorded as each test target finishes, until the build finishes",
+        type=converters.path(dir_okay=False)
+    )] = None,
 ):
     """
     Takes Bazel workspace, then report all its test results
@@ -61,7 +75,12 @@ def record_tests(
         # In Bazel, report path name contains package & target.
         # for example, for //foo/bar:zot, the report file is at bazel-testlogs/foo/bar/zot/test.xml
         # TODO: robustness
-        pkgNtarget = report_file[len(str(base)) + 1:-len("/test.xml")]
+        pkgNtarget = path.dirname(report_file[len(str(base)) + 1:])
+        # earlier attempts of a flaky test, and each shard and run of a test have directories of their own below it
+        if path.basename(pkgNtarget) == "test_attempts":
+            pkgNtarget = path.dirname(pkgNtarget)
+        if SHARD_RUN_DIR.fullmatch(path.basename(pkgNtarget)):
+            pkgNtarget = path.dirname(pkgNtarget)
 
         # last path component is the target, the rest is package
         # TODO: does this work correctly when on Windows?
@@ -73,37 +92,63 @@ def record_tests(
 
     client.path_builder = f
     client.check_timestamp = False
+    # test.log of a target goes to every test case of it. Send it once per request, and refer to it from the test cases
+    client.dedupe_logs = True
 
     def parse_func(report: str) -> ET.ElementTree:
         """
         test result XML generated by Bazel's java_test rule (and possibly others) do not capture system-out/system-err.
-        The whole thing gets captured separately as test.log file in the same directory as test.xml.
+        The whole thing gets captured separately as test.log file in the same directory as test.xml, or as
+        attempt_N.log next to attempt_N.xml of an earlier attempt.
         This limits our ability to do useful things with data, so we go out of our way to capture it.
         Ideally Bazel should do this. test.log captures the entire output from the whole session, and therefore
         it is incapable of splitting log between different test classes.
         """
         tree = ET.parse(report)
         root = tree.getroot()
+        logfile = path.splitext(report)[0] + '.log'
+        # read at most once per target, and every test case shares the same string, which is sent only once per
+        # request. See dedupe_logs above
+        log: str | None = None
         for ts in root.findall('testsuite'):
             # be defensive -- future/non-Java test rules might capture those
             if ts.findtext('system-out', '') == "" and ts.findtext('system-err', '') == "":
-                logfile = path.join(path.dirname(report), 'test.log')
-                if path.exists(logfile):
-                    for x in ts.findall('system-out'):
-                        ts.remove(x)
-                    with open(logfile, 'r', encoding='utf-8', errors='replace') as log_file:
-                        log = log_file.read()
-
-                    for c in ts.findall('testcase'):
-                        if c.findtext('system-out', '') == "" and c.findtext('system-err', '') == "":
-                            system_out = ET.SubElement(c, 'system-out')
-                            system_out.text = log
+                if log is None:
+                    if not path.exists(logfile):
+                        break
+                    # only read the part of the log we'd keep. it can be huge
+                    log = get_log_retention().read_file(logfile)
+
+                for x in ts.findall('system-out'):
+                    ts.remove(x)
+
+                for c in ts.findall('testcase'):
+                    if c.findtext('system-out', '') == "" and c.findtext('system-err', '') == "":
+                        system_out = ET.SubElement(c, 'system-out')
+                        system_out.text = log
 
         return tree  # type: ignore
 
     client.junitxml_parse_func = parse_func
 
-    if build_event_json_files:
+    if build_event_json_files and follow_bep:
+        raise BadCmdLineException("--build-event-json and --follow-bep cannot be used together")
+
+    if follow_bep:
+        # a build event file from an earlier build is left as it is until Bazel starts writing it again
+        not_before = None if client.is_allow_test_before_build else client.record_start_at.timestamp()
+
+        def followed_reports() -> Generator[str, None, None]:
+            for test_result in follow_build_event_json(follow_bep, not_before=not_before):
+                report = test_report_of(base, test_result)
+                if report.exists():
+                    yield str(report)
+                else:
+                    # e.g. the target failed to build
+                    Logger().warning(f"No test report for {test_result.get('label')}")
+
+        client.follow(followed_reports())
+    elif build_event_json_files:
         for l in parse_build_event_json(build_event_json_files):
             if l is None:
                 continue
@@ -131,3 +176,88 @@ def parse_build_event_json(files: List[Path]) -> Generator:
                             # replace //foo/bar:zot to /foo/bar/zot
                             label = label.lstrip("/").replace(":", "/")
                             yield label
+
+
+# how often to check for new build events while Bazel is running
+FOLLOW_POLL_INTERVAL_SECS = 0.5
+# give up following the build event file if it doesn't grow for this long, e.g. Bazel got killed
+FOLLOW_IDLE_TIMEOUT_SECS = 30 * 60
+
+
+def follow_build_event_json(file: Path, poll_interval: float = FOLLOW_POLL_INTERVAL_SECS,
+                            idle_timeout: float = FOLLOW_IDLE_TIMEOUT_SECS,
+                            not_before: float | None = None) -> Generator[Dict[str, Any], None, None]:
+    """
+    Like parse_build_event_json, but tails a build event file that Bazel is still writing, yielding the ID of each
+    testResult event, e.g. {"label": "//foo/bar:zot", "run": 1, "shard": 1, "attempt": 1}, as test results are
+    reported. Returns when the build finishes.
+
+    A file last modified before the 'not_before' timestamp is from an earlier build, so it isn't read until Bazel
+    writes it afresh.
+    """
+    def is_fresh() -> bool:
+        try:
+            mtime = file.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return not_before is None or mtime >= not_before
+
+    deadline = time.monotonic() + idle_timeout
+    while not is_fresh():
+        if time.monotonic() > deadline:
+            Logger().warning(f"{file} of this build didn't appear in {idle_timeout} seconds")
+            return
+        time.sleep(poll_interval)
+
+    with open(file) as f:
+        buf = ""
+        deadline = time.monotonic() + idle_timeout
+        while True:
+            line = f.readline()
+            if not line.endswith("\n"):
+                # Bazel is in the middle of writing an event, or hasn't written the next one yet
+                buf += line
+                if time.monotonic() > deadline:
+                    Logger().warning(f"{file} didn't get any new build events in {idle_timeout} seconds. Stop following it")
+                    return
+                time.sleep(poll_interval)
+                continue
+            line, buf = buf + line, ""
+            deadline = time.monotonic() + idle_timeout
+
+            try:
+                d = json.loads(line)
+            except Exception:
+                Logger().error(f"Can not parse build event json {line}")
+                continue
+
+            id = d.get("id", {})
+            if "testResult" in id and "label" in id["testResult"]:
+                yield id["testResult"]
+            if "buildFinished" in id or d.get("lastMessage"):
+                return
+
+
+def test_report_of(base: Path, test_result: Dict[str, Any]) -> Path:
+    """
+    Returns the path of the test report of the run, shard, and attempt given by the ID of a testResult event, e.g.
+    bazel-testlogs/foo/bar/zot/shard_2_of_4/test.xml, or .../test_attempts/attempt_1.xml for an earlier attempt
+    of a flaky test.
+    """
+    # replace //foo/bar:zot to foo/bar/zot
+    target = base.joinpath(test_result["label"].lstrip("/").replace(":", "/"))
+    shard, run = test_result.get("shard", 1), test_result.get("run", 1)
+
+    # the ID doesn't say how many shards and runs there are, but only then do they get directories of their own
+    dir = target
+    for pattern in [f"shard_{shard}_of_*_run_{run}_of_*", f"shard_{shard}_of_*", f"run_{run}_of_*"]:
+        dirs = [d for d in target.glob(pattern) if SHARD_RUN_DIR.fullmatch(d.name)]
+        if dirs:
+            dir = max(dirs, key=lambda d: d.stat().st_mtime)
+            break
+
+    # Bazel moves the report of an attempt that's going to be retried aside, before it announces the attempt
+    attempt = dir.joinpath("test_attempts", f"attempt_{test_result.get('attempt', 1)}.xml")
+    if attempt.exists():
+        return attempt
+    return dir.joinpath("test.xml")
@@ -1,7 +1,6 @@
 import glob
 import json
 import os
-import re
 from pathlib import Path
 from typing import Annotated, List
 from xml.etree import ElementTree as ET
@@ -12,8 +11,12 @@ import smart_tests.args4p.typer as typer
 
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
+from ..utils import trie_regex
 from . import smart_tests
 
+# CTest's regular expressions can have no more than 9 groups, counting from 1, or it fails with "Too many ()."
+CTEST_MAX_GROUPS = 9
+
 
 @smart_tests.subset
 def subset(
@@ -59,30 +62,12 @@ def subset(
 def _write_regex_files(output_dir, prefix, max_size, paths):
     # Python's regexp spec and CTest's regexp spec would be different, but
     # this escape would work in most of the cases.
-    escaped = _group_by_size(['^' + re.escape(tp[0]['name']) + '$' for tp in paths], max_size)
+    patterns = trie_regex.build_chunks([tp[0]['name'] for tp in paths], max_size, max_groups=CTEST_MAX_GROUPS)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    for i, elems in enumerate(escaped):
+    for i, pattern in enumerate(patterns):
         with open(os.path.join(output_dir, f"{prefix}_{i}"), 'w') as f:
-            f.write('|'.join(elems) + '\n')
-
-
-def _group_by_size(elems, max_size):
-    ret = []
-    curr = []
-    curr_size = 0
-    for elem in elems:
-        # +1 for the separator
-        if max_size < curr_size + len(elem) + 1:
-            ret.append(curr)
-            curr = [elem]
-            curr_size = len(elem)
-        else:
-            curr.append(elem)
-            curr_size = len(elem) + 1
-    if len(curr) != 0:
-        ret.append(curr)
-    return ret
+            f.write(pattern + '\n')
 
 
 @smart_tests.record.tests
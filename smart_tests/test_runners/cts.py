@@ -1,13 +1,16 @@
-from typing import Annotated, List
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Annotated, Dict, List, NamedTuple
 from xml.etree import ElementTree as ET
 
 import click
 
 import smart_tests.args4p.typer as typer
-from smart_tests.commands.record.case_event import CaseEvent
+from smart_tests.commands.record.case_event import CaseEvent, CaseEventGenerator, CaseEventType
 
+from ..args4p.exceptions import BadCmdLineException
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
+from ..utils.log_retention import get_log_retention, set_log_retention
 from . import smart_tests
 
 # https://source.android.com/docs/compatibility/cts/command-console-v2
@@ -15,7 +18,23 @@ include_option = "--include-filter"
 exclude_option = "--exclude-filter"
 
 
-def parse_func(p: str):
+class TestResult(NamedTuple):
+    test_case_name: str
+    test_name: str
+    result: str
+    stdout: str
+    stderr: str
+
+    def case_event_status(self):
+        if self.result == "fail":
+            return CaseEvent.TEST_FAILED
+        elif self.result == "ASSUMPTION_FAILURE" or self.result == "IGNORED":
+            return CaseEvent.TEST_SKIPPED
+
+        return CaseEvent.TEST_PASSED
+
+
+def parse_func(p: str) -> CaseEventGenerator:
     """  # noqa: E501
     # sample report format
     success case:
@@ -42,81 +61,135 @@ def parse_func(p: str):
       </TestCase>
     </Module>
     """
-    class TestResult:
-        def __init__(self, test_case_name: str, test_name: str, result: str, stdout: str, stderr: str):
-            self.test_case_name = test_case_name
-            self.test_name = test_name
-            self.result = result
-            self.stdout = stdout
-            self.stderr = stderr
-
-        def case_event_status(self):
-            if self.result == "fail":
-                return CaseEvent.TEST_FAILED
-            elif self.result == "ASSUMPTION_FAILURE" or self.result == "IGNORED":
-                return CaseEvent.TEST_SKIPPED
-
-            return CaseEvent.TEST_PASSED
-
-    def build_record_test_path(module: str, test_case: str, test: str):
-        return [
-            {"type": "Module", "name": module},
-            {"type": "TestCase", "name": test_case},
-            {"type": "Test", "name": test},
-        ]
-
-    events = []
-    tree = ET.parse(p)
-
-    for module in tree.iter('Module'):
-        test_results = []
-        total_duration = module.get("runtime", "0")
-        module_name = module.get("name", "")
-
-        for test_case in module.iter("TestCase"):
-            test_case_name = test_case.get('name', "")
-
-            for test in test_case.iter("Test"):
-                result = test.get('result', "")
-                test_name = test.get("name", "")
-                stdout = ""
-                stderr = ""
-
-                failure = test.find('Failure')
-                if failure:
-                    stack_trace = ""
-                    stack_trace_element = failure.find("StackTrace")
-                    if stack_trace_element is not None:
-                        stack_trace = str(stack_trace_element.text)
-
-                    stdout = failure.get("message", "")
-                    stderr = stack_trace
-
-                test_results.append(TestResult(
-                    test_case_name=test_case_name,
-                    test_name=test_name,
-                    result=result,
-                    stdout=stdout,
-                    stderr=stderr))
-
-        if len(test_results) == 0:
+    module: ET.Element | None = None
+    test_case: ET.Element | None = None
+    test: ET.Element | None = None
+    # results of the current module. These have to wait until the end of the module,
+    # as the module runtime is divided among the tests in it
+    test_results: List[TestResult] = []
+    retention = get_log_retention()
+    # elements we are in
+    stack: List[ET.Element] = []
+
+    for event, elem in ET.iterparse(p, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "Module" and module is None:
+                module = elem
+                test_results = []
+            elif elem.tag == "TestCase" and module is not None and test_case is None:
+                test_case = elem
+            elif elem.tag == "Test" and test_case is not None and test is None:
+                test = elem
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if test is not None and elem is test:
+            stdout = ""
+            stderr = ""
+            failure = test.find('Failure')
+            if failure is not None:
+                stack_trace_element = failure.find("StackTrace")
+                stdout = failure.get("message", "")
+                stderr = retention.truncate(stack_trace_element.text or "") if stack_trace_element is not None else ""
+
+            test_results.append(TestResult(
+                test_case_name=test_case.get('name', "") if test_case is not None else "",
+                test_name=test.get("name", ""),
+                result=test.get('result', ""),
+                stdout=stdout,
+                stderr=stderr))
+            test = None
+        elif elem is test_case:
+            test_case = None
+        elif module is not None and elem is module:
+            yield from _module_case_events(module.get("name", ""), module.get("runtime", "0"), test_results)
+            module = None
+            test_results = []
+
+        if test is None and stack:
+            # done with this subtree
+            stack[-1].remove(elem)
+
+
+def _module_case_events(module_name: str, total_duration: str, test_results: List[TestResult]) -> CaseEventGenerator:
+    if len(test_results) == 0:
+        return
+
+    test_duration_msec_per_test = int(total_duration) / len(test_results)
+
+    for test_result in test_results:
+        if module_name == "" or test_result.test_case_name == "" or test_result.test_name == "":
             continue
 
-        test_duration_msec_per_test = int(total_duration) / len(test_results)
+        yield CaseEvent.create(
+            test_path=[
+                {"type": "Module", "name": module_name},
+                {"type": "TestCase", "name": test_result.test_case_name},
+                {"type": "Test", "name": test_result.test_name},
+            ],
+            duration_secs=float(test_duration_msec_per_test / 1000),
+            status=test_result.case_event_status(),
+            stdout=test_result.stdout,
+            stderr=test_result.stderr,
+        )
 
-        for test_result in test_results:  # type: TestResult
-            if module_name == "" or test_result.test_case_name == "" or test_result.test_name == "":
-                continue
 
-            events.append(CaseEvent.create(
-                test_path=build_record_test_path(module_name, test_result.test_case_name, test_result.test_name),
-                duration_secs=float(test_duration_msec_per_test / 1000),
-                status=test_result.case_event_status(),
-                stdout=test_result.stdout,
-                stderr=test_result.stderr,
-            ))
+def _parse_file(p: str) -> List[CaseEventType]:
+    return list(parse_func(p))
 
-    return (x for x in events)
+
+class ParallelParser:
+    """
+    Parses report files in worker processes, ahead of RecordTests asking for them one by one.
+    At most 'jobs' files are parsed or waiting to be consumed at any given moment.
+    """
+
+    def __init__(self, client: RecordTests, jobs: int):
+        self.client = client
+        self.jobs = jobs
+        self.executor: ProcessPoolExecutor | None = None
+        self.futures: Dict[str, Future] = {}
+        # reports yet to be submitted
+        self.pending: List[str] = []
+
+    def parse_func(self, report: str) -> CaseEventGenerator:
+        if self.executor is None:
+            # the workers need to follow the same log retention policy
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=set_log_retention,
+                                                initargs=(get_log_retention(),))
+            # by now, RecordTests has dropped duplicate reports
+            self.pending = list(dict.fromkeys(self.client.reports))
+
+        if report in self.pending:
+            # asked for ahead of its turn
+            self.pending.remove(report)
+
+        while self.pending and len(self.futures) < self.jobs:
+            r = self.pending.pop(0)
+            self.futures[r] = self.executor.submit(_parse_file, r)
+
+        future = self.futures.pop(report, None)
+        if future is None:
+            # not a report we knew of upfront
+            yield from parse_func(report)
+        else:
+            # the window slides as soon as we pick up this one, before its events get consumed
+            if self.pending:
+                r = self.pending.pop(0)
+                self.futures[r] = self.executor.submit(_parse_file, r)
+            yield from future.result()
+
+        if not self.pending and not self.futures:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stops the workers, including when reports submitted ahead of time were never asked for"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+            self.futures = {}
+            self.pending = []
 
 
 @smart_tests.record.tests
@@ -126,15 +199,31 @@ def record_tests(
         multiple=True,
         help="Test report files to process"
     )],
+    jobs: Annotated[int, typer.Option(
+        "--jobs",
+        help="Parse up to this many report files in parallel",
+        metavar="N"
+    )] = 1,
 ):
     """
     Beta: Report test result that Compatibility Test Suite (CTS) produced. Supports only CTS v2
     """
+    if jobs < 1:
+        raise BadCmdLineException("--jobs must be at least 1")
+
     for r in reports:
         client.report(r)
 
-    client.parse_func = parse_func
-    client.run()
+    if jobs > 1 and len(client.reports) > 1:
+        parser = ParallelParser(client, jobs)
+        client.parse_func = parser.parse_func
+        try:
+            client.run()
+        finally:
+            parser.shutdown()
+    else:
+        client.parse_func = parse_func
+        client.run()
 
 
 @smart_tests.subset
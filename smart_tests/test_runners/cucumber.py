@@ -1,11 +1,9 @@
-import json
 import os
 import pathlib
 import re
-from copy import deepcopy
 from enum import Enum
 from pathlib import Path
-from typing import Annotated, Dict, Generator, List, cast
+from typing import Annotated, Dict, Generator, List, Set, cast
 from xml.etree import ElementTree as ET
 
 import click
@@ -15,12 +13,14 @@ from smart_tests.testpath import FilePathNormalizer, TestPath
 
 from ..commands.record.case_event import CaseEvent, CaseEventType
 from ..commands.record.tests import RecordTests
+from ..utils import json_stream
 from . import smart_tests
 
 subset = smart_tests.CommonSubsetImpls(__name__).scan_files('*_feature')
 
 
 REPORT_FILE_PREFIX = "TEST-"
+FEATURE_FILE_SUFFIX = ".feature"
 
 
 @smart_tests.record.tests
@@ -57,12 +57,13 @@ def record_tests(
 
 def _record_tests_from_xml(client, reports, report_file_and_test_file_map: Dict[str, str]):
     base_path = client.base_path if client.base_path else os.getcwd()
+    index = FeatureFileIndex(base_path)
     for report in reports:
         if REPORT_FILE_PREFIX not in report:
             click.echo(f"{report} was load skipped because it doesn't look like a report file.", err=True)
             continue
 
-        test_file = _find_test_file_from_report_file(base_path, report)
+        test_file = _find_test_file_from_report_file(index, report)
         if test_file:
             report_file_and_test_file_map[report] = str(test_file)
             client.report(report)
@@ -215,65 +216,73 @@ class JSONReportParser:
             }
         ]
         """
-        with open(report_file, 'r') as json_file:
+        def features(json_file) -> Generator[Dict, None, None]:
             try:
-                data = json.load(json_file)
-            except Exception as e:
+                # read one feature at a time, as these reports can get large
+                for _, d in json_stream.items(json_file, json_stream.ITEM):
+                    yield d
+            except ValueError as e:
                 raise Exception(f"Can't read JSON format report file {report_file}. Make sure to confirm report file.") from e
 
-        if len(data) == 0:
-            click.echo(f"Can't find test reports from {report_file}. Make sure to confirm report file.", err=True)
-
-        for d in data:
-            file_name = clean_uri(d.get("uri", ""))
-            class_name = d.get("name", "")
-
-            # Cucumber can define repeating the same `Given` steps as a `Background`
-            # https://cucumber.io/docs/gherkin/reference/#background
-            background: TestCaseInfo | None = None
-
-            for element in d.get("elements", []):
-                test_case = element.get("name", "")
-                # Scenario hooks run for every scenario.
-                # https://cucumber.io/docs/cucumber/api/?lang=java#hooks
-                scenario_hook_information = _parse_hook_from_element(element)
-
-                if element.get("type", "") == CucumberElementType.BACKGROUND.value:
-                    # `Background` can be defined once per scenario so won't available multiple times.
-                    background = _parse_test_case_info_from_element(element=element)
-                    background.append_hook_info(scenario_hook_information)
-                    continue
-
-                test_case_info = _parse_test_case_info_from_element(element=element)
-                if background:
-                    test_case_info.append_background_results(background)
-                    # Initialize background for next scenario
-                    background = None
-
-                test_case_info.append_hook_info(scenario_hook_information)
-
-                if test_case_info.is_failed():
-                    status = CaseEvent.TEST_FAILED
-                elif test_case_info.is_skipped():
-                    status = CaseEvent.TEST_SKIPPED
-                else:
-                    status = CaseEvent.TEST_PASSED
-
-                test_path: TestPath = [
-                    {"type": "file", "name": pathlib.Path(self.file_path_normalizer.relativize(file_name)).as_posix()},
-                    {"type": "class", "name": class_name},
-                    {"type": "testcase", "name": test_case},
-                ]
-                test_path.extend(test_case_info.test_path())
-
-                yield CaseEvent.create(
-                    test_path=test_path,
-                    duration_secs=test_case_info.duration_sec(),
-                    status=status,
-                    stderr="\n".join(test_case_info.stderr()))
+        found = False
+        with open(report_file, 'r') as json_file:
+            for d in features(json_file):
+                found = True
+                yield from self._parse_feature(d)
 
+        if not found:
+            click.echo(f"Can't find test reports from {report_file}. Make sure to confirm report file.", err=True)
 
-def _find_test_file_from_report_file(base_path: str, report: str) -> Path | None:
+    def _parse_feature(self, d: Dict) -> Generator[CaseEventType, None, None]:
+        file_name = clean_uri(d.get("uri", ""))
+        class_name = d.get("name", "")
+
+        # Cucumber can define repeating the same `Given` steps as a `Background`
+        # https://cucumber.io/docs/gherkin/reference/#background
+        background: TestCaseInfo | None = None
+
+        for element in d.get("elements", []):
+            test_case = element.get("name", "")
+            # Scenario hooks run for every scenario.
+            # https://cucumber.io/docs/cucumber/api/?lang=java#hooks
+            scenario_hook_information = _parse_hook_from_element(element)
+
+            if element.get("type", "") == CucumberElementType.BACKGROUND.value:
+                # `Background` can be defined once per scenario so won't available multiple times.
+                background = _parse_test_case_info_from_element(element=element)
+                background.append_hook_info(scenario_hook_information)
+                continue
+
+            test_case_info = _parse_test_case_info_from_element(element=element)
+            if background:
+                test_case_info.append_background_results(background)
+                # Initialize background for next scenario
+                background = None
+
+            test_case_info.append_hook_info(scenario_hook_information)
+
+            if test_case_info.is_failed():
+                status = CaseEvent.TEST_FAILED
+            elif test_case_info.is_skipped():
+                status = CaseEvent.TEST_SKIPPED
+            else:
+                status = CaseEvent.TEST_PASSED
+
+            test_path: TestPath = [
+                {"type": "file", "name": pathlib.Path(self.file_path_normalizer.relativize(file_name)).as_posix()},
+                {"type": "class", "name": class_name},
+                {"type": "testcase", "name": test_case},
+            ]
+            test_path.extend(test_case_info.test_path())
+
+            yield CaseEvent.create(
+                test_path=test_path,
+                duration_secs=test_case_info.duration_sec(),
+                status=status,
+                stderr="\n".join(test_case_info.stderr()))
+
+
+def _find_test_file_from_report_file(index: 'FeatureFileIndex', report: str) -> Path | None:
     """
     Find test file from cucumber report file path format
     e.g) Test-features-foo-hoge.xml -> features/foo/hoge.feature or features/foo-hoge.feature
@@ -283,30 +292,58 @@ def _find_test_file_from_report_file(base_path: str, report: str) -> Path | None
     report_file = report_file.lstrip(REPORT_FILE_PREFIX)
     report_file = os.path.splitext(report_file)[0]
 
-    file_candidates = _create_file_candidate_list(report_file)
-    for candidate in file_candidates:
-        f = Path(base_path, candidate + ".feature")
-        if f.exists():
-            return f
-
-    return None
-
-
-def _create_file_candidate_list(file: str) -> List[str]:
-    candidates = [""]
-    for c in file:
-        if c == "-":
-            list_length = len(candidates)
-            candidates += deepcopy(candidates)
-            for i in range(list_length):
-                candidates[i] += '-'
-            for i in range(list_length, len(candidates)):
-                candidates[i] += '/'
-        else:
-            for i in range(len(candidates)):
-                candidates[i] += c
+    return index.resolve(report_file)
+
+
+class FeatureFileIndex:
+    """
+    Report file names replace path separators with dashes, so 'features-foo-bar' can come from either
+    features/foo/bar.feature, features/foo-bar.feature, features-foo/bar.feature, and so on. Instead of probing
+    every combination (2^k of them for k dashes), we index feature files by their dash-normalized path.
+
+    Only top-level directories that a report name can start with get walked, and each of them only once.
+    """
 
-    return candidates
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        # dash-normalized path -> relative paths of feature files, without the suffix
+        self._index: Dict[str, List[str]] = {}
+        self._walked: Set[str] = set()
+
+    def resolve(self, name: str) -> Path | None:
+        # a feature file right under the base directory is always the preferred match. See below
+        if os.path.isfile(os.path.join(self.base_path, name + FEATURE_FILE_SUFFIX)):
+            return Path(self.base_path, name + FEATURE_FILE_SUFFIX)
+
+        for i, c in enumerate(name):
+            if c == '-':
+                self._walk(name[:i])
+
+        candidates = self._index.get(name)
+        if not candidates:
+            return None
+        # when multiple files match, prefer the one with dashes over separators, starting from the end of the path.
+        # e.g. features/foo-bar/baz.feature over features-foo/bar/baz.feature, but features/foo/bar-baz.feature
+        # over both of them. Candidates only differ in those positions, and '-' sorts before path separators, so
+        # comparing reversed paths does exactly that
+        return Path(self.base_path, min(candidates, key=lambda c: c[::-1]) + FEATURE_FILE_SUFFIX)
+
+    def _walk(self, top: str):
+        if top in self._walked:
+            return
+        self._walked.add(top)
+
+        d = os.path.join(self.base_path, top)
+        if not os.path.isdir(d):
+            return
+        for dirpath, _, filenames in os.walk(d):
+            for f in filenames:
+                if f.endswith(FEATURE_FILE_SUFFIX):
+                    rel = os.path.relpath(os.path.join(dirpath, f[:-len(FEATURE_FILE_SUFFIX)]), self.base_path)
+                    key = rel.replace(os.sep, '-')
+                    if os.altsep:
+                        key = key.replace(os.altsep, '-')
+                    self._index.setdefault(key, []).append(rel)
 
 
 class Result:
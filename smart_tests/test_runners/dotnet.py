@@ -58,10 +58,21 @@ def do_subset(client: Subset, bare):
 
     client.separator = separator
     client.formatter = formatter
+    if bare:
+        # NUnit takes names of namespaces and fixtures to mean all the tests in them
+        client.ancestors = test_suites
     client.exclusion_output_handler = exclusion_output_handler
     client.run()
 
 
+def test_suites(test_path: TestPath) -> List[TestPath]:
+    """
+    Assembly=a.dll#TestSuite=NS#TestSuite=Class#TestCase=Test -> Assembly=a.dll#TestSuite=NS#TestSuite=Class,
+    Assembly=a.dll#TestSuite=NS
+    """
+    return [test_path[:i] for i in range(len(test_path) - 1, 0, -1) if test_path[i - 1].get("type") == "TestSuite"]
+
+
 @smart_tests.subset
 def subset(
     client: Subset,
@@ -1,19 +1,28 @@
 import glob
+import json
 import os
 import re
-from typing import Annotated, Dict, List
+import sys
+from typing import Annotated, Dict, Generator, Iterable, List, Tuple
 
 import click
 from junitparser import TestCase, TestSuite  # type: ignore
 
 import smart_tests.args4p.typer as typer
 
-from ..commands.record.tests import RecordTests
+from ..commands.record.case_event import CaseEvent, CaseEventType
+from ..commands.record.tests import STDIN, RecordTests
 from ..commands.subset import Subset
 from ..testpath import TestPath
+from ..utils import trie_regex
+from ..utils.chunker import FLUSH, with_flushes
+from ..utils.log_retention import BoundedLog, get_log_retention
 from ..utils.logger import Logger
 from . import smart_tests
 
+# seconds a test result read from the standard input with --json waits at most before it's sent
+STREAM_FLUSH_INTERVAL = 5
+
 
 @smart_tests.subset
 def subset(client: Subset):
@@ -39,12 +48,49 @@ def subset(client: Subset):
             else:
                 logger.warning("Cannot extract the package from the input. This may result in missing some tests.")
             test_cases = []
+
+    def output_handler(output: List[TestPath], rests: List[TestPath]):
+        if client.rest:
+            with open(client.rest, "w+", encoding="utf-8") as fp:
+                fp.write('|'.join(_run_patterns(client, rests)))
+        if output:
+            client.print_entries(_run_patterns(client, output))
+
     client.formatter = lambda x: f"^{x[1]['name']}$"
     client.separator = '|'
+    client.output_handler = output_handler
     client.same_bin_formatter = format_same_bin
     client.run()
 
 
+def _run_patterns(client: Subset, test_paths: List[TestPath]) -> List[str]:
+    """
+    Regular expressions for `go test -run` that select the tests, factored over their common prefixes. When the output
+    is limited in size, patterns are split so that each fits, and they can be printed separately.
+    """
+    names = [tp[1]['name'] for tp in test_paths]
+    if not names:
+        return []
+    if client.max_output_bytes is None:
+        return [trie_regex.build(names)]
+    return trie_regex.build_chunks(names, client.max_output_bytes)
+
+
+def _add_reports(client: RecordTests, root: str, pattern: str) -> bool:
+    """Adds the reports that 'root' matches, scanning directories for 'pattern'. False if it matches nothing"""
+    match = False
+    for t in glob.iglob(root, recursive=True):
+        match = True
+        if os.path.isdir(t):
+            client.scan(t, pattern)
+        else:
+            client.report(t)
+
+    if not match:
+        click.echo(f"No matches found: {root}", err=True)
+    return match
+
+
 @smart_tests.record.tests
 def record_tests(
     client: RecordTests,
@@ -52,18 +98,24 @@ def record_tests(
         multiple=True,
         help="Source root directories or files to process"
     )],
+    json_format: Annotated[bool, typer.Option(
+        "--json",
+        help="read the output of `go test -json` instead of JUnit XML reports. Use '-' to read it from the standard "
+             "input while tests are running"
+    )] = False,
 ):
-    for root in source_roots:
-        match = False
-        for t in glob.iglob(root, recursive=True):
-            match = True
-            if os.path.isdir(t):
-                client.scan(t, "*.xml")
-            else:
-                client.report(t)
+    if json_format:
+        for r in source_roots:
+            if r == STDIN:
+                client.report(r)
+            elif not _add_reports(client, r, "*.json"):
+                return
+        client.parse_func = GoTestJSONParser().parse_func
+        client.run()
+        return
 
-        if not match:
-            click.echo(f"No matches found: {root}", err=True)
+    for root in source_roots:
+        if not _add_reports(client, root, "*.xml"):
             return
 
     default_path_builder = client.path_builder
@@ -94,6 +146,80 @@ def record_tests(
     client.run()
 
 
+class GoTestJSONParser:
+    """
+    Turns the stream of `go test -json` events (see `go doc test2json`) into case events, each one as soon as
+    the test finishes.
+
+        {"Time":"2024-01-01T00:00:00Z","Action":"run","Package":"example.com/foo","Test":"TestBar"}
+        {"Time":"2024-01-01T00:00:00Z","Action":"output","Package":"example.com/foo","Test":"TestBar","Output":"..."}
+        {"Time":"2024-01-01T00:00:01Z","Action":"pass","Package":"example.com/foo","Test":"TestBar","Elapsed":1.0}
+    """
+
+    STATUS_MAP = {
+        "pass": CaseEvent.TEST_PASSED,
+        "fail": CaseEvent.TEST_FAILED,
+        "skip": CaseEvent.TEST_SKIPPED,
+    }
+
+    def parse_func(self, report_file: str) -> Generator[CaseEventType, None, None]:
+        if report_file == STDIN:
+            # tests are still running. A slow test run's results are sent after a while, rather than when enough of
+            # them have piled up
+            yield from self.parse(with_flushes(sys.stdin, STREAM_FLUSH_INTERVAL))
+        else:
+            with open(report_file, encoding='utf-8', errors='replace') as f:
+                yield from self.parse(f)
+
+    def parse(self, stream: Iterable[str]) -> Generator[CaseEventType, None, None]:
+        """Parses lines of `go test -json`, passing FLUSH in them through"""
+        retention = get_log_retention()
+        # output of tests that are still running, keyed by (package, test)
+        running: Dict[Tuple[str, str], BoundedLog] = {}
+
+        for line in stream:
+            if line is FLUSH:
+                yield FLUSH  # type: ignore
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # e.g. build errors, which `go test -json` passes through as is
+                continue
+            if not isinstance(event, dict) or not event.get("Test"):
+                # package level events
+                continue
+
+            key = (event.get("Package", ""), event["Test"])
+            action = event.get("Action")
+            if action == "output":
+                running.setdefault(key, retention.buffer()).write(event.get("Output", ""))
+            elif action in self.STATUS_MAP:
+                output = running.pop(key, None)
+                yield self._case_event(key, self.STATUS_MAP[action], event.get("Elapsed"),
+                                       output.getvalue() if output else "", event.get("Time"))
+
+        # tests that never finished, e.g. because the test binary crashed or got killed by the timeout
+        for key, output in running.items():
+            yield self._case_event(key, CaseEvent.TEST_FAILED, None, output.getvalue(), None)
+
+    @staticmethod
+    def _case_event(key: Tuple[str, str], status: int, elapsed: float | None, output: str,
+                    timestamp: str | None) -> CaseEventType:
+        package, test = key
+        # align with what we record from go-junit-report. See path_builder above
+        names = test.split('/')
+        test_path: TestPath = [{'type': 'class', 'name': package.split('/')[-1]}, {'type': 'testcase', 'name': names[0]}]
+        if len(names) > 1:
+            test_path.append({'type': 'subtest', 'name': '/'.join(names[1:])})
+
+        failed = status == CaseEvent.TEST_FAILED
+        return CaseEvent.create(test_path, elapsed or 0.0, status,
+                                stdout="" if failed else output,
+                                stderr=output if failed else "",
+                                timestamp=timestamp)
+
+
 def format_same_bin(s: str) -> List[Dict[str, str]]:
     t = s.split(".")
     return [{"type": "class", "name": t[0]},
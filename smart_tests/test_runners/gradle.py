@@ -9,6 +9,7 @@ from smart_tests.utils.java import junit5_nested_class_path_builder
 from ..args4p.exceptions import BadCmdLineException
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
+from ..testpath import TestPath
 from ..utils.file_name_pattern import jvm_test_pattern
 from . import smart_tests
 
@@ -52,7 +53,7 @@ def subset(
 
     # Only scan if we have source roots
     for root in source_roots:
-        client.scan(root, '**/*', file2test)
+        client.scan(root, '**/*', file2test, cache_key="gradle")
 
     def exclusion_output_handler(subset_tests, rest_tests):
         if client.rest:
@@ -76,12 +77,23 @@ def subset(
     else:
         client.formatter = lambda x: f"--tests {x[0]['name']}"
         client.separator = ' '
+        client.ancestors = package_wildcards
 
     client.same_bin_formatter = lambda s: [{"type": "class", "name": s}]
 
     client.run()
 
 
+def package_wildcards(test_path: TestPath) -> List[TestPath]:
+    """
+    com.foo.BarTest -> com.foo.*, com.*
+
+    In a Gradle test filter, '*' matches '.', so these include sub-packages, too.
+    """
+    parts = test_path[0]['name'].split('.')
+    return [[{"type": "class", "name": ".".join(parts[:i]) + ".*"}] for i in range(len(parts) - 1, 0, -1)]
+
+
 def to_class_file(class_name: str):
     return class_name.replace('.', '/') + '.class'
 
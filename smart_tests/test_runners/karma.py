@@ -1,4 +1,4 @@
-import json
+import posixpath
 from typing import Annotated, Dict, Generator, List
 
 import click
@@ -6,6 +6,7 @@ import click
 from ..args4p import typer
 from ..commands.record.case_event import CaseEvent
 from ..testpath import TestPath
+from ..utils import json_stream
 from . import smart_tests
 
 
@@ -20,6 +21,24 @@ def record_tests(client,
     client.run()
 
 
+def ng_include_dirs(test_path: TestPath) -> List[TestPath]:
+    """
+    src/app/foo.spec.ts -> src/app, src
+
+    Given a directory, `ng test --include` picks up '*.spec.ts' and '*.spec.tsx' files in it, so only those files
+    can be grouped into their directories.
+    """
+    name = test_path[0]['name']
+    if not name.endswith(('.spec.ts', '.spec.tsx')):
+        return []
+    dirs = []
+    d = posixpath.dirname(name)
+    while d and d != '/':
+        dirs.append([{"type": "file", "name": d}])
+        d = posixpath.dirname(d)
+    return dirs
+
+
 @smart_tests.subset
 def subset(client, _with: Annotated[str | None, typer.Option(
         '--with', help='Format output for specific test runner (e.g., "ng" for Angular CLI)')] = None, ):
@@ -39,6 +58,7 @@ def subset(client, _with: Annotated[str | None, typer.Option(
     if _with == 'ng':
         client.formatter = lambda x: "--include={}".format(x[0]['name'])
         client.separator = " "
+        client.ancestors = ng_include_dirs
 
     client.run()
 
@@ -77,53 +97,53 @@ class JSONReportParser:
         self.client = client
 
     def parse_func(self, report_file: str) -> Generator[Dict, None, None]:  # type: ignore
-        data: Dict
-        with open(report_file, 'r') as json_file:
-            try:
-                data = json.load(json_file)
-            except Exception:
-                click.echo(
-                    click.style("Error: Failed to load Json report file: {}".format(report_file), fg='red'), err=True)
-                return
+        try:
+            valid = self._validate_report_format(report_file)
+        except ValueError:
+            click.echo(
+                click.style("Error: Failed to load Json report file: {}".format(report_file), fg='red'), err=True)
+            return
 
-        if not self._validate_report_format(data):
+        if not valid:
             click.echo(
                 "Error: {} does not appear to be valid Karma report format. "
                 "Make sure you are using karma-json-reporter or a compatible reporter.".format(
                     report_file), err=True)
             return
 
-        results = data.get("result", {})
-        for browser_id, specs in results.items():
-            if isinstance(specs, list):
-                for event in self._parse_specs(specs):
-                    yield event
+        with open(report_file, 'r') as json_file:
+            # read one spec at a time, as these reports can get large
+            for _, spec in json_stream.items(json_file, "result.*.item"):
+                yield from self._parse_specs([spec])
 
-    def _validate_report_format(self, data: Dict) -> bool:
-        if not isinstance(data, dict):
-            return False
+    def _validate_report_format(self, report_file: str) -> bool:
+        # the whole report is validated before anything is recorded from it, one spec at a time as well
+        found = False
+        with open(report_file, 'r') as json_file:
+            try:
+                for _, spec in json_stream.items(json_file, "result.*.item", strict=True):
+                    if not self._validate_spec(spec):
+                        return False
+                    found = True
+            except json_stream.UnexpectedType:
+                return False
+        if found:
+            return True
 
-        if "result" not in data:
-            return False
+        # without any specs, "result" is small enough to look at as it is
+        with open(report_file, 'r') as json_file:
+            return any(isinstance(result, dict) for _, result in json_stream.items(json_file, "result"))
 
-        results = data.get("result", {})
-        if not isinstance(results, dict):
+    def _validate_spec(self, spec: Dict) -> bool:
+        if not isinstance(spec, dict):
+            return False
+        # Check for required fields
+        if "suite" not in spec or "time" not in spec:
+            return False
+        # Field suite should have at least one element (filename)
+        suite = spec.get("suite", [])
+        if not isinstance(suite, list) or len(suite) == 0:
             return False
-
-        for browser_id, specs in results.items():
-            if not isinstance(specs, list):
-                return False
-
-            for spec in specs:
-                if not isinstance(spec, dict):
-                    return False
-                # Check for required fields
-                if "suite" not in spec or "time" not in spec:
-                    return False
-                # Field suite should have at least one element (filename)
-                suite = spec.get("suite", [])
-                if not isinstance(suite, list) or len(suite) == 0:
-                    return False
 
         return True
 
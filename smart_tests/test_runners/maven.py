@@ -1,4 +1,5 @@
 import glob
+import json
 import os
 import re
 from typing import Annotated, Dict, List
@@ -22,7 +23,7 @@ from . import smart_tests
 # TODO: inclusion/exclusion are user configurable patterns, so it should be user configurable
 # beyond that and to fully generalize this, there's internal discussion of
 # this at https://launchableinc.atlassian.net/l/c/TXDJnn09
-includes = [uglob.compile(x) for x in [
+includes = [
     # HACK: we check extensions outside the glob. We seem to allow both source
     # file enumeration and class file enumeration
     '**/Test*.*',
@@ -30,24 +31,20 @@ includes = [uglob.compile(x) for x in [
     '**/*Spec.*',
     '**/*Tests.*',
     '**/*TestCase.*'
-]]
-excludes = [uglob.compile(x) for x in [
+]
+excludes = [
     '**/*$*'
-]]
+]
+extensions = ('.java', '.scala', '.kt', '.class', '.groovy')
+
+# all of the above in one go, as this is tested against every file in the source tree
+surefire_matcher = uglob.PathMatcher(includes, excludes)
 
 # Test if a given path name is a test that Surefire recognizes
 
 
 def is_file(f: str) -> bool:
-    if not (f.endswith('.java') or f.endswith(".scala") or f.endswith(".kt") or f.endswith(".class") or f.endswith(".groovy")):
-        return False
-    for p in excludes:
-        if p.fullmatch(f):
-            return False
-    for p in includes:
-        if p.fullmatch(f):
-            return True
-    return False
+    return f.endswith(extensions) and surefire_matcher.match(f)
 
 
 @smart_tests.subset
@@ -81,6 +78,13 @@ def subset(
             compiled_exclude_rules.append(re.compile(rule))
         except re.error as e:
             raise BadCmdLineException("Invalid regular expression '{}': {}".format(rule, e))
+    # one search per test instead of one per rule, unless numbered backreferences would get renumbered
+    if len(compiled_exclude_rules) > 1 and not any(re.search(r'\\[1-9]', r.pattern) for r in compiled_exclude_rules):
+        try:
+            compiled_exclude_rules = [uglob.union(compiled_exclude_rules)]
+        except re.error:
+            # rules that can't be combined, e.g. the ones with global flags like '(?i)'. Try them one by one
+            pass
 
     def file2class_test_path(f: str) -> List[Dict[str, str]]:
         # remove extension
@@ -142,7 +146,7 @@ def subset(
                         client.test_paths.append(path)
     else:
         for root in source_roots:
-            client.scan(root, '**/*', file2test)
+            client.scan(root, '**/*', file2test, cache_key=json.dumps(["maven", exclude_rules]))
 
     client.same_bin_formatter = lambda s: [{"type": "class", "name": s}]
 
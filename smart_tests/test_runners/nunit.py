@@ -1,9 +1,9 @@
-from typing import Annotated, Callable, Dict, List
+from typing import Annotated, Dict, Iterator, List, Tuple
 from xml.etree import ElementTree as ET
 
 import smart_tests.args4p.typer as typer
 from smart_tests.commands.record.case_event import CaseEvent
-from smart_tests.testpath import TestPath, parse_test_path, unparse_test_path
+from smart_tests.testpath import TestPath
 
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
@@ -32,19 +32,36 @@ and this option expects test names to be in "Foo.Bar+Zot" format.
 """
 
 
-def build_path(e: ET.Element, parent: ET.Element):
-    pp: TestPath = []
-    parent_start_time = parent.attrib.get('start-time')
-    if parent_start_time is not None and e.attrib.get('start-time') is None:
-        # the 'start-time' attribute is normally on <test-case> but apparently not always,
-        # so we try to use the nearest ancestor as an approximate
-        e.set('start-time', parent_start_time)
-    parent_path = parent.attrib.get('path')
-    if parent_path is not None:
-        pp = parse_test_path(parent_path)
+def _split_filepath(path: str) -> List[str]:
+    # Supports Linux and Windows
+    if '/' in path:
+        return path.split('/')
+    else:
+        return path.split('\\')
+
+
+def _component(type: str, name: str) -> Dict[str, str]:
+    if type == 'Assembly':
+        # "Assembly" type contains full path at a customer's environment
+        # remove file path prefix in Assembly
+        name = _split_filepath(name)[-1]
+    if type == 'TestFixture':
+        # Nunit produces different XML structure report between without --explore option and without it.
+        # So we replace TestFixture to TestSuite to avid this difference problem.
+        type = 'TestSuite'
+    return {'type': type, 'name': name}
+
+
+def build_path(e: ET.Element, parent_path: TestPath) -> TestPath:
+    """
+    Builds the test path of the given <test-suite>/<test-case> from the test path of its parent.
+
+    Components of 'parent_path' are shared with the returned path, not copied, so don't modify them.
+    """
+    pp = parent_path
     if e.tag == "test-suite":
         # <test-suite>s form a nested tree structure so capture those in path
-        pp = pp + [{'type': e.attrib['type'], 'name': e.attrib['name']}]
+        pp = pp + [_component(e.attrib['type'], e.attrib['name'])]
     if e.tag == "test-case":
         # work around a bug in NUnitXML.Logger.
         # see nunit-reporter-bug-with-nested-type.xml test case
@@ -62,67 +79,44 @@ def build_path(e: ET.Element, parent: ET.Element):
                 # it really should be test suite. So we patch that up too. This is going beyond what's minimally required
                 # to make subset work, because type information won't impact how the test path is printed, but
                 # when NUnitXML.Logger eventually fixes this bug, we don't want that to produce different test paths.
-                {'type': 'TestSuite', 'name': pp[-1]['name']},
+                _component('TestSuite', pp[-1]['name']),
                 # Here, we need to insert the missing TestFixture=Outer+Inner.
                 # I chose TestFixture because that's what nunit console runner (which we believe is handling it correctly)
                 # chooses as its type.
-                {'type': 'TestFixture', 'name': methodname[0:idx]}
+                _component('TestFixture', methodname[0:idx])
             ]
 
-        pp = pp + [{'type': 'TestCase', 'name': e.attrib['name']}]
+        pp = pp + [_component('TestCase', e.attrib['name'])]
 
-    if len(pp) > 0:
-        def split_filepath(path: str) -> List[str]:
-            # Supports Linux and Windows
-            if '/' in path:
-                return path.split('/')
-            else:
-                return path.split('\\')
-
-        # "Assembly" type contains full path at a customer's environment
-        # remove file path prefix in Assembly
-        e.set('path', unparse_test_path([
-            {**path, 'name': split_filepath(path['name'])[-1]}
-            if path['type'] == 'Assembly'
-            else path
-            for path in pp
-        ]))
+    return pp
 
 
 def nunit_parse_func(report: str):
-    events = []
-
     # parse <test-case> element into CaseEvent
-    def on_element(e: ET.Element, parent: ET.Element):
-        build_path(e, parent)
-        if e.tag == "test-case":
-            result = e.attrib.get('result')
-            status = CaseEvent.TEST_FAILED
-            stderr: List[str] = []
-            if result == 'Passed':
-                status = CaseEvent.TEST_PASSED
-            elif result == 'Skipped':
-                status = CaseEvent.TEST_SKIPPED
-            else:
-                failure = e.find('failure')
-                if failure is not None:
-                    message = failure.find('message')
-                    if message is not None and message.text is not None:
-                        stderr.append(message.text)
-                    stack_trace = failure.find('stack-trace')
-                    if stack_trace is not None and stack_trace.text is not None:
-                        stderr.append(stack_trace.text)
-
-            events.append(CaseEvent.create(
-                test_path=_replace_fixture_to_suite(e.attrib['path']),  # type: ignore
-                duration_secs=float(e.attrib['duration']),
-                status=status,
-                timestamp=str(e.attrib.get('start-time')),
-                stderr='\n'.join(stderr)))  # timestamp is already iso-8601 formatted
-
-    _parse_dfs_element(report=report, on_element=on_element)
-    # return the obtained events as a generator
-    return (x for x in events)
+    for e, test_path, start_time in _parse_test_cases(report):
+        result = e.attrib.get('result')
+        status = CaseEvent.TEST_FAILED
+        stderr: List[str] = []
+        if result == 'Passed':
+            status = CaseEvent.TEST_PASSED
+        elif result == 'Skipped':
+            status = CaseEvent.TEST_SKIPPED
+        else:
+            failure = e.find('failure')
+            if failure is not None:
+                message = failure.find('message')
+                if message is not None and message.text is not None:
+                    stderr.append(message.text)
+                stack_trace = failure.find('stack-trace')
+                if stack_trace is not None and stack_trace.text is not None:
+                    stderr.append(stack_trace.text)
+
+        yield CaseEvent.create(
+            test_path=test_path,
+            duration_secs=float(e.attrib['duration']),
+            status=status,
+            timestamp=str(start_time),  # timestamp is already iso-8601 formatted
+            stderr='\n'.join(stderr))
 
 
 @smart_tests.subset
@@ -138,13 +132,9 @@ def subset(
     Parse an XML file produced from NUnit --explore option to list up all the viable test cases
     """
 
-    def on_element(e: ET.Element, parent: ET.Element):
-        build_path(e, parent)
-        if e.tag == "test-case":
-            client.test_path(_replace_fixture_to_suite(e.attrib['path']))
-
     for report_xml in report_xmls:
-        _parse_dfs_element(report=report_xml, on_element=on_element)
+        for _, test_path, _ in _parse_test_cases(report_xml):
+            client.test_path(test_path)
 
     # join all the names except when the type is ParameterizedMethod, because in that case test cases have
     # the name of the test method in it and ends up creating duplicates
@@ -164,27 +154,45 @@ def record_tests(
     smart_tests.CommonRecordTestImpls.load_report_files(client=client, source_roots=report_xml)
 
 
-"""
-    Nunit produces different XML structure report between without --explore option and without it.
-    So we replace TestFixture to TestSuite to avid this difference problem.
-"""
-
-
-def _replace_fixture_to_suite(test_path_str: str) -> List[Dict[str, str]]:
-    paths = parse_test_path(test_path_str)
-    for path in paths:
-        if path["type"] == "TestFixture":
-            path["type"] = "TestSuite"
-
-    return paths
-
-
-def _parse_dfs_element(report: str, on_element: Callable[[ET.Element, ET.Element], None]):
-    tree = ET.parse(source=report)
-    root = tree.getroot()
-    stack: List[ET.Element] = [root]
-    while len(stack) > 0:
-        element = stack.pop()
-        for test_suite in element.findall('test-suite') + element.findall('test-case'):
-            on_element(test_suite, element)
-            stack.append(test_suite)
+def _parse_test_cases(report: str) -> Iterator[Tuple[ET.Element, TestPath, str | None]]:
+    """
+    Walks nested <test-suite>s in one pass, and yields each <test-case> with its test path and start time
+    as soon as the element is closed. Elements are discarded once processed.
+    """
+    # (element, its test path, its start time) of elements we are in. The test path is None for elements that
+    # aren't a part of the <test-suite> tree
+    stack: List[Tuple[ET.Element, TestPath | None, str | None]] = []
+    # <test-case> we are in, whose subtree has to stay until it's closed
+    test_case: ET.Element | None = None
+
+    for event, e in ET.iterparse(report, events=("start", "end")):
+        if event == "start":
+            if not stack:
+                stack.append((e, [], None))
+                continue
+
+            parent, parent_path, parent_start_time = stack[-1]
+            path: TestPath | None = None
+            start_time = None
+            if parent_path is not None and (len(stack) == 1 or parent.tag == "test-suite") \
+                    and e.tag in ("test-suite", "test-case"):
+                path = build_path(e, parent_path)
+                # the 'start-time' attribute is normally on <test-case> but apparently not always,
+                # so we try to use the nearest ancestor as an approximate
+                start_time = e.attrib.get('start-time')
+                if start_time is None:
+                    start_time = parent_start_time
+                if e.tag == "test-case" and test_case is None:
+                    test_case = e
+            stack.append((e, path, start_time))
+            continue
+
+        _, path, start_time = stack.pop()
+        if test_case is not None and e is test_case:
+            if path:
+                yield test_case, path, start_time
+            test_case = None
+
+        if test_case is None and stack:
+            # done with this subtree
+            stack[-1][0].remove(e)
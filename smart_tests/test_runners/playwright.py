@@ -2,9 +2,8 @@
 # The the test runner to support playwright junit and JSON report format.
 # https://playwright.dev/
 #
-import json
 from pathlib import Path
-from typing import Annotated, Dict, List
+from typing import Annotated, Dict, Generator, List, Tuple
 
 import click
 from junitparser import TestCase, TestSuite  # type: ignore
@@ -15,6 +14,7 @@ from ..args4p.exceptions import BadCmdLineException
 from ..commands.record.case_event import CaseEvent, CaseEventGenerator
 from ..commands.record.tests import RecordTests
 from ..testpath import TestPath, prepend_path_if_missing, relative_subpath
+from ..utils import json_stream
 from . import smart_tests
 
 TEST_CASE_DELIMITER = " › "
@@ -170,25 +170,42 @@ class JSONReportParser:
         self.client = client
 
     def parse_func(self, report_file: str) -> CaseEventGenerator:
-        data: Dict[str, Dict]
-        with open(report_file, 'r') as json_file:
+        def items(json_file) -> Generator[Tuple[str, Dict], None, None]:
             try:
-                data = json.load(json_file)
-            except Exception as e:
+                yield from json_stream.items(json_file, "config", "suites.item")
+            except ValueError as e:
                 raise Exception(f"Can't read JSON format report file {report_file}. Make sure to confirm report file.") from e
 
-        suites: List[Dict[str, Dict]] = list(data.get("suites", []))
-        if len(suites) == 0:
+        # Read one root suite, i.e. one test file, at a time, as these reports can get large.
+        # Playwright writes `config` before `suites`, but if it doesn't, hold suites until we see it.
+        report: Dict[str, Dict] = {}
+        pending: List[Dict[str, Dict]] = []
+        found = False
+        with open(report_file, 'r') as json_file:
+            for path, value in items(json_file):
+                if path == "config":
+                    report["config"] = value
+                    continue
+                found = True
+                if "config" in report:
+                    yield from self._parse_root_suite(report, value)
+                else:
+                    pending.append(value)
+
+        if not found:
             click.echo(f"Can't find test results from {report_file}. Make sure to confirm report file.", err=True)
 
-        root_dir_relpath = self._compute_root_dir_relpath(data)
-        config_dir = self._config_dir(data)
-        for s in suites:
-            # The title of the root suite object contains the file name.
-            test_file = self._resolve_test_file(str(s.get("title", "")), root_dir_relpath, config_dir)
+        for s in pending:
+            yield from self._parse_root_suite(report, s)
+
+    def _parse_root_suite(self, report: Dict, suite: Dict[str, Dict]) -> CaseEventGenerator:
+        root_dir_relpath = self._compute_root_dir_relpath(report)
+        config_dir = self._config_dir(report)
+        # The title of the root suite object contains the file name.
+        test_file = self._resolve_test_file(str(suite.get("title", "")), root_dir_relpath, config_dir)
 
-            for event in self._parse_suites(test_file, s, []):
-                yield event
+        for event in self._parse_suites(test_file, suite, []):
+            yield event
 
     def _compute_root_dir_relpath(self, report: Dict) -> str:
         """
@@ -1,10 +1,14 @@
 import glob
+import hashlib
 import json
 import os
 import pathlib
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Annotated, Generator, Iterable, List, Optional
+from typing import Annotated, Any, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 import click
 from junitparser import Properties, TestCase  # type: ignore
@@ -16,8 +20,15 @@ from smart_tests.testpath import TestPath
 from ..args4p.exceptions import BadCmdLineException
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
+from ..utils.logger import Logger
 from . import smart_tests
 
+COLLECT_CACHE_VERSION = 1
+# pytest configuration files in the rootdir
+_CONFIG_FILES = ("pytest.ini", ".pytest.ini", "pyproject.toml", "tox.ini", "setup.cfg")
+# pytest plugin for ParallelCollector. It imports pytest, so we can't import it ourselves
+_COLLECT_PLUGIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pytest_collect_plugin.py")
+
 # Please specify junit_family=legacy for pytest report format. if using pytest version 6 or higher.
 # - pytest has changed its default test report format from xunit1 to xunit2 since version 6.
 #     - https://docs.pytest.org/en/latest/deprecations.html#junit-family-default-value-change-to-xunit2
@@ -57,7 +68,19 @@ def subset(
         multiple=True,
         required=False,
     )] = None,
+    jobs: Annotated[int, typer.Option(
+        "--jobs",
+        help="Collect tests from source roots in this many pytest processes in parallel",
+        metavar="N"
+    )] = 1,
 ):
+    """
+    With --discovery-cache, the tests collected from source roots are remembered per test file, so that later runs
+    only run pytest on test files that have changed, or whose conftest.py or pytest configuration have.
+    """
+    if jobs < 1:
+        raise BadCmdLineException("--jobs must be at least 1")
+
     def _add_testpaths(lines: Iterable[str]):
         for line in lines:
             line = line.rstrip()
@@ -70,19 +93,220 @@ def subset(
 
     if not source_roots:
         _add_testpaths(client.stdin())
+    elif jobs > 1 or client.discovery_cache is not None:
+        cache_dir = client.discovery_cache.cache_dir if client.discovery_cache is not None else None
+        _add_testpaths(ParallelCollector(source_roots, jobs, cache_dir).collect())
     else:
-        command = ["pytest", "--collect-only", "-q"]
-        command.extend(source_roots)
-        try:
-            result = subprocess.run(command, stdout=subprocess.PIPE, universal_newlines=True)
-            _add_testpaths(result.stdout.split(os.linesep))
-        except FileNotFoundError:
-            raise BadCmdLineException("pytest command not found. Please check the path.")
+        _add_testpaths(_collect_only(["pytest", "--collect-only", "-q", *source_roots]))
 
     client.formatter = _pytest_formatter
     client.run()
 
 
+def _collect_only(command: List[str], env: Dict[str, str] | None = None) -> Iterator[str]:
+    """
+    Runs `pytest --collect-only -q` and yields lines of the list of node IDs as pytest prints them, leaving out
+    whatever else pytest and its plugins print around them
+    """
+    try:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True, env=env)
+    except FileNotFoundError:
+        raise BadCmdLineException("pytest command not found. Please check the path.")
+    with proc:
+        for line in proc.stdout:  # type: ignore
+            # collection errors, warnings, and the like come after node IDs, each in a section that starts with
+            # a "=== ... ===" line, and may well mention node IDs themselves
+            if line.startswith("="):
+                break
+            # a node ID is never indented, and always names an item in a file
+            if line.rstrip() and not line[0].isspace() and "::" in line:
+                yield line
+        # drain the rest, so that pytest doesn't block on writing to a full pipe
+        for _ in proc.stdout:  # type: ignore
+            pass
+
+
+class _CollectResult(NamedTuple):
+    # node IDs in the order pytest printed them
+    nodeids: List[str]
+    rootdir: str | None
+    # node ID of each test module collected to its path
+    modules: Dict[str, str]
+    # node IDs of collectors that failed to collect
+    failed: Set[str]
+
+
+class ParallelCollector:
+    """
+    Runs `pytest --collect-only` over the source roots in 'jobs' processes, each collecting a share of the test
+    files. Every process is given the same arguments, so they all agree on the rootdir, configuration, and conftest.py
+    files. Only which test files each process collects differs, which a small pytest plugin takes care of.
+
+    Given 'cache_dir', node IDs are remembered per test file, along with a hash of the test file, the conftest.py
+    files of its directory and above up to the rootdir, and the pytest configuration files of the rootdir. Later runs
+    tell pytest to skip test files whose hash hasn't changed, and take their node IDs from the cache. Test files that
+    failed to collect are never cached.
+
+    Node IDs are listed in the order of their file paths, which matches the order pytest collects files in a
+    directory.
+    """
+
+    def __init__(self, source_roots: List[str], jobs: int, cache_dir: str | None):
+        self.source_roots = source_roots
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+
+    def collect(self) -> List[str]:
+        header = {"version": COLLECT_CACHE_VERSION, "cwd": os.getcwd(), "sourceRoots": self.source_roots}
+        cache_file = None
+        cached: Dict[str, Any] = {}
+        if self.cache_dir:
+            cache_file = os.path.join(
+                self.cache_dir,
+                "pytest-collect-" + hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()[:32] + ".json")
+            cached = self._load(cache_file, header)
+
+        rootdir = cached.get("rootdir")
+        files: Dict[str, Dict[str, Any]] = {}
+        if rootdir:
+            keys = _CollectKeys(rootdir)
+            for f, entry in cached["files"].items():
+                if keys.of(entry["path"]) == entry["key"]:
+                    files[f] = entry
+
+        result = self._run([e["path"] for e in files.values()])
+        if files and result.rootdir != rootdir:
+            # the rootdir has moved since, so the cache is for a different set of node IDs
+            files = {}
+            result = self._run([])
+
+        collected: Dict[str, List[str]] = {}
+        for nodeid in result.nodeids:
+            collected.setdefault(nodeid.split("::", 1)[0], []).append(nodeid)
+
+        if result.rootdir:
+            keys = _CollectKeys(result.rootdir)
+            for f, path in result.modules.items():
+                key = None if f in result.failed else keys.of(path)
+                if key is not None:
+                    files[f] = {"path": path, "key": key, "nodeids": collected.get(f, [])}
+                else:
+                    files.pop(f, None)
+            if cache_file:
+                self._save(cache_file, {**header, "rootdir": result.rootdir, "files": files})
+
+        for f, entry in files.items():
+            collected.setdefault(f, entry["nodeids"])
+        return [nodeid for f in sorted(collected, key=lambda f: f.split("/")) for nodeid in collected[f]]
+
+    def _run(self, skip: List[str]) -> _CollectResult:
+        with tempfile.TemporaryDirectory() as tempdir:
+            # pytest may not be in the same environment as us. Load the plugin from a copy
+            shutil.copyfile(_COLLECT_PLUGIN, os.path.join(tempdir, "_smart_tests_collect.py"))
+            skip_file = os.path.join(tempdir, "skip.txt")
+            with open(skip_file, "w", encoding="utf-8", errors="surrogateescape") as f:
+                f.write("\n".join(skip))
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(p for p in [tempdir, os.environ.get("PYTHONPATH")] if p)
+
+            def run_shard(i: int) -> Tuple[List[str], Dict[str, Any]]:
+                report_file = os.path.join(tempdir, f"report-{i}.json")
+                command = ["pytest", "--collect-only", "-q", "-p", "_smart_tests_collect",
+                           f"--smart-tests-shard={i}/{self.jobs}", f"--smart-tests-skip={skip_file}",
+                           f"--smart-tests-report={report_file}", *self.source_roots]
+                nodeids = [line.rstrip() for line in _collect_only(command, env)]
+                try:
+                    with open(report_file, encoding="utf-8") as f:
+                        return nodeids, json.load(f)
+                except (OSError, ValueError):
+                    # pytest failed before it got to collect anything
+                    return nodeids, {}
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                shards = list(executor.map(run_shard, range(self.jobs)))
+
+        result = _CollectResult([], None, {}, set())
+        for nodeids, report in shards:
+            result.nodeids.extend(nodeids)
+            result.modules.update(report.get("modules", {}))
+            result.failed.update(report.get("failed", []))
+        rootdirs = {report.get("rootdir") for _, report in shards}
+        # if any of them failed, we don't know for sure
+        return result._replace(rootdir=rootdirs.pop() if len(rootdirs) == 1 else None)
+
+    def _load(self, cache_file: str, header: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            Logger().debug(f"Ignoring the broken pytest collection cache {cache_file}: {e}")
+            return {}
+
+        if not isinstance(data, dict) or any(data.get(k) != v for k, v in header.items()) or \
+                not isinstance(data.get("rootdir"), str) or not isinstance(data.get("files"), dict):
+            return {}
+        for entry in data["files"].values():
+            if not isinstance(entry, dict) or not isinstance(entry.get("path"), str) or \
+                    not isinstance(entry.get("key"), str) or not isinstance(entry.get("nodeids"), list):
+                return {}
+        return data
+
+    def _save(self, cache_file: str, data: Dict[str, Any]):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)  # type: ignore
+            # write to a temporary file first, so that a concurrent run never sees a half-written cache
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".pytest-collect-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, cache_file)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            # the cache is an optimization. Failing to write it shouldn't fail the command
+            Logger().warning(f"Failed to write the pytest collection cache {cache_file}: {e}")
+
+
+class _CollectKeys:
+    """Hashes of what decides the tests pytest collects from a test file"""
+
+    def __init__(self, rootdir: str):
+        self.rootdir = rootdir
+        self.dirs: Dict[str, bytes] = {}
+
+    def of(self, path: str) -> str | None:
+        content = _read(path)
+        if content is None:
+            return None
+        return hashlib.sha256(self._dir(os.path.dirname(path)) + content).hexdigest()
+
+    def _dir(self, d: str) -> bytes:
+        """Hash of conftest.py files in 'd' and above up to the rootdir, and configuration files in the rootdir"""
+        digest = self.dirs.get(d)
+        if digest is None:
+            h = hashlib.sha256()
+            parent = os.path.dirname(d)
+            if d == self.rootdir or parent == d:
+                for f in _CONFIG_FILES:
+                    h.update(hashlib.sha256(_read(os.path.join(d, f)) or b"").digest())
+            else:
+                h.update(self._dir(parent))
+            h.update(hashlib.sha256(_read(os.path.join(d, "conftest.py")) or b"").digest())
+            digest = self.dirs[d] = h.digest()
+        return digest
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
 def _parse_pytest_nodeid(nodeid: str) -> TestPath:
     data = nodeid.split("::")
     file = data[0]
@@ -361,10 +585,6 @@ class PytestJSONReportParser:
                 start_timestamp_iso_format = _timestamp_to_iso(start_timestamp)
                 end_timestamp_iso_format = _timestamp_to_iso(stop_timestamp)
 
-                print(
-                    f"DEBUG pytest timing start={start_timestamp_iso_format}, stop={end_timestamp_iso_format}"
-                )
-
                 event_data = {}
                 if start_timestamp_iso_format:
                     event_data["start_timestamp"] = start_timestamp_iso_format
@@ -1,7 +1,7 @@
 import datetime
 import json
 import sys
-from typing import Annotated, Generator, List
+from typing import IO, Annotated, Any, Dict, Generator, List, NoReturn
 
 import click
 import dateutil.parser
@@ -10,11 +10,16 @@ import smart_tests.args4p.typer as typer
 
 from ..args4p.exceptions import BadCmdLineException
 from ..commands.record.case_event import CaseEvent, CaseEventType
-from ..commands.record.tests import RecordTests
+from ..commands.record.tests import STDIN, RecordTests
 from ..commands.subset import Subset
 from ..testpath import TestPath, parse_test_path, unparse_test_path
+from ..utils import json_stream
+from ..utils.chunker import FLUSH, with_flushes
 from . import smart_tests
 
+# seconds a test result read with --stream waits at most before it's sent
+STREAM_FLUSH_INTERVAL = 5
+
 
 def _needs_test_path_file(client: Subset) -> bool:
     """Check if the client requires test paths to be provided via a file."""
@@ -73,6 +78,11 @@ def record_tests(
         multiple=True,
         help="Test result files (JSON or JUnit XML)"
     )],
+    stream: Annotated[bool, typer.Option(
+        "--stream",
+        help="Read test results as newline delimited JSON, one test case per line, while they are being written. "
+             "Use '-' to read them from the standard input"
+    )] = False,
 ):
     """Record test results
 
@@ -182,56 +192,106 @@ def record_tests(
       ]
     }
 
+    ## Streaming
+
+    With --stream, TEST_RESULT_FILE is read as newline delimited JSON, where each line is one test case
+    in the format above, e.g.
+
+    {"testPath": "file=a.py#class=classA", "duration": 42, "status": "TEST_PASSED"}
+
+    Use '-' to read from the standard input, or pass a named pipe. Test results are sent as they are read,
+    while the test harness keeps writing more. A test result waits at most a few seconds to be sent, however
+    slowly the harness writes them.
+
     ## JUnit XML TestPath mapping
 
     If the file path ends with '.xml', the command parses the file as a JUnit XML file. When this mode is used the subset input
     TestPath should look like 'class={classname}#testcase={testcase}'.
     """
 
-    def fail(msg):
+    def fail(msg: str) -> NoReturn:
         click.secho(msg, fg='red', err=True)
         raise typer.Exit(1)
 
+    default_created_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    def case_event(case: Dict[str, Any], test_result_file: str) -> CaseEventType:
+        test_path_components: TestPath | None = case.get('testPathComponents', None)
+        test_path: str | None = case.get('testPath', None)
+        if test_path_components and test_path:
+            fail("Specifying both testPath and testPathComponents fields is invalid.")
+        if test_path:
+            test_path_components = parse_test_path(test_path)
+        if test_path_components is None:
+            fail("Missing testPath or testPathComponents field in the test case.")
+        status = case['status']
+        duration_secs = case.get('duration', 0)
+        if isinstance(duration_secs, str):
+            try:
+                duration_secs = float(duration_secs)
+            except ValueError:
+                fail(f"The duration of {test_path_components} in {test_result_file} isn't a valid format (was {duration_secs}). Make sure set a valid duration")  # noqa
+
+        created_at = case.get('createdAt', default_created_at)
+
+        if status not in CaseEvent.STATUS_MAP:
+            fail(
+                f"The status of {test_path_components} should be one of {list(CaseEvent.STATUS_MAP.keys())} (was {status})")
+
+        if duration_secs < 0:
+            fail(f"The duration of {test_path_components} should be positive (was {duration_secs})")
+        dateutil.parser.parse(created_at)
+        metadata = case.get('data', None)
+
+        return CaseEvent.create(
+            test_path=test_path_components,
+            duration_secs=duration_secs,
+            status=CaseEvent.STATUS_MAP[status],
+            stdout=case.get('stdout', ''),
+            stderr=case.get('stderr', ''),
+            timestamp=created_at,
+            data=metadata)
+
     def parse_json(test_result_file: str) -> Generator[CaseEventType, None, None]:
         with open(test_result_file, 'r') as f:
-            doc = json.load(f)
-        default_created_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        for case in doc['testCases']:
-            test_path_components: TestPath = case.get('testPathComponents', None)
-            test_path: str = case.get('testPath', None)
-            if test_path_components is None and test_path is None:
-                fail("Missing testPath or testPathComponents field in the test case.")
-            if test_path_components and test_path:
-                fail("Specifying both testPath and testPathComponents fields is invalid.")
-            if test_path:
-                test_path_components = parse_test_path(test_path)
-            status = case['status']
-            duration_secs = case.get('duration', 0)
-            if isinstance(duration_secs, str):
+            # one test case at a time, as these files can get large
+            for _, case in json_stream.items(f, "testCases.item"):
+                yield case_event(case, test_result_file)
+
+    def parse_ndjson(test_result_file: str) -> Generator[CaseEventType, None, None]:
+        def parse(f: IO[str]) -> Generator[CaseEventType, None, None]:
+            # one line at a time, so that we can send test results while the producer is still writing more.
+            # A slow producer's results are sent after a while, rather than when enough of them have piled up
+            n = 0
+            for line in with_flushes(f, STREAM_FLUSH_INTERVAL):
+                if line is FLUSH:
+                    yield FLUSH  # type: ignore
+                    continue
+                n += 1
+                if not line.strip():
+                    continue
                 try:
-                    duration_secs = float(duration_secs)
-                except ValueError:
-                    fail(f"The duration of {test_path_components} in {test_result_file} isn't a valid format (was {duration_secs}). Make sure set a valid duration")  # noqa
-
-            created_at = case.get('createdAt', default_created_at)
-
-            if status not in CaseEvent.STATUS_MAP:
-                fail(
-                    f"The status of {test_path_components} should be one of {list(CaseEvent.STATUS_MAP.keys())} (was {status})")
-
-            if duration_secs < 0:
-                fail(f"The duration of {test_path_components} should be positive (was {duration_secs})")
-            dateutil.parser.parse(created_at)
-            metadata = case.get('data', None)
-
-            yield CaseEvent.create(
-                test_path=test_path_components,
-                duration_secs=duration_secs,
-                status=CaseEvent.STATUS_MAP[status],
-                stdout=case.get('stdout', ''),
-                stderr=case.get('stderr', ''),
-                timestamp=created_at,
-                data=metadata)
+                    case = json.loads(line)
+                except ValueError as e:
+                    fail(f"Line {n} of {test_result_file} isn't a valid JSON: {e}")
+                if not isinstance(case, dict):
+                    fail(f"Line {n} of {test_result_file} isn't a JSON object")
+                yield case_event(case, test_result_file)
+
+        if test_result_file == STDIN:
+            yield from parse(sys.stdin)
+        else:
+            with open(test_result_file, 'r') as f:
+                yield from parse(f)
+
+    if stream:
+        # the test results are being written as we read them, so the file timestamp is meaningless
+        client.check_timestamp = False
+        client.parse_func = parse_ndjson
+        for test_result_file in test_result_files:
+            client.report(test_result_file)
+        client.run()
+        return
 
     for test_result_file in test_result_files:
         if not test_result_file.endswith('.xml'):
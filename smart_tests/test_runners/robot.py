@@ -1,85 +1,126 @@
 from datetime import datetime
-from typing import Annotated, List
+from typing import Annotated, Iterator, List, NamedTuple
 from xml.etree import ElementTree as ET
 
-from junitparser import JUnitXml  # type: ignore
-
 import smart_tests.args4p.typer as typer
 
+from ..commands.record.case_event import CaseEvent, CaseEventGenerator
 from ..commands.record.tests import RecordTests
 from ..commands.subset import Subset
 from ..testpath import TestPath
 from . import smart_tests
 
-
-def parse_func(p: str) -> ET.ElementTree:
-
-    def parse_suite(suite: ET.Element):
-        DATETIME_FORMAT = '%Y%m%d %H:%M:%S.%f'
-
-        suite_name = suite.get('name')
-        for test in suite.iter("test"):
-            test_name = test.get('name')
-
-            status_node = test.find('status')
-            status = status_node.get(
-                'status') if status_node is not None else None
-
-            nested_status_node = test.find('./kw/status')
-            nested_status = nested_status_node.get('status') if nested_status_node is not None else None
-
+SUITE_TAG_NAME = "suite"
+TEST_TAG_NAME = "test"
+KEYWORD_TAG_NAME = "kw"
+STATUS_TAG_NAME = "status"
+MESSAGE_TAG_NAME = "msg"
+
+# RF < 7.0 timestamps
+DATETIME_FORMAT = '%Y%m%d %H:%M:%S.%f'
+
+
+class RobotTestResult(NamedTuple):
+    suite_name: str
+    test_name: str
+    status: str
+    # status of the first keyword of the test
+    keyword_status: str | None
+    duration_secs: float
+    # the first message logged directly by the keywords of the test
+    message: str
+
+
+def _duration_secs(status: ET.Element) -> float:
+    # RF 7.0+: elapsed attribute in seconds
+    elapsed = status.get('elapsed')
+    if elapsed is not None:
+        return float(elapsed)
+
+    # RF < 7.0: starttime/endtime attributes
+    start_time = status.get('starttime', '')
+    end_time = status.get('endtime', '')
+    if start_time and end_time:
+        try:
+            return (datetime.strptime(end_time, DATETIME_FORMAT) - datetime.strptime(start_time, DATETIME_FORMAT)).total_seconds()
+        except ValueError:
+            return 0
+    return 0
+
+
+def parse_tests(p: str) -> Iterator[RobotTestResult]:
+    """
+    Reads test results from Robot Framework's output.xml, yielding each test as soon as its </test> is read.
+
+    output.xml of a long test run can get gigabytes large because of keyword logs, so subtrees are discarded as soon
+    as they are processed, keeping only what's needed from them.
+    """
+    # elements we are in
+    stack: List[ET.Element] = []
+    # suites we are in. Only suites that nest directly from the root count, not the ones in <statistics> etc.
+    suites: List[ET.Element] = []
+    test: ET.Element | None = None
+    status: ET.Element | None = None
+    keyword_status: str | None = None
+    message: str | None = None
+
+    for event, elem in ET.iterparse(p, events=("start", "end")):
+        if event == "start":
+            if elem.tag == SUITE_TAG_NAME and (len(stack) == 1 or (suites and stack[-1] is suites[-1])):
+                suites.append(elem)
+            elif elem.tag == TEST_TAG_NAME and suites and test is None:
+                test = elem
+                status = keyword_status = message = None
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+        in_test_keyword = test is not None and parent is not None and parent.tag == KEYWORD_TAG_NAME \
+            and len(stack) > 1 and stack[-2] is test
+
+        if elem is test:
             if status is not None:
-                duration_seconds = None
-
-                if status_node is not None:
-                    # RF 7.0+: elapsed attribute in seconds
-                    elapsed_str = status_node.get('elapsed')
-                    if elapsed_str is not None:
-                        duration_seconds = float(elapsed_str)
-                    else:
-                        # RF < 7.0: starttime/endtime attributes
-                        start_time_str = status_node.get('starttime', '')
-                        end_time_str = status_node.get('endtime', '')
-                        if start_time_str and end_time_str:
-                            try:
-                                start_time = datetime.strptime(start_time_str, DATETIME_FORMAT)
-                                end_time = datetime.strptime(end_time_str, DATETIME_FORMAT)
-                                duration_seconds = (end_time - start_time).total_seconds()
-                            except ValueError:
-                                duration_seconds = 0
-
-                testcase = ET.SubElement(testsuite, "testcase", {
-                    "name": str(test_name),
-                    "classname": str(suite_name),
-                    "time": str(duration_seconds) if duration_seconds is not None else '0',
-                })
-
-                if status == "FAIL":
-                    failure = ET.SubElement(testcase, 'failure')
-
-                    msg = test.find('kw/msg')
-                    failure.text = msg.text if msg is not None else ''
-                if status == "NOT_RUN" or nested_status == 'NOT_RUN':
-                    skipped = ET.SubElement(testcase, "skipped")  # noqa: F841
-
-    def find_leaf_suites(suite: ET.Element):
-        nested = suite.findall(SUITE_TAG_NAME)
-        if not nested:
-            return [suite]
-        leaves = []
-        for child in nested:
-            leaves.extend(find_leaf_suites(child))
-        return leaves
-
-    original_tree = ET.parse(p)
-    testsuite = ET.Element("testsuite", {"name": "robot"})
-
-    SUITE_TAG_NAME = "suite"
-    for top_suite in original_tree.findall(SUITE_TAG_NAME):
-        for leaf_suite in find_leaf_suites(top_suite):
-            parse_suite(leaf_suite)
-
-    return ET.ElementTree(testsuite)
+                yield RobotTestResult(
+                    suite_name=str(suites[-1].get('name')),
+                    test_name=str(test.get('name')),
+                    status=str(status.get('status')),
+                    keyword_status=keyword_status,
+                    duration_secs=_duration_secs(status),
+                    message=message or '',
+                )
+            test = status = None
+        elif suites and elem is suites[-1]:
+            suites.pop()
+        elif elem.tag == STATUS_TAG_NAME:
+            if test is not None and parent is test and status is None:
+                status = elem
+            elif in_test_keyword and keyword_status is None:
+                keyword_status = elem.get('status')
+        elif elem.tag == MESSAGE_TAG_NAME:
+            if in_test_keyword and message is None:
+                message = elem.text or ''
+
+        if parent is not None:
+            # done with this subtree. Since every element goes away as soon as it ends, it's always the only child
+            parent.remove(elem)
+
+
+def parse_func(p: str) -> CaseEventGenerator:
+    for r in parse_tests(p):
+        if r.status == "FAIL":
+            status = CaseEvent.TEST_FAILED
+        elif r.status == "NOT_RUN" or r.keyword_status == "NOT_RUN":
+            status = CaseEvent.TEST_SKIPPED
+        else:
+            status = CaseEvent.TEST_PASSED
+
+        yield CaseEvent.create(
+            test_path=[{"type": "class", "name": r.suite_name}, {"type": "testcase", "name": r.test_name}],
+            duration_secs=r.duration_secs,
+            status=status,
+            stderr=r.message if status == CaseEvent.TEST_FAILED else None,
+        )
 
 
 @smart_tests.record.tests
@@ -93,7 +134,7 @@ def record_tests(
     for r in reports:
         client.report(r)
 
-    client.junitxml_parse_func = parse_func
+    client.parse_func = parse_func
     client.run()
 
 
@@ -107,14 +148,9 @@ def subset(
     )] = [],
 ):
     for r in reports:
-        xml = JUnitXml.fromfile(r, parse_func)
-
-        for suite in xml:
-            for case in suite:
-                cls_name = case._elem.attrib.get("classname")
-                name = case._elem.attrib.get('name')
-                if cls_name != '' and name != '':
-                    client.test_path([{'type': 'class', 'name': cls_name}, {'type': 'testcase', 'name': name}])
+        for t in parse_tests(r):
+            if t.suite_name != '' and t.test_name != '':
+                client.test_path([{'type': 'class', 'name': t.suite_name}, {'type': 'testcase', 'name': t.test_name}])
 
     client.formatter = robot_formatter
     client.separator = " "
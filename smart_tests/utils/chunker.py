@@ -0,0 +1,148 @@
+"""Splits a stream of items into chunks bounded by both item count and (compressed) byte size.
+
+Counting items alone doesn't work well for requests like `record tests`, where one item can be a few hundred
+bytes or tens of megabytes depending on how much stdout/stderr a test case produced.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Generic, Iterable, Iterator, List, TypeVar
+
+T = TypeVar('T')
+
+# an item that ends the chunk being filled, rather than being a part of it. Producers that know no more items will come
+# for a while pass it along, so that what they produced so far doesn't wait for the chunk to fill up
+FLUSH: Any = object()
+
+# a starting guess of how well JSON payloads compress with gzip, used until we measure the real ratio.
+# erring on the pessimistic side keeps the first few requests small rather than too large
+DEFAULT_COMPRESSION_RATIO = 0.3
+
+# weight given to the latest measurement when updating the compression ratio estimate
+RATIO_SMOOTHING = 0.5
+
+
+class AdaptiveChunker(Generic[T]):
+    """
+    Splits items into chunks so that each chunk stays within 'max_items' items, and its compressed size
+    stays near 'max_bytes'.
+
+    The compressed size of an item isn't known until the chunk is actually sent, so we estimate it from
+    'sizer', which returns a rough uncompressed size of an item, times the compression ratio. Callers report
+    the actual compressed size of a chunk they sent via observe(), and subsequent chunks are cut based on the
+    updated ratio.
+
+    A single item larger than 'max_bytes' gets a chunk of its own.
+    """
+
+    def __init__(self, max_items: int, max_bytes: int, sizer: Callable[[T], int],
+                 compression_ratio: float = DEFAULT_COMPRESSION_RATIO):
+        self.max_items = max_items
+        # 0 or negative means no limit in size
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        self.compression_ratio = compression_ratio
+        self._lock = threading.Lock()
+
+    def estimate(self, item: T) -> float:
+        """Estimated compressed size of the given item in bytes"""
+        return self.sizer(item) * self.compression_ratio
+
+    def observe(self, chunk: List[T], compressed_size: int):
+        """Report the actual compressed size of a chunk that was sent, in order to refine the estimate"""
+        raw = sum(self.sizer(i) for i in chunk)
+        if raw <= 0 or compressed_size <= 0:
+            return
+        with self._lock:
+            ratio = compressed_size / raw
+            self.compression_ratio = RATIO_SMOOTHING * ratio + (1 - RATIO_SMOOTHING) * self.compression_ratio
+
+    def chunks(self, items: Iterable[T]) -> Iterator[Iterator[T]]:
+        """
+        Like `more_itertools.ichunked`, returns lazily evaluated chunks, and each chunk has to be fully consumed
+        before asking for the next one.
+
+        If the underlying iterator raises an exception, it's raised from the chunk being consumed.
+        """
+        it = iter(items)
+        # holds an item that didn't fit in the previous chunk
+        carry: List[T] = []
+
+        def chunk(first: T) -> Iterator[T]:
+            n = 1
+            size = self.estimate(first)
+            yield first
+            while n < self.max_items:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                if item is FLUSH:
+                    return
+                s = self.estimate(item)
+                if 0 < self.max_bytes < size + s:
+                    carry.append(item)
+                    return
+                n += 1
+                size += s
+                yield item
+
+        def error(e: Exception) -> Iterator[T]:
+            raise e
+            yield
+
+        while True:
+            if carry:
+                first = carry.pop()
+            else:
+                try:
+                    first = next(it)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    yield error(e)
+                    continue
+                if first is FLUSH:
+                    continue
+            yield chunk(first)
+
+
+def with_flushes(items: Iterable[T], interval: float) -> Iterator[T]:
+    """
+    Yields 'items', read in the background, along with FLUSH once an item has been waiting 'interval' seconds to be
+    sent. This is for items that trickle in, e.g. from a pipe, and that shouldn't wait for a chunk to fill up.
+    """
+    q: queue.Queue = queue.Queue()
+    end = object()
+    idle = object()
+
+    def read():
+        try:
+            for i in items:
+                q.put(i)
+        except BaseException as e:
+            q.put(e)
+            return
+        q.put(end)
+
+    threading.Thread(target=read, daemon=True).start()
+
+    # when the oldest item yielded since the last flush was yielded
+    oldest: float | None = None
+    while True:
+        try:
+            item = q.get(timeout=None if oldest is None else max(0.0, oldest + interval - time.monotonic()))
+        except queue.Empty:
+            item = idle
+        if oldest is not None and time.monotonic() - oldest >= interval:
+            yield FLUSH
+            oldest = None
+        if item is idle:
+            continue
+        if item is end:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        if oldest is None:
+            oldest = time.monotonic()
+        yield item
@@ -0,0 +1,148 @@
+"""Incremental discovery of test files for `Subset.scan()`, backed by a cache on disk.
+
+Listing a large source tree and running every file name through a test runner's path builder takes seconds,
+yet between two runs only a handful of directories typically change. The cache remembers, for each directory,
+its mtime, its sub-directories, and what the path builder returned for its entries. On the next scan,
+directories whose mtime hasn't changed are taken from the cache without listing them; only changed directories
+are listed and their entries run through the path builder again.
+
+A directory's mtime changes when entries are added, removed, or renamed in it, but not when the contents of the
+files in it change. So this only works for path builders whose result depends solely on the path name, which is
+what the caller vouches for by giving a cache key that identifies the path builder and its configuration.
+
+Whenever the cache file is missing, unreadable, or was written for a different scan, we fall back to a full walk,
+which also rebuilds the cache.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+from . import glob as uglob
+from .logger import Logger
+
+CACHE_VERSION = 1
+
+# file systems record mtime in a coarse resolution, so a directory modified right before we list it
+# could be modified again without its mtime changing. Don't trust the mtime of such recently modified directories
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+class DiscoveryCache:
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        # number of directories listed and taken from the cache in the last scan, for diagnostics
+        self.listed = 0
+        self.reused = 0
+
+    def scan(self, base: str, pattern: str, path_builder: Callable[[str], Any], key: str) -> Iterator[Any]:
+        """
+        Behaves like running 'path_builder' over `glob.iglob(join(base, pattern), recursive=True)` relative to
+        'base', yielding the results that are not False-like, except that directories that haven't changed since
+        the last scan with the same arguments are served from the cache.
+
+        'key' identifies the behavior of 'path_builder'. Scans with different keys don't share the cache.
+        """
+        base = os.path.abspath(base)
+        header = {"version": CACHE_VERSION, "base": base, "pattern": pattern, "key": key}
+        cache_file = os.path.join(
+            self.cache_dir,
+            "discovery-" + hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()[:32] + ".json")
+
+        cached = self._load(cache_file, header)
+        dirs: Dict[str, Dict[str, Any]] = {}
+        self.listed = self.reused = 0
+
+        pattern = pattern.replace(os.sep, '/')
+        matcher = uglob.compile(pattern)
+        # without '**', a pattern like 'foo/*.xml' can only match entries at a fixed depth
+        max_depth = None if '**' in pattern else pattern.count('/')
+
+        def list_dir(path: str, relpath: str, depth: int) -> Dict[str, Any] | None:
+            try:
+                mtime: int | None = os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+
+            entry = cached.get(relpath)
+            if entry is not None and entry["mtime"] == mtime:
+                self.reused += 1
+                return entry
+
+            self.listed += 1
+            if time.time_ns() - mtime < RACY_WINDOW_NS:  # type: ignore
+                mtime = None
+            subdirs: List[str] = []
+            found: Dict[str, Any] = {}
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        # just like glob, entries whose name start with '.' are not considered
+                        if e.name.startswith('.'):
+                            continue
+                        rel = relpath + e.name
+                        try:
+                            is_dir = e.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if is_dir and (max_depth is None or depth < max_depth):
+                            subdirs.append(e.name)
+                        if matcher.fullmatch(rel):
+                            # glob matches directories, too
+                            result = path_builder(rel.replace('/', os.sep))
+                            if result:
+                                found[e.name] = result
+            except OSError:
+                return None
+            return {"mtime": mtime, "dirs": subdirs, "found": found}
+
+        stack = [(base, '', 0)]
+        while stack:
+            path, relpath, depth = stack.pop()
+            entry = list_dir(path, relpath, depth)
+            if entry is None:
+                continue
+            dirs[relpath] = entry
+            yield from entry["found"].values()
+            stack.extend((os.path.join(path, d), relpath + d + '/', depth + 1) for d in reversed(entry["dirs"]))
+
+        self._save(cache_file, {**header, "dirs": dirs})
+
+    def _load(self, cache_file: str, header: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            Logger().debug(f"Ignoring the broken discovery cache {cache_file}: {e}")
+            return {}
+
+        if not isinstance(data, dict) or any(data.get(k) != v for k, v in header.items()):
+            return {}
+        dirs = data.get("dirs")
+        if not isinstance(dirs, dict):
+            return {}
+        for entry in dirs.values():
+            if not isinstance(entry, dict) or not isinstance(entry.get("dirs"), list) or \
+                    not isinstance(entry.get("found"), dict) or not isinstance(entry.get("mtime"), (int, type(None))):
+                return {}
+        return dirs
+
+    def _save(self, cache_file: str, data: Dict[str, Any]):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first, so that a concurrent scan never sees a half-written cache
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".discovery-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, cache_file)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            # the cache is an optimization. Failing to write it shouldn't fail the command
+            Logger().warning(f"Failed to write the discovery cache {cache_file}: {e}")
@@ -0,0 +1,93 @@
+"""Recursive file discovery built on os.scandir.
+
+This is the engine behind `RecordTests.scan()` and friends. Compared to `glob.iglob(..., recursive=True)`,
+it reuses the `stat` information `os.scandir` already has (so callers that need file timestamps don't stat
+every file a second time), stops descending once a pattern without '**' can no longer match, and lists
+sibling sub-trees concurrently. Results are yielded as soon as each directory is listed, so that callers
+can start processing before the whole tree has been walked.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from . import glob as uglob
+
+# directory listing is I/O bound, so a handful of threads is enough to keep the file system busy
+DEFAULT_MAX_WORKERS = 8
+
+
+class ScannedFile(NamedTuple):
+    # path name of the file, which is `base` joined with the portion that matched the pattern
+    path: str
+    # path name relative to `base`, always using '/' as the separator
+    relpath: str
+    # result of stat(), taken from os.DirEntry. None unless requested
+    stat: os.stat_result | None
+
+
+def scan(base: str, pattern: str, with_stat: bool = False,
+         max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[ScannedFile]:
+    """
+    Starting at the 'base' directory, recursively find files whose path relative to 'base' matches the given
+    GLOB pattern. See `smart_tests.utils.glob` for the supported syntax.
+
+    scan('build/test-reports', '**/*.xml')
+
+    Just like `glob.glob`, entries whose name start with '.' are not considered, and only regular files
+    (or symlinks to them) are reported.
+
+    :param with_stat: populate `ScannedFile.stat`. On Windows this comes for free from the directory listing,
+                      elsewhere it costs one stat() per matching file, and only matching files.
+    :param max_workers: number of threads used to list directories. 1 walks the tree in the calling thread.
+    """
+    matcher = uglob.compile(pattern.replace(os.sep, '/'))
+    # without '**', a pattern like 'foo/*.xml' can only match files at a fixed depth
+    max_depth = None if '**' in pattern else pattern.replace(os.sep, '/').count('/')
+
+    def list_dir(path: str, relpath: str, depth: int) -> Tuple[List[ScannedFile], List[Tuple[str, str]]]:
+        files: List[ScannedFile] = []
+        dirs: List[Tuple[str, str]] = []
+        try:
+            with os.scandir(path) as it:
+                for e in it:
+                    if e.name.startswith('.'):
+                        continue
+                    rel = relpath + e.name
+                    try:
+                        if e.is_dir():
+                            if max_depth is None or depth < max_depth:
+                                dirs.append((e.path, rel + '/'))
+                            continue
+                        if not e.is_file() or not matcher.fullmatch(rel):
+                            continue
+                        st = e.stat() if with_stat else None
+                    except OSError:
+                        # the entry disappeared or is unreadable. glob silently ignores those, too
+                        continue
+                    files.append(ScannedFile(e.path, rel, st))
+        except OSError:
+            pass
+        return files, dirs
+
+    if not os.path.isdir(base):
+        return
+
+    if max_workers <= 1:
+        stack = [(base, '', 0)]
+        while stack:
+            path, relpath, depth = stack.pop()
+            files, dirs = list_dir(path, relpath, depth)
+            yield from files
+            stack.extend((p, r, depth + 1) for p, r in reversed(dirs))
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Dict[Future, int] = {executor.submit(list_dir, base, '', 0): 0}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                depth = pending.pop(f)
+                files, dirs = f.result()
+                for p, r in dirs:
+                    pending[executor.submit(list_dir, p, r, depth + 1)] = depth + 1
+                yield from files
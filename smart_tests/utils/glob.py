@@ -3,7 +3,7 @@
 Primarily developed to interface with Maven, which supports "**", "*", and "?" as the special characters
 """
 import re
-from typing import Pattern
+from typing import Iterable, Pattern
 
 
 def is_path_separator(c: str):
@@ -11,7 +11,63 @@ def is_path_separator(c: str):
 
 
 def compile(glob: str) -> Pattern:
-    """Compiles a glob pattern like foo/**/*.txt into a """
+    """Compiles a glob pattern like foo/**/*.txt into a regular expression. Use fullmatch() with it"""
+    return re.compile(translate(glob))
+
+
+class PathMatcher:
+    """
+    Matches path names against a set of glob patterns in one evaluation of one regular expression, instead of
+    trying patterns one by one. This matters when we go through every file in a source tree.
+
+    A path matches when it matches any of 'includes' and none of 'excludes'.
+    """
+
+    def __init__(self, includes: Iterable[str], excludes: Iterable[str] = ()):
+        includes = list(includes)
+        excludes = list(excludes)
+
+        # patterns like '**/*Test.java' only look at the last path component. When that's all we have,
+        # we can match just the file name, saving the regular expression from trying every directory boundary
+        self.file_name_only = all(_is_file_name_pattern(g) for g in includes + excludes)
+        if self.file_name_only:
+            includes = [g[3:] for g in includes]
+            excludes = [g[3:] for g in excludes]
+
+        p = _alternation(translate(g) for g in includes)
+        if excludes:
+            p = "(?!(?:" + _alternation(translate(g) for g in excludes) + ")\\Z)(?:" + p + ")"
+        self.pattern = re.compile(p)
+
+    def match(self, path: str) -> bool:
+        if self.file_name_only:
+            path = path.rpartition('/')[2]
+        return self.pattern.fullmatch(path) is not None
+
+
+def _is_file_name_pattern(glob: str) -> bool:
+    """True if the glob is '**/' followed by a pattern for the file name"""
+    return glob.startswith('**/') and not any(is_path_separator(c) for c in glob[3:]) and '**' not in glob[3:]
+
+
+def union(patterns: Iterable[str | Pattern]) -> Pattern:
+    """
+    Combines regular expressions into one that matches wherever any of them does.
+    With no expressions, the result never matches.
+    """
+    return re.compile(_alternation(p.pattern if isinstance(p, re.Pattern) else p for p in patterns))
+
+
+def _alternation(sources: Iterable[str]) -> str:
+    alternatives = ["(?:" + p + ")" for p in sources]
+    if not alternatives:
+        # never matches
+        return "(?!)"
+    return "|".join(alternatives)
+
+
+def translate(glob: str) -> str:
+    """Translates a glob pattern into the source of an equivalent regular expression"""
     # fnmatch.fnmatch is close but it doesn't deal with paths well, including
     # '**'
 
@@ -41,4 +97,4 @@ def compile(glob: str) -> Pattern:
         else:
             p += re.escape(c)
 
-    return re.compile(p)
+    return p
@@ -0,0 +1,164 @@
+"""Guesses which of the files tracked by git are tests, for `subset --get-tests-from-guess`.
+
+`git ls-files` is read as it runs, NUL-delimited, so that path names containing newlines or characters git would
+otherwise quote come through intact, and the file list of a monorepo with millions of files is never held in memory
+at once. Each path name is checked against a single precompiled regular expression that combines the include and
+exclude patterns.
+
+Files outside of the sparse-checkout cone aren't in the working tree, so they are left out. Git tells them by the
+skip-worktree bit, which can also be set by hand on files that are still there, so only those actually missing are.
+Git pathspecs can narrow down the files further.
+
+Given a cache directory, the result is remembered per tree of HEAD. As long as the index matches HEAD, a later call
+on the same commit reads the result from the cache instead of listing and matching all the files again.
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+from typing import IO, Iterator, List, Sequence
+
+from .logger import Logger
+
+CACHE_VERSION = 1
+
+LOOSE_TEST_FILE_PATTERN = r'(\.(test|spec)\.|_test\.|Test\.|Spec\.|test/|tests/|__tests__/|src/test/)'
+EXCLUDE_PATTERN = r'(BUILD|Makefile|Dockerfile|LICENSE|.gitignore|.gitkeep|.keep|id_rsa|rsa|blank|taglib)|\.(xml|json|jsonl|txt|yml|yaml|toml|md|png|jpg|jpeg|gif|svg|sql|html|css|graphql|proto|gz|zip|rz|bzl|conf|config|snap|pem|crt|key|lock|jpi|hpi|jelly|properties|jar|ini|mod|sum|bmp|env|envrc|sh|csv|list)$'  # noqa E501
+
+# equivalent of `re.search(LOOSE_TEST_FILE_PATTERN, f) and not re.search(EXCLUDE_PATTERN, f)` in one match.
+# '(?s)' because path names can contain newlines
+_GUESS = re.compile(r'(?s)(?!.*(?:' + EXCLUDE_PATTERN + r'))(?=.*(?:' + LOOSE_TEST_FILE_PATTERN + r'))')
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def looks_like_test(path: str) -> bool:
+    return _GUESS.match(path) is not None
+
+
+def ls_files(pathspecs: Sequence[str] = (), chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields the files tracked by git under the current directory, as `git ls-files` lists them, except those outside
+    of the sparse-checkout cone, i.e. skip-worktree entries that are missing from the working tree.
+
+    Raises subprocess.CalledProcessError if git fails, and OSError if git can't be run.
+    """
+    # '-t' prefixes each entry with a status tag, where 'S' marks skip-worktree entries
+    args = ['git', 'ls-files', '-z', '-t', '--', *pathspecs]
+    with subprocess.Popen(args, stdout=subprocess.PIPE) as proc:
+        try:
+            yield from _read_entries(proc.stdout, chunk_size)  # type: ignore
+        except BaseException:
+            # including the consumer abandoning us halfway
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()  # type: ignore
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+def _read_entries(f: IO[bytes], chunk_size: int) -> Iterator[str]:
+    rest = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        entries = (rest + chunk).split(b'\0')
+        rest = entries.pop()
+        for e in entries:
+            # git doesn't care about the encoding of path names. os.fsdecode round-trips whatever isn't UTF-8
+            path = os.fsdecode(e[2:])
+            # only skip-worktree entries are looked for, so that the rest don't cost a stat() each
+            if not e.startswith(b'S ') or os.path.lexists(path):
+                yield path
+
+
+def guess_test_files(pathspecs: Sequence[str] = (), cache_dir: str | None = None) -> Iterator[str]:
+    """
+    Yields files tracked by git under the current directory that look like tests, relative to the current directory.
+
+    Raises subprocess.CalledProcessError if git fails, and OSError if git can't be run.
+    """
+    cache_file = _cache_file(cache_dir, pathspecs) if cache_dir else None
+    if cache_file:
+        cached = _load(cache_file)
+        if cached is not None:
+            yield from cached
+            return
+
+    found: List[str] = []
+    for f in ls_files(pathspecs):
+        if _GUESS.match(f):
+            if cache_file:
+                found.append(f)
+            yield f
+
+    if cache_file:
+        _save(cache_dir, cache_file, found)  # type: ignore
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(['git', *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True, check=True).stdout
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def _cache_file(cache_dir: str, pathspecs: Sequence[str]) -> str | None:
+    """Name of the cache file for the current state of the repository, or None if the result shouldn't be cached"""
+    # prints the current directory relative to the top, the location of the sparse-checkout file, then the tree hash
+    out = _git('rev-parse', '--show-prefix', '--git-path', 'info/sparse-checkout', '--verify', 'HEAD^{tree}')
+    if out is None:
+        # no commit yet, or not in a git repository
+        return None
+    prefix, sparse_checkout_file, tree = out.split('\n')[:3]
+
+    # `git ls-files` lists the index, not HEAD. When they differ, the tree hash doesn't tell what we'd find
+    if _git('diff-index', '--cached', '--quiet', 'HEAD', '--') is None:
+        return None
+
+    try:
+        with open(sparse_checkout_file, 'rb') as f:
+            sparse_checkout = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        sparse_checkout = None
+
+    key = json.dumps([CACHE_VERSION, tree, prefix, list(pathspecs), sparse_checkout, _GUESS.pattern])
+    return os.path.join(cache_dir, "guess-" + hashlib.sha256(key.encode()).hexdigest()[:32] + ".bin")
+
+
+def _load(cache_file: str) -> List[str] | None:
+    try:
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        Logger().debug(f"Ignoring the broken test file cache {cache_file}: {e}")
+        return None
+    # every entry is terminated by NUL, so an empty list is an empty file, and a truncated file is detectable
+    if data and not data.endswith(b'\0'):
+        Logger().debug(f"Ignoring the broken test file cache {cache_file}")
+        return None
+    return [os.fsdecode(e) for e in data.split(b'\0')[:-1]]
+
+
+def _save(cache_dir: str, cache_file: str, files: List[str]):
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first, so that a concurrent run never sees a half-written cache
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".guess-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b''.join(os.fsencode(e) + b'\0' for e in files))
+            os.replace(tmp, cache_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        # the cache is an optimization. Failing to write it shouldn't fail the command
+        Logger().warning(f"Failed to write the test file cache {cache_file}: {e}")
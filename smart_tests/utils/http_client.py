@@ -40,6 +40,12 @@ class DryRunResponse:
     def json(self):
         return self.payload
 
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        yield json.dumps(self.payload)
+
+    def close(self):
+        return
+
 
 class _HttpClient:
     def __init__(self, base_url: str = "", session: Session | None = None, app: Application | None = None):
@@ -78,6 +84,7 @@ class _HttpClient:
         timeout: Tuple[int, int] = DEFAULT_TIMEOUT,
         compress: bool = False,
         additional_headers: Dict | None = None,
+        stream: bool = False,
     ):
         url = _join_paths(self.base_url, path)
 
@@ -104,7 +111,7 @@ class _HttpClient:
         # the 'data' argument accepts generator. whenever we can potentially send a large amount of data,
         # we want to use generator to stream data
         response = self.session.request(method, url, headers=headers, timeout=timeout, data=data,
-                                        params=params, verify=(not self.skip_cert_verification))
+                                        params=params, verify=(not self.skip_cert_verification), stream=stream)
         Logger().debug(
             f"received response status:{response.status_code} message:{response.reason} headers:{response.headers}"
         )
@@ -0,0 +1,208 @@
+"""Reads selected parts of a large JSON document incrementally.
+
+Some JSON test reports get hundreds of megabytes large, and json.load() holds all of it, several times its size in
+Python objects. Most of the time, we only need to look at one item of a big array at a time, so this module walks
+the document and only materializes the values at the given paths, one by one:
+
+    for path, suite in json_stream.items(f, "suites.item"):
+        ...
+
+A path is a sequence of keys joined by '.', where 'item' stands for elements of an array and '*' stands for any key
+of an object, e.g. 'result.*.item' for every element of arrays that are values of the 'result' object.
+
+With strict=True, objects and arrays on the way to the paths must be what the paths expect, e.g. 'result' must be an
+object and its values arrays for 'result.*.item'. Otherwise, values of other types are passed over.
+
+Each value is decoded by the json module (and therefore its C accelerator when available), so only the navigation
+between values is done in Python. Memory usage is bounded by the largest single value that's materialized or skipped.
+"""
+import json
+import re
+from typing import IO, Any, Iterator, List, Sequence, Tuple
+
+ITEM = "item"
+ANY_KEY = "*"
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class UnexpectedType(ValueError):
+    """Raised in the strict mode when a value on the way to the paths isn't the object or array the paths expect"""
+
+
+def items(f: IO[str], *paths: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+          strict: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields (path, value) for values found at any of the given paths, in the document order.
+    'path' is the one given to this function, not the actual path of the value.
+
+    Raises json.JSONDecodeError if the document is malformed, and UnexpectedType in the strict mode.
+    """
+    for name, _, value in entries(f, *paths, chunk_size=chunk_size, strict=strict):
+        yield name, value
+
+
+def entries(f: IO[str], *paths: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+            strict: bool = False) -> Iterator[Tuple[str, List[str], Any]]:
+    """
+    Like items(), but also yields the actual path of each value, as a list of the keys leading to it, e.g.
+    ('result.*.item', ['result', 'chrome', 'item'], value). Don't modify the list; it's reused for efficiency.
+    """
+    patterns = [(p, p.split(".") if p else []) for p in paths]
+    reader = _Reader(f, chunk_size)
+    yield from _walk(reader, [], patterns, strict)
+    if reader.peek() != "":
+        reader.error("Extra data")
+
+
+def _matches(pattern: Sequence[str], path: Sequence[str]) -> bool:
+    for p, c in zip(pattern, path):
+        if p != c and not (p == ANY_KEY and c != ITEM):
+            return False
+    return True
+
+
+def _classify(path: List[str], patterns: List[Tuple[str, List[str]]]) -> Tuple[str | None, bool]:
+    """Returns the path to report the value at 'path' as, if any, and whether we need to look inside of it"""
+    descend = False
+    for name, pattern in patterns:
+        if len(pattern) >= len(path) and _matches(pattern, path):
+            if len(pattern) == len(path):
+                return name, False
+            descend = True
+    return None, descend
+
+
+def _expected_containers(path: List[str], patterns: List[Tuple[str, List[str]]]) -> str:
+    """Returns '{' and/or '[' for what the patterns that look inside of the value at 'path' expect it to be"""
+    expected = ""
+    for _, pattern in patterns:
+        if len(pattern) > len(path) and _matches(pattern, path):
+            expected += "[" if pattern[len(path)] == ITEM else "{"
+    return expected
+
+
+def _walk(reader: '_Reader', path: List[str], patterns: List[Tuple[str, List[str]]],
+          strict: bool) -> Iterator[Tuple[str, List[str], Any]]:
+    name, descend = _classify(path, patterns)
+    if name is not None:
+        yield name, path, reader.value()
+        return
+    if not descend:
+        # nothing we are interested in is in here
+        reader.value()
+        return
+
+    c = reader.peek()
+    if strict and c not in _expected_containers(path, patterns):
+        raise UnexpectedType(f"Unexpected value at '{'.'.join(path)}'")
+    if c == "{":
+        reader.advance()
+        if reader.peek() == "}":
+            reader.advance()
+            return
+        while True:
+            if reader.peek() != '"':
+                reader.error("Expecting property name enclosed in double quotes")
+            key = reader.value()
+            reader.expect(":")
+            yield from _walk(reader, path + [key], patterns, strict)
+            if not reader.next_element("}"):
+                return
+    elif c == "[":
+        reader.advance()
+        if reader.peek() == "]":
+            reader.advance()
+            return
+        # all the elements are at the same path, so this is the hot loop for big arrays we are after
+        item_path = path + [ITEM]
+        name, descend = _classify(item_path, patterns)
+        while True:
+            if name is not None:
+                yield name, item_path, reader.value()
+            elif descend:
+                yield from _walk(reader, item_path, patterns, strict)
+            else:
+                reader.value()
+            if not reader.next_element("]"):
+                return
+    else:
+        # a scalar where we expected a container. nothing to find in there
+        reader.value()
+
+
+class _Reader:
+    def __init__(self, f: IO[str], chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        """Read more into the buffer. Returns False if we are at the end of the file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        # drop what's already consumed
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespaces and return the next character, or '' at the end of the file"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()  # type: ignore
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def advance(self):
+        self.pos += 1
+
+    def expect(self, c: str):
+        if self.peek() != c:
+            self.error(f"Expecting '{c}' delimiter")
+        self.advance()
+
+    def next_element(self, close: str) -> bool:
+        """After an element of an object/array, returns True if more elements follow, False if it's closed"""
+        c = self.peek()
+        if c == ",":
+            self.advance()
+            return True
+        if c == close:
+            self.advance()
+            return False
+        self.error(f"Expecting ',' delimiter or '{close}'")
+        return False
+
+    def value(self) -> Any:
+        """Decode the next JSON value"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                v, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number at the very end of the buffer might continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return v
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # the value didn't fit in the buffer. read more, increasingly, so that a huge value isn't re-parsed
+            # too many times
+            if not self._fill(size):
+                continue
+            size *= 2
+
+    def error(self, msg: str):
+        raise json.JSONDecodeError(msg, self.buf, self.pos)
@@ -0,0 +1,131 @@
+"""Bounds how much stdout/stderr we keep per test case.
+
+Noisy test suites can produce megabytes of logs per test case, and some test runners (e.g. Bazel) attach the
+same big log to every test case. Sending all of that makes `record tests` payloads enormous, while the part
+people actually look at is usually the beginning (setup) and the end (where the failure is). So we keep the
+first and the last part of each log, and replace what's in between with a marker.
+"""
+import os
+from collections import deque
+from typing import Deque, List
+
+DEFAULT_HEAD_SIZE = 64 * 1024
+DEFAULT_TAIL_SIZE = 64 * 1024
+
+TRUNCATION_MARKER = "\n\n... {count} {unit} truncated ...\n\n"
+# the longest the marker can be. Logs that exceed the limit by less than this are left alone, so that applying
+# the policy to a log that has already been truncated doesn't change it
+MARKER_ALLOWANCE = len(TRUNCATION_MARKER.format(count=10 ** 20, unit="characters"))
+
+
+class LogRetention:
+    """
+    Keep the first 'head' and the last 'tail' characters of a log. If 'head' is None, logs are kept as is.
+    """
+
+    def __init__(self, head: int | None = DEFAULT_HEAD_SIZE, tail: int = DEFAULT_TAIL_SIZE):
+        self.head = head
+        self.tail = tail
+
+    @classmethod
+    def unlimited(cls) -> 'LogRetention':
+        return cls(head=None, tail=0)
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self.head is None
+
+    def truncate(self, log: str) -> str:
+        """Apply this policy to a log that's already in memory"""
+        if self.head is None or len(log) <= self.head + self.tail + MARKER_ALLOWANCE:
+            return log
+        tail = log[len(log) - self.tail:] if self.tail > 0 else ""
+        return log[:self.head] + _marker(len(log) - self.head - self.tail, "characters") + tail
+
+    def buffer(self) -> 'BoundedLog':
+        """Creates a buffer that accumulates a log piece by piece, keeping only what this policy retains"""
+        return BoundedLog(self)
+
+    def read_file(self, path: str, encoding: str = 'utf-8') -> str:
+        """
+        Read a log file, only loading the portions this policy retains into memory.
+
+        Here the head/tail sizes are counted in bytes, not characters.
+        """
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.head is None or size <= self.head + self.tail + MARKER_ALLOWANCE:
+                return f.read().decode(encoding, errors='replace')
+            head = f.read(self.head).decode(encoding, errors='replace')
+            tail = ""
+            if self.tail > 0:
+                f.seek(size - self.tail)
+                tail = f.read(self.tail).decode(encoding, errors='replace')
+            return head + _marker(size - self.head - self.tail, "bytes") + tail
+
+
+class BoundedLog:
+    """
+    Accumulates a log from pieces as they arrive, like io.StringIO, except that memory usage is bounded by the
+    given LogRetention.
+    """
+
+    def __init__(self, retention: LogRetention):
+        self._retention = retention
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+        # number of characters dropped between head and tail
+        self._dropped = 0
+
+    def write(self, s: str):
+        head_limit = self._retention.head
+        if head_limit is None:
+            self._head.append(s)
+            return
+
+        if self._head_size < head_limit:
+            n = head_limit - self._head_size
+            self._head.append(s[:n])
+            self._head_size += min(n, len(s))
+            s = s[n:]
+            if not s:
+                return
+
+        self._tail.append(s)
+        self._tail_size += len(s)
+        tail_limit = self._retention.tail
+        while self._tail_size > tail_limit:
+            excess = self._tail_size - tail_limit
+            first = self._tail[0]
+            if len(first) <= excess:
+                self._tail.popleft()
+                excess = len(first)
+            else:
+                self._tail[0] = first[excess:]
+            self._tail_size -= excess
+            self._dropped += excess
+
+    def getvalue(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if self._dropped > 0:
+            return head + _marker(self._dropped, "characters") + tail
+        return head + tail
+
+
+def _marker(count: int, unit: str) -> str:
+    return TRUNCATION_MARKER.format(count=count, unit=unit)
+
+
+_log_retention = LogRetention()
+
+
+def set_log_retention(retention: LogRetention):
+    global _log_retention
+    _log_retention = retention
+
+
+def get_log_retention() -> LogRetention:
+    return _log_retention
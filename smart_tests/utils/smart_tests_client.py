@@ -34,6 +34,7 @@ class SmartTestsClient:
         timeout: tuple[int, int] = (5, 60),
         compress: bool = False,
         additional_headers: dict | None = None,
+        stream: bool = False,
     ) -> requests.Response:
         path = _join_paths(
             f"/intake/organizations/{self.organization}/workspaces/{self.workspace}",
@@ -58,7 +59,8 @@ class SmartTestsClient:
                 params=params,
                 timeout=timeout,
                 compress=compress,
-                additional_headers=additional_headers
+                additional_headers=additional_headers,
+                stream=stream,
             )
             return response
         except ConnectionError as e:
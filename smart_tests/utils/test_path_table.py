@@ -0,0 +1,114 @@
+"""Compact encoding of test paths for the subset API, which `subset --compact-test-paths` opts in to.
+
+A list of test paths spells out `{"type": ..., "name": ...}` for every component of every test, even though tests
+share most of their components (the file, the class) with their neighbors, and names share long prefixes:
+
+    [[{"type": "class", "name": "com.example.FooTest"}, {"type": "testcase", "name": "testBar"}],
+     [{"type": "class", "name": "com.example.FooTest"}, {"type": "testcase", "name": "testBaz"}]]
+
+Instead, every distinct component is listed once in a table, and test paths are lists of indices into it:
+
+    {"types": ["class", "testcase"],
+     "components": [[0, 0, "com.example.FooTest"], [1, 0, "testBar"], [1, 6, "z"]]}
+    [[0, 1], [0, 2]]
+
+A component is `[type, shared, suffix]`, where 'type' is an index into 'types', and the name is the first 'shared'
+characters of the name of the previous component in the table followed by 'suffix'. A component that isn't just a
+type and a name is written as is, as a JSON object.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ..testpath import TestPath, TestPathComponent
+
+ENCODING = "table-v1"
+
+
+def encode(test_paths: Iterable[TestPath]) -> Tuple[Dict[str, Any], List[List[int]]]:
+    """Returns the table and the test paths as indices into it"""
+    types: Dict[str, int] = {}
+    # (type, name) of a component -> its index in the table
+    indices: Dict[Tuple[str, str], int] = {}
+    components: List[Any] = []
+    others: Dict[str, int] = {}
+    previous = ""
+    paths: List[List[int]] = []
+
+    for tp in test_paths:
+        path = []
+        for c in tp:
+            if len(c) == 2 and isinstance(c.get("type"), str) and isinstance(c.get("name"), str):
+                key = (c["type"], c["name"])
+                i = indices.get(key)
+                if i is None:
+                    name = c["name"]
+                    t = types.setdefault(c["type"], len(types))
+                    shared = _common_prefix(previous, name)
+                    i = indices[key] = len(components)
+                    components.append([t, shared, name[shared:]])
+                    previous = name
+            else:
+                # unusual components are rare. Look them up by their canonical form
+                k = repr(sorted(c.items()))
+                i = others.get(k)
+                if i is None:
+                    i = others[k] = len(components)
+                    components.append(dict(c))
+            path.append(i)
+        paths.append(path)
+
+    return {"types": list(types), "components": components}, paths
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:
+        return n
+    # binary search on the length of the common prefix. Comparing slices is done in C, unlike a loop over characters
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class Table:
+    """Decodes test paths given as indices into a table that encode() made"""
+
+    def __init__(self, table: Dict[str, Any]):
+        """Raises ValueError if the table is malformed"""
+        types = table.get("types", [])
+        self.components: List[TestPathComponent] = []
+        previous = ""
+        try:
+            for c in table.get("components", []):
+                if isinstance(c, dict):
+                    self.components.append(c)
+                    continue
+                t, shared, suffix = c
+                if t < 0 or not 0 <= shared <= len(previous):
+                    raise ValueError(f"Malformed test path table: component {len(self.components)} is out of range")
+                name = previous[:shared] + suffix
+                self.components.append({"type": types[t], "name": name})
+                previous = name
+        except (TypeError, IndexError) as e:
+            raise ValueError(f"Malformed test path table: {e}") from e
+
+    def test_path(self, indices: List[int]) -> TestPath:
+        """
+        Raises ValueError if an index is out of the table.
+        Test paths share their component objects, which therefore mustn't be modified.
+        """
+        try:
+            if any(i < 0 for i in indices):
+                raise IndexError("negative index")
+            return [self.components[i] for i in indices]
+        except (TypeError, IndexError) as e:
+            raise ValueError(f"Malformed test path {indices}: {e}") from e
+
+
+def decode(table: Dict[str, Any], paths: Iterable[List[int]]) -> List[TestPath]:
+    t = Table(table)
+    return [t.test_path(p) for p in paths]
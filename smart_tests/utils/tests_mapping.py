@@ -0,0 +1,210 @@
+"""Narrows down the file of `subset --prioritized-tests-mapping` to the directories that have changed.
+
+The mapping file maps directories of repositories to the tests to prioritize when something under them changes:
+
+    {"format": "prioritized-tests-v1", "mappings": {"REPO": {"src/payment": ["file=test/payment_test.py"], ...}}}
+
+It can get large, yet only the entries of directories with changes in them matter to a subset. Given the files
+that have changed, relative to the root of the repository, the file is read incrementally and only those entries
+are kept. The changed files don't tell which of the repositories they're in, so they're matched against the
+directories of every repository: a change to 'src/a.py' keeps 'src' of all of them. That sends more than needed when
+repositories share directory names, but never less.
+
+Given a cache directory, the mapping is also indexed into a binary file keyed by the hash of the mapping file, so
+that later runs with the same mapping only read the entries they need. The cache file consists of
+
+    MAGIC, the JSON list of tests of each entry one after another, the JSON index, and the offset of the index
+
+where the index lists [repository, directory, offset, length] of each entry.
+"""
+import hashlib
+import json
+import os
+import struct
+import subprocess
+import tempfile
+from typing import IO, Any, Dict, Iterable, List, Set, Tuple
+
+from . import json_stream
+from .logger import Logger
+
+FORMAT = "prioritized-tests-v1"
+
+CACHE_VERSION = 1
+_MAGIC = b"SMART-TESTS-MAPPING\0" + struct.pack(">I", CACHE_VERSION)
+_OFFSET = struct.Struct(">Q")
+
+
+def changed_files_since(base: str) -> List[str]:
+    """
+    Files that differ between 'base' and the working tree, relative to the root of the repository.
+
+    Raises subprocess.CalledProcessError if git fails, and OSError if git can't be run.
+    """
+    out = subprocess.run(['git', 'diff', '--name-only', '-z', base, '--'], stdout=subprocess.PIPE, check=True).stdout
+    return [os.fsdecode(f) for f in out.split(b'\0') if f]
+
+
+def _normalize(directory: str) -> str:
+    d = directory.strip("/")
+    while d.startswith("./"):
+        d = d[2:]
+    return "" if d == "." else d
+
+
+def _affected_directories(changed_files: Iterable[str]) -> Set[str]:
+    """All the directories a change in any of the files falls under, including the files themselves"""
+    dirs: Set[str] = set()
+    for f in changed_files:
+        # the root of the repository
+        dirs.add("")
+        f = _normalize(f)
+        while f and f not in dirs:
+            dirs.add(f)
+            f = f.rpartition("/")[0]
+    return dirs
+
+
+def prune(f: IO[str], changed_files: Iterable[str], cache_dir: str | None = None) -> Dict[str, Any]:
+    """
+    Returns the mapping in 'f' with only the entries of directories that any of 'changed_files' is under, in any
+    of the repositories.
+    A mapping of another format is returned as is, for the server to deal with it.
+
+    Raises json.JSONDecodeError if the mapping is malformed.
+    """
+    affected = _affected_directories(changed_files)
+    cache_file = _cache_file(cache_dir, f) if cache_dir else None
+
+    if cache_file:
+        pruned = _load(cache_file, affected)
+        if pruned is not None:
+            return pruned
+
+    mapping_format = None
+    mappings: Dict[str, Dict[str, Any]] = {}
+    index: List[Tuple[str, str, int, int]] = []
+    data = tempfile.TemporaryFile() if cache_file else None
+    # a mapping of another format is read whole, from the start. Remember what's read until the format is known,
+    # for when 'f' is a pipe that can't seek back
+    recording = _Recording(f)
+    try:
+        if data:
+            data.write(_MAGIC)
+        for name, path, value in json_stream.entries(recording, "format", "mappings.*.*"):  # type: ignore
+            if name == "format":
+                mapping_format = value
+                if value != FORMAT:
+                    break
+                recording.stop()
+                continue
+            repo, directory = path[1], path[2]
+            if data:
+                encoded = json.dumps(value).encode()
+                index.append((repo, directory, data.tell(), len(encoded)))
+                data.write(encoded)
+            if _normalize(directory) in affected:
+                mappings.setdefault(repo, {})[directory] = value
+
+        if mapping_format != FORMAT:
+            # don't know how to narrow it down
+            Logger().warning(f"Unknown format of the prioritized tests mapping: {mapping_format}. Sending it whole")
+            return json.loads(recording.replay() + f.read())
+
+        if data and cache_file:
+            _save(cache_file, data, index)
+    finally:
+        if data:
+            data.close()
+
+    return {"format": mapping_format, "mappings": mappings}
+
+
+class _Recording:
+    """Reads from 'f', keeping what's read until stop()"""
+
+    def __init__(self, f: IO[str]):
+        self.f = f
+        self.recorded: List[str] | None = []
+
+    def read(self, size: int = -1) -> str:
+        s = self.f.read(size)
+        if self.recorded is not None:
+            self.recorded.append(s)
+        return s
+
+    def stop(self):
+        self.recorded = None
+
+    def replay(self) -> str:
+        assert self.recorded is not None
+        return "".join(self.recorded)
+
+
+def _cache_file(cache_dir: str, f: IO[str]) -> str | None:
+    """Name of the cache file for the mapping file, or None if it can't be cached, e.g. when it's a pipe"""
+    try:
+        if not os.path.isfile(f.name):
+            return None
+        with open(f.name, "rb") as b:
+            h = hashlib.sha256()
+            while True:
+                chunk = b.read(1024 * 1024)
+                if not chunk:
+                    break
+                h.update(chunk)
+    except (OSError, TypeError, AttributeError):
+        return None
+    return os.path.join(cache_dir, f"mapping-{h.hexdigest()[:32]}.bin")
+
+
+def _load(cache_file: str, affected: Set[str]) -> Dict[str, Any] | None:
+    try:
+        with open(cache_file, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("not a mapping cache")
+            f.seek(-_OFFSET.size, os.SEEK_END)
+            end = f.tell()
+            (index_offset,) = _OFFSET.unpack(f.read(_OFFSET.size))
+            if not len(_MAGIC) <= index_offset <= end:
+                raise ValueError("bad index offset")
+            f.seek(index_offset)
+            index = json.loads(f.read(end - index_offset))
+
+            mappings: Dict[str, Dict[str, Any]] = {}
+            for repo, directory, offset, length in index:
+                if _normalize(directory) in affected:
+                    f.seek(offset)
+                    mappings.setdefault(repo, {})[directory] = json.loads(f.read(length))
+            return {"format": FORMAT, "mappings": mappings}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError) as e:
+        Logger().debug(f"Ignoring the broken prioritized tests mapping cache {cache_file}: {e}")
+        return None
+
+
+def _save(cache_file: str, data: IO[bytes], index: List[Tuple[str, str, int, int]]):
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first, so that a concurrent run never sees a half-written cache
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".mapping-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as w:
+                data.seek(0)
+                while True:
+                    chunk = data.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    w.write(chunk)
+                index_offset = w.tell()
+                w.write(json.dumps(index).encode())
+                w.write(_OFFSET.pack(index_offset))
+            os.replace(tmp, cache_file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        # the cache is an optimization. Failing to write it shouldn't fail the command
+        Logger().warning(f"Failed to write the prioritized tests mapping cache {cache_file}: {e}")
@@ -0,0 +1,155 @@
+"""Builds a regular expression that matches exactly a given set of names, factored over their common prefixes.
+
+Test runners like CTest (`ctest -R`) and Go (`go test -run`) select tests by a regular expression. Spelling out
+thousands of names as `^name1$|^name2$|...` gives a huge pattern that's slow for those engines to compile and match.
+Merging the names into a prefix trie gives a much smaller pattern instead:
+
+    build(["TestFooBar", "TestFooBaz", "TestQux"]) == "^Test(FooBa(r|z)|Qux)$"
+
+The pattern only uses what both of them (and Python) support: literal characters escaped by a backslash, '(...)'
+groups, '|', '?', '^' and '$'.
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "size", "groups")
+
+    def __init__(self):
+        # label of the edge -> child. Labels of sibling edges start with different characters
+        self.children: Dict[str, _Node] = {}
+        self.terminal = False
+        # length of the pattern _emit() gives for this node, and the number of groups in it. See _measure()
+        self.size = 0
+        self.groups = 0
+
+
+def _trie(names: Iterable[str]) -> _Node:
+    root = _Node()
+    for name in names:
+        node = root
+        while True:
+            if not name:
+                node.terminal = True
+                break
+            label = next((label for label in node.children if label[0] == name[0]), None)
+            if label is None:
+                leaf = node.children[name] = _Node()
+                leaf.terminal = True
+                break
+            # split the edge where the name diverges from it
+            n = 1
+            while n < len(label) and n < len(name) and label[n] == name[n]:
+                n += 1
+            child = node.children[label]
+            if n < len(label):
+                del node.children[label]
+                middle = node.children[label[:n]] = _Node()
+                middle.children[label[n:]] = child
+                child = middle
+            node = child
+            name = name[n:]
+    return root
+
+
+def _emit(node: _Node) -> str:
+    """Pattern for the names under 'node', without the part up to 'node'"""
+    alternatives = [re.escape(label) + _emit(node.children[label]) for label in sorted(node.children)]
+    if not alternatives:
+        return ""
+    if len(alternatives) == 1 and not node.terminal:
+        return alternatives[0]
+    pattern = "(" + "|".join(alternatives) + ")"
+    return pattern + "?" if node.terminal else pattern
+
+
+def _measure(node: _Node):
+    """Fills in the size and groups of the pattern _emit() would give for every node, without building them"""
+    size = groups = 0
+    for label, child in node.children.items():
+        _measure(child)
+        size += len(re.escape(label)) + child.size
+        groups += child.groups
+    n = len(node.children)
+    if n > 1 or (n == 1 and node.terminal):
+        # parentheses, '|' in between, and '?' when the group is optional
+        size += 2 + (n - 1) + (1 if node.terminal else 0)
+        groups += 1
+    node.size = size
+    node.groups = groups
+
+
+def build(names: Iterable[str]) -> str:
+    """A pattern that matches any of the names, and nothing else. 'names' shouldn't be empty, for '^$' matches ''"""
+    return "^" + _emit(_trie(names)) + "$"
+
+
+def build_chunks(names: Iterable[str], max_size: int, max_groups: int | None = None) -> List[str]:
+    """
+    Splits names into patterns, each of which is at most 'max_size' characters long and has at most 'max_groups'
+    groups, except when a single name doesn't fit by itself.
+
+    A subtree of the trie that doesn't fit in one pattern is split into runs of its children, each of which shares
+    the prefix up to the subtree. Patterns are then packed together with '|' as long as they fit. Names are matched
+    in the sorted order, so the ones that share a prefix end up in the same pattern.
+    """
+    def fits(size: int, groups: int) -> bool:
+        return size <= max_size and (max_groups is None or groups <= max_groups)
+
+    root = _trie(names)
+    _measure(root)
+    patterns: List[Tuple[str, int]] = []
+    _pack(root, "", fits, patterns)
+
+    chunks: List[Tuple[str, int]] = []
+    for pattern, groups in patterns:
+        if chunks and fits(len(chunks[-1][0]) + 1 + len(pattern), chunks[-1][1] + groups):
+            chunks[-1] = (chunks[-1][0] + "|" + pattern, chunks[-1][1] + groups)
+        else:
+            chunks.append((pattern, groups))
+    return [pattern for pattern, _ in chunks]
+
+
+def _pack(node: _Node, prefix: str, fits: Callable[[int, int], bool], out: List[Tuple[str, int]]):
+    """Appends patterns for names under 'node', where 'prefix' is the escaped pattern up to 'node'"""
+    # '^' and '$' take 2
+    if fits(2 + len(prefix) + node.size, node.groups):
+        if node.terminal or node.children:
+            out.append(("^" + prefix + _emit(node) + "$", node.groups))
+        return
+
+    if node.terminal:
+        out.append(("^" + prefix + "$", 0))
+
+    run: List[str] = []
+    run_size = run_groups = 0
+
+    def run_fits(size: int, groups: int, n: int) -> bool:
+        # more than one alternative needs a group around them, with '|' in between
+        return fits(2 + len(prefix) + size + (n - 1) + (2 if n > 1 else 0), groups + (1 if n > 1 else 0))
+
+    def flush():
+        if len(run) == 1:
+            out.append(("^" + prefix + run[0] + "$", run_groups))
+        elif run:
+            out.append(("^" + prefix + "(" + "|".join(run) + ")$", run_groups + 1))
+
+    for label in sorted(node.children):
+        child = node.children[label]
+        escaped = re.escape(label)
+        size = len(escaped) + child.size
+        if run and run_fits(run_size + size, run_groups + child.groups, len(run) + 1):
+            run.append(escaped + _emit(child))
+            run_size += size
+            run_groups += child.groups
+            continue
+        flush()
+        run = []
+        run_size = run_groups = 0
+        if run_fits(size, child.groups, 1):
+            run = [escaped + _emit(child)]
+            run_size, run_groups = size, child.groups
+        else:
+            _pack(child, prefix + escaped, fits, out)
+    flush()
@@ -226,6 +226,26 @@ class CommandTest(TestCase):
         self.assertEqual(captured["global"], "g_value")
         self.assertEqual(captured["local"], "l_value")
 
+    def test_bind(self):
+        """Test invoking a sub-command with the return value of its parent at hand"""
+        @args4p.group()
+        @args4p.option("--global", "global_opt")
+        def main(global_opt: Optional[str] = None):
+            self.fail("Shouldn't be called")
+
+        @main.command()
+        @args4p.option("--local", "local_opt")
+        @args4p.argument("arg")
+        def sub(context, arg: str, local_opt: Optional[str] = None):
+            return (context, arg, local_opt)
+
+        invoke = sub.bind("parent output", "--local=l_value", "a")
+        self.assertEqual(("parent output", "a", "l_value"), invoke())
+
+        # options of the parent aren't for the sub-command to take
+        with self.assertRaises(BadCmdLineException):
+            sub.bind("parent output", "--global", "g_value", "a")
+
     def test_type_conversion(self):
         """Test automatic type conversion"""
         received = {}
@@ -306,6 +326,18 @@ class CommandTest(TestCase):
         self.assertEqual(r["opt"], None)
         self.assertEqual(r["args"], ["--opt", "value"])
 
+    def test_dash_argument(self):
+        """A lone '-' is an argument, not an option"""
+        @args4p.command()
+        @args4p.option("--opt", "opt")
+        @args4p.argument("args", multiple=True)
+        def f(args: list[str], opt: str | None = None):
+            return {"opt": opt, "args": args}
+
+        r = f("-", "--opt", "value")
+        self.assertEqual(r["opt"], "value")
+        self.assertEqual(r["args"], ["-"])
+
     def test_custom_converter(self):
         @args4p.command()
         @args4p.argument("p1", type=lambda x: x.upper())
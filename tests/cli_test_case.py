@@ -13,6 +13,7 @@ import responses  # type: ignore
 from click.testing import CliRunner
 
 from smart_tests.__main__ import cli as main
+from smart_tests.commands.record.log_blobs import restore_logs
 from smart_tests.utils.env_keys import SESSION_DIR_KEY
 from smart_tests.utils.http_client import get_base_url
 
@@ -286,11 +287,16 @@ class CliTestCase(unittest.TestCase):
         if isinstance(request_body, bytes):
             # Try to decompress first, fall back to direct decoding if not compressed
             try:
-                return json.loads(gzip.decompress(request_body).decode())
+                payload = json.loads(gzip.decompress(request_body).decode())
             except gzip.BadGzipFile:
-                return json.loads(request_body.decode())
+                payload = json.loads(request_body.decode())
         else:
-            return json.loads(request_body)
+            payload = json.loads(request_body)
+
+        # reconstruct logs sent with --dedupe-logs, like the server does
+        if isinstance(payload, dict) and "logBlobs" in payload:
+            payload["events"] = restore_logs(payload["events"], payload.pop("logBlobs"))
+        return payload
 
     def assert_json_orderless_equal(self, a, b):
         """
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from smart_tests.commands.record.log_blobs import MIN_BLOB_SIZE, dedupe_logs, restore_logs
+
+
+class LogBlobsTest(TestCase):
+    def test_round_trip(self):
+        shared = "x" * MIN_BLOB_SIZE
+        events = [
+            {"testPath": "a", "stdout": shared, "stderr": "short"},
+            {"testPath": "b", "stdout": "".join(["x"] * MIN_BLOB_SIZE), "stderr": shared},
+            {"testPath": "c", "stdout": "y" * MIN_BLOB_SIZE, "stderr": ""},
+            {"testPath": "d", "stdout": "short", "stderr": "short"},
+        ]
+
+        deduped, blobs = dedupe_logs(events)
+        self.assertEqual(1, len(blobs))
+        self.assertEqual(shared, list(blobs.values())[0])
+        self.assertEqual("", deduped[0]["stdout"])
+        self.assertEqual(deduped[0]["stdoutBlob"], deduped[1]["stdoutBlob"])
+        self.assertEqual(deduped[0]["stdoutBlob"], deduped[1]["stderrBlob"])
+        # unique or short logs stay inline, and the input is left untouched
+        self.assertIs(events[2], deduped[2])
+        self.assertIs(events[3], deduped[3])
+        self.assertEqual(shared, events[0]["stdout"])
+
+        self.assertEqual(events, restore_logs(deduped, blobs))
+
+    def test_nothing_to_dedupe(self):
+        events = [{"stdout": "x" * MIN_BLOB_SIZE, "stderr": "y" * MIN_BLOB_SIZE}]
+        self.assertEqual((events, {}), dedupe_logs(events))
@@ -1,6 +1,7 @@
 import gzip
 import json
 import os
+import shutil
 import sys
 import tempfile
 from pathlib import Path
@@ -9,6 +10,7 @@ from unittest import mock
 import responses  # type: ignore
 
 from smart_tests.commands.record.tests import INVALID_TIMESTAMP, parse_launchable_timeformat
+from smart_tests.utils.chunker import AdaptiveChunker
 from tests.cli_test_case import CliTestCase
 
 
@@ -88,3 +90,113 @@ class TestsTest(CliTestCase):
 
         self.assert_success(result)
         self.assertIn("Total test duration is 0.", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_duplicate_report_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for d in ['surefire-reports', 'surefire-reports/junitreports', 'copied']:
+                os.makedirs(os.path.join(tmpdir, d))
+                shutil.copy(self.report_files_dir.joinpath('reports/TEST-1.xml'), os.path.join(tmpdir, d))
+
+            result = self.cli('record', 'tests', 'maven', '--session', self.session, tmpdir + "/**/")
+            self.assert_success(result)
+
+        request = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())
+        self.assertEqual(1, len(request['events']))
+        self.assertIn("from 1 files", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_duplicate_events_across_report_files(self):
+        def report(extra_case: str) -> str:
+            return ('<testsuite name="FooTest" timestamp="2021-10-05T12:34:00">'
+                    '<testcase classname="FooTest" name="testA" time="1.5"/>'
+                    f'<testcase classname="FooTest" name="{extra_case}" time="0.5"/>'
+                    '</testsuite>')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, case in [('TEST-a.xml', 'testB'), ('TEST-b.xml', 'testC')]:
+                with open(os.path.join(tmpdir, name), 'w') as f:
+                    f.write(report(case))
+
+            result = self.cli('record', 'tests', 'maven', '--session', self.session, tmpdir)
+            self.assert_success(result)
+
+        request = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())
+        self.assertCountEqual(['testA', 'testB', 'testC'], [e['testPath'][-1]['name'] for e in request['events']])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_post_chunk_bytes(self):
+        reports = str(Path(__file__).parent.joinpath('../../data/minitest/').resolve())
+        result = self.cli('record', 'tests', 'minitest', '--session', self.session, '--post-chunk-bytes', 1, reports)
+        self.assert_success(result)
+
+        # every event is larger than the budget, so each one gets its own request
+        requests = [json.loads(gzip.decompress(c.request.body).decode()) for c in responses.calls
+                    if c.request.url.endswith('/events')]
+        self.assertGreater(len(requests), 1)
+        self.assertTrue(all(len(r['events']) == 1 for r in requests))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_log_retention(self):
+        log = "BEGIN" + "x" * 10 * 1024 + "END"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'TEST-a.xml'), 'w') as f:
+                f.write('<testsuite name="FooTest" timestamp="2021-10-05T12:34:00">'
+                        '<testcase classname="FooTest" name="testA" time="1.5">'
+                        f'<failure message="boom">{log}</failure>'
+                        f'<system-out>{log}</system-out>'
+                        '</testcase></testsuite>')
+
+            result = self.cli('record', 'tests', 'maven', '--session', self.session,
+                              '--log-head-size', 1, '--log-tail-size', 2, tmpdir)
+            self.assert_success(result)
+            event = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events'][0]
+            for name in ['stdout', 'stderr']:
+                self.assertTrue(event[name].startswith("BEGIN"), name)
+                self.assertTrue(event[name].endswith("END"), name)
+                self.assertIn(f"{len(log) - 3 * 1024} characters truncated", event[name])
+                self.assertLess(len(event[name]), 4 * 1024)
+
+            responses.calls.reset()
+            result = self.cli('record', 'tests', 'maven', '--session', self.session, '--no-log-limit', tmpdir)
+            self.assert_success(result)
+            event = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events'][0]
+            self.assertEqual(log, event['stdout'])
+            self.assertEqual(log, event['stderr'])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_dedupe_logs(self):
+        log = "Caused by: java.lang.IllegalStateException\n" * 100
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'TEST-a.xml'), 'w') as f:
+                f.write('<testsuite name="FooTest" timestamp="2021-10-05T12:34:00">')
+                for i in range(10):
+                    f.write(f'<testcase classname="FooTest" name="test{i}" time="1.5"><failure>{log}</failure></testcase>')
+                f.write('</testsuite>')
+
+            with mock.patch.object(AdaptiveChunker, "observe") as observe:
+                result = self.cli('record', 'tests', 'maven', '--session', self.session, tmpdir)
+                self.assert_success(result)
+                observe.assert_called()
+
+                observe.reset_mock()
+                responses.calls.reset()
+                result = self.cli('record', 'tests', 'maven', '--session', self.session, '--dedupe-logs', tmpdir)
+                self.assert_success(result)
+                # the deduplicated body says nothing about how the events compress
+                observe.assert_not_called()
+
+        body = self.find_request('/events').request.body
+        raw = json.loads(gzip.decompress(body).decode())
+        self.assertEqual(1, len(raw['logBlobs']))
+        self.assertTrue(all(e['stderr'] == "" for e in raw['events']))
+
+        # the server reconstructs the original logs
+        events = self.decode_request_body(body)['events']
+        self.assertEqual(10, len(events))
+        self.assertTrue(all(e['stderr'] == log and 'stderrBlob' not in e for e in events))
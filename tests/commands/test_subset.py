@@ -1,9 +1,13 @@
+import io
+import json
 import os
 import tempfile
-from unittest import mock
+from unittest import TestCase, mock
 
 import responses  # type: ignore
 
+from smart_tests.commands.subset import SubsetResult
+from smart_tests.utils import test_path_table
 from smart_tests.utils.http_client import get_base_url
 from tests.cli_test_case import CliTestCase
 
@@ -240,6 +244,138 @@ class SubsetTest(CliTestCase):
         rest.close()
         os.unlink(rest.name)
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_streamed_output(self):
+        pipe = "test_1.py\ntest_2.py\ntest_3.py\ntest_4.py"
+
+        def run(body: str, observation: bool = False):
+            responses.replace(responses.POST,
+                              f"{get_base_url()}/intake/organizations/{self.organization}/workspaces/{self.workspace}/subset",
+                              body=body, content_type="application/json", status=200)
+            with tempfile.TemporaryDirectory() as tempdir:
+                rest = os.path.join(tempdir, "rest.txt")
+                result = self.cli("subset", "file", "--target", "30%", "--session", self.session, "--rest", rest,
+                                  mix_stderr=False, input=pipe)
+                self.assert_success(result)
+                with open(rest) as f:
+                    return result, f.read()
+
+        def response(observation: bool) -> dict:
+            # the flags come first, so the test paths can be written out as they arrive
+            return {
+                "isBrainless": False,
+                "isObservation": observation,
+                "subsettingId": 123,
+                "testPaths": [[{"type": "file", "name": "test_1.py"}], [{"type": "file", "name": "test_2.py"}]],
+                "rest": [[{"type": "file", "name": "test_3.py"}]],
+                "summary": {
+                    "subset": {"duration": 10, "candidates": 2, "rate": 50},
+                    "rest": {"duration": 10, "candidates": 1, "rate": 50}
+                },
+            }
+
+        result, rest = run(json.dumps(response(observation=False)))
+        self.assertEqual("test_1.py\ntest_2.py\n", result.stdout)
+        self.assertEqual("test_3.py", rest)
+        # counted as they were read
+        self.assertRegex(result.stderr, r"\| Subset +\| +2 \|")
+        self.assertRegex(result.stderr, r"\| Remainder +\| +1 \|")
+
+        result, rest = run(json.dumps(response(observation=True)))
+        self.assertEqual("test_1.py\ntest_2.py\ntest_3.py\n", result.stdout)
+        self.assertEqual("", rest)
+
+        # the response breaks off after some of the subset is printed. The fallback adds the tests not printed yet
+        body = json.dumps(response(observation=False))
+        result, rest = run(body[:body.index("test_2.py")])
+        self.assertEqual("test_1.py\ntest_2.py\ntest_3.py\ntest_4.py\n", result.stdout)
+        self.assertEqual("", rest)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_compact_test_paths(self):
+        url = f"{get_base_url()}/intake/organizations/{self.organization}/workspaces/{self.workspace}/subset"
+
+        def server(request):
+            """stand-in for the subset API, which picks every other test and answers in the same encoding"""
+            payload = self.decode_request_body(request.body)
+            compact = payload.get("testPathEncoding") == test_path_table.ENCODING
+            test_paths = payload["testPaths"]
+            if compact:
+                test_paths = test_path_table.decode(payload["testPathTable"], test_paths)
+            subset, rest = test_paths[::2], test_paths[1::2]
+            response = {
+                "isBrainless": False,
+                "isObservation": False,
+                "subsettingId": 123,
+                "summary": {"subset": {"rate": 50, "duration": 1}, "rest": {"rate": 50, "duration": 1}},
+            }
+            if compact:
+                table, paths = test_path_table.encode(subset + rest)
+                response.update(testPathEncoding=test_path_table.ENCODING, testPathTable=table,
+                                testPaths=paths[:len(subset)], rest=paths[len(subset):])
+            else:
+                response.update(testPaths=subset, rest=rest)
+            return 200, {}, json.dumps(response)
+
+        responses.remove(responses.POST, url)
+        responses.add_callback(responses.POST, url, callback=server, content_type="application/json")
+
+        pipe = "\n".join(f"src/test/java/com/example/Foo{i}Test.java" for i in range(10))
+
+        def run(*args: str):
+            with tempfile.TemporaryDirectory() as tempdir:
+                rest = os.path.join(tempdir, "rest.txt")
+                result = self.cli("subset", "file", "--target", "50%", "--session", self.session, "--rest", rest, *args,
+                                  mix_stderr=False, input=pipe)
+                self.assert_success(result)
+                with open(rest) as f:
+                    return result.stdout, f.read()
+
+        expected = run()
+        self.assertEqual(5, len(expected[0].splitlines()))
+        self.assertEqual(expected, run("--compact-test-paths"))
+        payload = self.decode_request_body(responses.calls[-1].request.body)
+        self.assertEqual(test_path_table.ENCODING, payload["testPathEncoding"])
+        self.assertEqual([[i] for i in range(10)], payload["testPaths"])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_prioritized_tests_mapping_changed_files(self):
+        mapping = {
+            "format": "prioritized-tests-v1",
+            "mappings": {"main": {"src/payment": ["file=test/payment_test.py"], "src/ui": ["file=test/ui_test.py"]}},
+        }
+        with tempfile.TemporaryDirectory() as tempdir:
+            mapping_file = os.path.join(tempdir, "mapping.json")
+            with open(mapping_file, "w") as f:
+                json.dump(mapping, f)
+            changed_files = os.path.join(tempdir, "changed.txt")
+            with open(changed_files, "w") as f:
+                f.write("src/payment/api.py\n\nREADME.md\n")
+
+            def subset(*args: str):
+                result = self.cli("subset", "file", "--target", "30%", "--session", self.session,
+                                  "--prioritized-tests-mapping", mapping_file, *args, mix_stderr=False, input="test_1.py")
+                self.assert_success(result)
+                calls = []
+                for c in responses.calls:
+                    assert c.request.url is not None
+                    if c.request.url.endswith('/subset'):
+                        calls.append(c)
+                return self.decode_request_body(calls[-1].request.body)
+
+            self.assertEqual(mapping, subset()["prioritizedTestsMapping"])
+            self.assertEqual(
+                {"format": "prioritized-tests-v1", "mappings": {"main": {"src/payment": ["file=test/payment_test.py"]}}},
+                subset("--changed-files", changed_files)["prioritizedTestsMapping"])
+
+            result = self.cli("subset", "file", "--target", "30%", "--session", self.session,
+                              "--changed-files", changed_files, mix_stderr=False, input="test_1.py")
+            self.assertEqual(1, result.exit_code)
+            self.assertIn("require --prioritized-tests-mapping", result.stderr)
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_subset_targetless(self):
@@ -279,6 +415,13 @@ class SubsetTest(CliTestCase):
         payload = self.decode_request_body(self.find_request('/subset').request.body)
         self.assertTrue(payload.get('useServerSideOptimizationTarget'))
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_input_matches_no_tests(self):
+        result = self.cli("subset", "file", "--session", self.session, input="no/such/dir/*.py", mix_stderr=False)
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("Given arguments did not match any tests", result.stderr)
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_confidence_subset_with_empty_valid_subset_when_pts_v2_enabled(self):
@@ -676,6 +819,21 @@ class SubsetTest(CliTestCase):
         payload = self.decode_request_body(self.find_request('/subset').request.body)
         self.assertIn([{"type": "file", "name": "tests/commands/test_subset.py"}], payload.get("testPaths", []))
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_with_get_tests_from_guess_pathspec(self):
+        result = self.cli("subset", "file", "--session", self.session, "--get-tests-from-guess",
+                          "--guess-pathspec", "tests/commands", "--guess-pathspec", ":(exclude)tests/commands/record")
+        self.assert_success(result)
+        payload = self.decode_request_body(self.find_request('/subset').request.body)
+        files = [p[0]["name"] for p in payload["testPaths"]]
+        self.assertIn("tests/commands/test_subset.py", files)
+        self.assertTrue(all(f.startswith("tests/commands/") and "/record/" not in f for f in files), files)
+
+        result = self.cli("subset", "file", "--session", self.session, "--guess-pathspec", "tests")
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("--guess-pathspec requires --get-tests-from-guess", result.output)
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_subset_with_bin_option(self):
@@ -1083,3 +1241,54 @@ class SubsetTest(CliTestCase):
             self.assertEqual(payload.get('subsettingId'), self.subsetting_id)
         finally:
             os.unlink(id_file_path)
+
+
+class SubsetResultTest(TestCase):
+    def test_from_stream(self):
+        class Output:
+            def __init__(self):
+                self.accepted = []
+
+            def accept(self, result, key, test_path):
+                if "isObservation" not in result.received:
+                    return False
+                self.accepted.append((key, test_path[0]["name"]))
+                return True
+
+        paths = {
+            "testPaths": [[{"type": "file", "name": "a"}], [{"type": "file", "name": "b"}]],
+            "rest": [[{"type": "file", "name": "c"}]],
+        }
+        flags = {"subsettingId": 1, "summary": {"subset": {}}, "isBrainless": True, "isObservation": False}
+
+        response = {**paths, **flags}
+        output = Output()
+        result = SubsetResult.from_stream(io.StringIO(json.dumps(response)), output)  # type: ignore
+        # same as reading it whole
+        expected = SubsetResult.from_response(response)
+        for attr in ("subset", "rest", "subset_id", "summary", "is_brainless", "is_observation", "subset_count",
+                     "rest_count"):
+            self.assertEqual(getattr(expected, attr), getattr(result, attr), attr)
+        self.assertEqual([], output.accepted)
+
+        # the flags arrive first, so the output takes the test paths as they come, and they are only counted
+        output = Output()
+        result = SubsetResult.from_stream(io.StringIO(json.dumps({**flags, **paths})), output)  # type: ignore
+        self.assertEqual([("testPaths", "a"), ("testPaths", "b"), ("rest", "c")], output.accepted)
+        self.assertEqual(([], [], 2, 1), (result.subset, result.rest, result.subset_count, result.rest_count))
+
+    def test_from_stream_compact_test_paths(self):
+        subset = [[{"type": "file", "name": "src/a_test.py"}], [{"type": "file", "name": "src/b_test.py"}]]
+        rest = [[{"type": "file", "name": "src/c_test.py"}]]
+        table, paths = test_path_table.encode(subset + rest)
+        encoded = {"testPaths": paths[:2], "rest": paths[2:]}
+
+        # whether the table comes before or after the test paths
+        for response in ({"testPathTable": table, **encoded}, {**encoded, "testPathTable": table}):
+            result = SubsetResult.from_stream(io.StringIO(json.dumps(response)))
+            self.assertEqual((subset, rest), (result.subset, result.rest))
+            result = SubsetResult.from_response(response)
+            self.assertEqual((subset, rest), (result.subset, result.rest))
+
+        with self.assertRaises(ValueError):
+            SubsetResult.from_stream(io.StringIO(json.dumps(encoded)))
@@ -0,0 +1,101 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import responses  # type: ignore
+
+from smart_tests.utils.http_client import get_base_url
+from tests.cli_test_case import CliTestCase
+
+
+class SubsetMultiTest(CliTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        url = f"{get_base_url()}/intake/organizations/{self.organization}/workspaces/{self.workspace}/subset"
+
+        def server(request):
+            """stand-in for the subset API, which picks every other test"""
+            test_paths = self.decode_request_body(request.body)["testPaths"]
+            return 200, {}, json.dumps({
+                "testPaths": test_paths[::2],
+                "rest": test_paths[1::2],
+                "isBrainless": False,
+                "isObservation": False,
+                "subsettingId": 123,
+                "summary": {"subset": {"rate": 50, "duration": 1}, "rest": {"rate": 50, "duration": 1}},
+            })
+
+        responses.remove(responses.POST, url)
+        responses.add_callback(responses.POST, url, callback=server, content_type="application/json")
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name: str, content: str) -> str:
+        Path(self.path(name)).write_text(content)
+        return self.path(name)
+
+    def read(self, name: str) -> str:
+        return Path(self.path(name)).read_text()
+
+    def multi(self, spec: str, *args: str):
+        return self.cli("subset", "--session", self.session, *args, "multi", "--spec", self.write("spec.toml", spec),
+                        mix_stderr=False)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_multi(self):
+        self.write("files.txt", "test_1.py\ntest_2.py\ntest_3.py\n")
+        self.write("go.txt", "TestFoo\nTestBar\nTestBaz\nok      github.com/example/pkg      0.1s\n")
+        result = self.multi(f"""
+            [[subset]]
+            runner = "file"
+            input = "{self.path('files.txt')}"
+            output = "{self.path('file-subset.txt')}"
+            rest = "{self.path('file-rest.txt')}"
+
+            [[subset]]
+            runner = "go-test"
+            input = "{self.path('go.txt')}"
+            output = "{self.path('go-subset.txt')}"
+        """, "--target", "50%")
+        self.assert_success(result)
+        self.assertEqual("", result.stdout)
+
+        # each in the way the test runner prints it
+        self.assertEqual("test_1.py\ntest_3.py\n", self.read("file-subset.txt"))
+        self.assertEqual("test_2.py", self.read("file-rest.txt"))
+        self.assertEqual("^Test(Baz|Foo)$\n", self.read("go-subset.txt"))
+
+        requests = [c.request for c in responses.calls if c.request.url.endswith("/subset")]
+        payloads = {p["testRunner"]: p for p in (self.decode_request_body(r.body) for r in requests)}
+        self.assertEqual({"file", "go-test"}, set(payloads))
+        for p in payloads.values():
+            self.assertEqual(0.5, p["goal"]["percentage"])
+            self.assertEqual(str(self.session_id), p["session"]["id"])
+        self.assertEqual(3, len(payloads["go-test"]["testPaths"]))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_multi_errors(self):
+        for spec, error in [
+            ('runner = "file"', "expecting [[subset]] tables"),
+            ('[[subset]]\nrunner = "file"', "[[subset]] #1 is missing `output`"),
+            ('[[subset]]\nrunner = "file"\noutput = "a"\nouptut = "b"', "unknown keys in [[subset]] #1: ouptut"),
+            ('[[subset]]\nrunner = "file"\noutput = "a"\nargs = "b"', "`args` of [[subset]] #1 isn't a list"),
+            ('[[subset]]\nrunner = "file"\noutput = "a"\n[[subset]]\nrunner = "go-test"\noutput = "a"',
+             "can't write to the same file"),
+            (f'[[subset]]\nrunner = "file"\noutput = "{self.path("out.txt")}"', "`input` in the spec"),
+        ]:
+            result = self.multi(spec)
+            self.assert_exit_code(result, 1)
+            self.assertIn(error, result.stderr, spec)
+
+        result = self.multi('[[subset]]\nrunner = "file"\noutput = "a"', "--rest", "rest.txt")
+        self.assert_exit_code(result, 1)
+        self.assertIn("subset multi cannot be used with --rest", result.stderr)
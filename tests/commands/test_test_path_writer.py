@@ -0,0 +1,131 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from smart_tests.commands.test_path_writer import TestPathWriter
+from smart_tests.test_runners import dotnet, gradle, karma
+from smart_tests.testpath import TestPath
+
+
+class Writer(TestPathWriter):
+    def __init__(self, candidates):
+        super().__init__(None)  # type: ignore
+        self.candidates = candidates
+        self.compact_output = True
+
+    def compaction_candidates(self):
+        return self.candidates
+
+
+def classes(*names: str) -> list[TestPath]:
+    return [[{"type": "class", "name": n}] for n in names]
+
+
+class TestPathWriterTest(TestCase):
+    def gradle_writer(self, candidates):
+        w = Writer(candidates)
+        w.formatter = lambda x: x[0]['name']
+        w.ancestors = gradle.package_wildcards
+        return w
+
+    def test_compact(self):
+        candidates = classes("a.b.ATest", "a.b.BTest", "a.b.c.CTest", "a.DTest", "x.XTest")
+        w = self.gradle_writer(candidates)
+
+        self.assertEqual(["a.b.c.*", "a.b.ATest"], w.format(classes("a.b.c.CTest", "a.b.ATest")))
+        self.assertEqual(["a.b.*"], w.format(classes("a.b.ATest", "a.b.c.CTest", "a.b.BTest")))
+        self.assertEqual(["a.DTest", "a.b.ATest", "a.b.c.*"], w.format(classes("a.DTest", "a.b.ATest", "a.b.c.CTest")))
+        # the farthest group that's complete, where the first of its tests was
+        self.assertEqual(["x.*", "a.*"], w.format(classes("x.XTest", "a.DTest", "a.b.ATest", "a.b.c.CTest", "a.b.BTest")))
+        self.assertEqual([], w.format([]))
+
+        # tests outside of the candidates and duplicates don't complete a group
+        w = self.gradle_writer(classes("a.b.ATest", "a.b.BTest"))
+        self.assertEqual(["a.b.ATest", "a.b.OtherTest"], w.format(classes("a.b.ATest", "a.b.OtherTest", "a.b.ATest")))
+
+        # without candidates, nothing can be collapsed
+        self.assertEqual(["a.b.ATest"], self.gradle_writer([]).format(classes("a.b.ATest")))
+        # nor when it's not asked
+        w = self.gradle_writer(classes("a.b.ATest"))
+        w.compact_output = False
+        self.assertEqual(["a.b.ATest"], w.format(classes("a.b.ATest")))
+
+    def test_compact_groups_that_look_the_same(self):
+        def case(assembly: str, cls: str, name: str) -> TestPath:
+            return [{"type": "Assembly", "name": assembly}, {"type": "TestSuite", "name": "NS"},
+                    {"type": "TestSuite", "name": cls}, {"type": "TestCase", "name": name}]
+
+        w = Writer([case("a.dll", "A", "t1"), case("a.dll", "A", "t2"), case("b.dll", "B", "t1")])
+        w.formatter = lambda x: ".".join(p["name"] for p in x if p["type"] != "Assembly")
+        w.ancestors = dotnet.test_suites
+        # 'NS' of a.dll is complete, but printing 'NS' would select tests in 'NS' of b.dll
+        self.assertEqual(["NS.A"], w.format([case("a.dll", "A", "t1"), case("a.dll", "A", "t2")]))
+        self.assertEqual(["NS"], w.format(w.candidates))
+
+    def test_compact_ng_include(self):
+        files = [[{"type": "file", "name": n}] for n in ["src/a/x.spec.ts", "src/a/y.spec.js", "src/b/z.spec.tsx"]]
+        w = Writer(files)
+        w.formatter = lambda x: x[0]['name']
+        w.ancestors = karma.ng_include_dirs
+        # a directory doesn't stand for '*.spec.js' files in it
+        self.assertEqual(["src/a"], w.format(files[0:1]))
+        self.assertEqual(["src"], w.format(files[0:1] + files[2:]))
+        self.assertEqual(["src", "src/a/y.spec.js"], w.format(files))
+
+    def test_output_max_bytes(self):
+        w = Writer([])
+        w.separator = "|"
+        w.formatter = lambda x: f"^{x[0]['name']}$"
+        tests = classes("aaaa", "bbbb", "cccccccccccccccccccc", "dd", "é")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            w.max_output_bytes = 15
+            w.output_chunks_dir = os.path.join(tempdir, "chunks")
+            with CliRunner().isolation() as (out, _):
+                w.print(tests)
+            files = out.getvalue().decode().splitlines()
+            self.assertEqual([os.path.join(tempdir, "chunks", f"subset_{i}") for i in range(3)], files)
+            chunks = []
+            for f in files:
+                with open(f, encoding="utf-8") as r:
+                    chunks.append(r.read())
+            # an entry larger than the limit gets a file of its own
+            self.assertEqual(["^aaaa$|^bbbb$", "^cccccccccccccccccccc$", "^dd$|^é$"], chunks)
+
+            # small enough
+            w.max_output_bytes = 100
+            open(os.path.join(tempdir, "chunks", "subset_7"), "w").close()
+            with CliRunner().isolation() as (out, _):
+                w.print(tests)
+            self.assertEqual("^aaaa$|^bbbb$|^cccccccccccccccccccc$|^dd$|^é$\n", out.getvalue().decode())
+            # nothing is written, so nothing is removed either
+            self.assertEqual([".smart-tests-chunks", "subset_0", "subset_1", "subset_2", "subset_7"],
+                             sorted(os.listdir(os.path.join(tempdir, "chunks"))))
+
+            # files of the earlier subset are removed, so that they aren't mistaken for a part of this one, but only
+            # the ones written here
+            w.max_output_bytes = 40
+            with CliRunner().isolation() as (out, _):
+                w.print(tests)
+            self.assertEqual([".smart-tests-chunks", "subset_0", "subset_1", "subset_7"],
+                             sorted(os.listdir(os.path.join(tempdir, "chunks"))))
+
+    def test_output_max_bytes_fits(self):
+        w = Writer([])
+        w.max_output_bytes = 100
+        with tempfile.TemporaryDirectory() as tempdir, CliRunner().isolation() as (out, _):
+            cwd = os.getcwd()
+            os.chdir(tempdir)
+            try:
+                for name in ["subset_0", "subset_1"]:
+                    with open(name, "w") as f:
+                        f.write("mine")
+                w.print(classes("a", "b"))
+                self.assertEqual(["subset_0", "subset_1"], sorted(os.listdir(".")))
+                # chunks wouldn't be written to the current directory either
+                self.assertNotEqual(".", os.path.normpath(w.output_chunks_dir))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual("a\nb\n", out.getvalue().decode())
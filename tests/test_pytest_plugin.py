@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+import responses  # type: ignore
+
+from smart_tests.commands.record.case_event import CaseEvent
+from smart_tests.pytest_recorder import SmartTestsRecorder, case_event_from_report
+from smart_tests.utils.session import SessionId
+from tests.cli_test_case import CliTestCase
+
+
+def report(nodeid: str, when: str = "call", outcome: str = "passed", **kwargs):
+    r = dict(nodeid=nodeid, when=when, outcome=outcome, duration=0.5, longrepr=None, longreprtext="",
+             capstdout="", capstderr="", start=1700000000.0, stop=1700000000.5)
+    r.update(kwargs)
+    return SimpleNamespace(**r)
+
+
+class PytestPluginTest(CliTestCase):
+    def test_case_event_from_report(self):
+        e = case_event_from_report(report("tests/test_mod.py::TestClass::test_a", capstdout="hello"))
+        assert e is not None
+        self.assertEqual([
+            {"type": "file", "name": "tests/test_mod.py"},
+            {"type": "class", "name": "tests.test_mod.TestClass"},
+            {"type": "testcase", "name": "test_a"},
+        ], e["testPath"])
+        self.assertEqual(CaseEvent.TEST_PASSED, e["status"])
+        self.assertEqual(0.5, e["duration"])
+        self.assertEqual("hello", e["stdout"])
+        self.assertEqual({"start_timestamp": "2023-11-14T22:13:20+00:00",
+                          "stop_timestamp": "2023-11-14T22:13:20.500000+00:00"}, e["data"])
+
+        e = case_event_from_report(report("tests/test_mod.py::test_b", outcome="failed", longrepr=object(),
+                                          longreprtext="assert 1 == 2", capstderr="oops"))
+        assert e is not None
+        self.assertEqual(CaseEvent.TEST_FAILED, e["status"])
+        self.assertEqual("assert 1 == 2\noops", e["stderr"])
+
+        e = case_event_from_report(report("tests/test_mod.py::test_c", when="setup", outcome="skipped",
+                                          longrepr=("tests/test_mod.py", 3, "Skipped: not yet")))
+        assert e is not None
+        self.assertEqual(CaseEvent.TEST_SKIPPED, e["status"])
+        self.assertEqual("Skipped: not yet", e["stderr"])
+
+        self.assertIsNone(case_event_from_report(report("tests/test_mod.py::test_c", when="setup")))
+        self.assertIsNone(case_event_from_report(report("tests/test_mod.py::test_c", when="teardown")))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_recorder(self):
+        recorder = SmartTestsRecorder(SessionId(self.session), batch_size=2, flush_interval=60)
+        for name in ["test_a", "test_b", "test_c"]:
+            recorder.pytest_runtest_logreport(report(f"tests/test_mod.py::{name}", when="setup"))
+            recorder.pytest_runtest_logreport(report(f"tests/test_mod.py::{name}"))
+            recorder.pytest_runtest_logreport(report(f"tests/test_mod.py::{name}", when="teardown"))
+        # relayed from a pytest-xdist worker, which records it by itself
+        recorder.pytest_runtest_logreport(report("tests/test_mod.py::test_d", node=object()))
+        recorder.pytest_unconfigure(None)
+
+        self.assertEqual(3, recorder.uploader.sent)
+        self.assertEqual([], recorder.uploader.errors)
+        batches = [self.decode_request_body(self.find_request('/events', n).request.body) for n in range(2)]
+        self.assertEqual([["test_a", "test_b"], ["test_c"]],
+                         [[e["testPath"][-1]["name"] for e in b["events"]] for b in batches])
+        self.assertEqual("pytest", batches[0]["testRunner"])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_recorder_flush_interval(self):
+        recorder = SmartTestsRecorder(SessionId(self.session), flush_interval=0.01)
+        recorder.pytest_runtest_logreport(report("tests/test_mod.py::test_a"))
+        # sent without waiting for the batch to fill up, or for the test run to finish
+        for _ in range(500):
+            if recorder.uploader.sent:
+                break
+            recorder.uploader._thread.join(0.01)
+        self.assertEqual(1, recorder.uploader.sent)
+        recorder.pytest_unconfigure(None)
+
+    def test_inactive_plugin_imports_little(self):
+        # pytest loads the plugin in every run in the environment, recording or not
+        code = "import sys, smart_tests.pytest_plugin; print(sorted(m for m in sys.modules if m.startswith('smart_tests.')))"
+        modules = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True,
+                                 check=True).stdout
+        self.assertEqual("['smart_tests.pytest_plugin']", modules.strip())
@@ -2,10 +2,16 @@ import gzip
 import itertools
 import json
 import os
+import tempfile
+import threading
+import time
+from pathlib import Path
 from unittest import mock
 
 import responses  # type: ignore
 
+from smart_tests.test_runners.bazel import follow_build_event_json, test_report_of
+from smart_tests.utils.log_retention import LogRetention
 from tests.cli_test_case import CliTestCase
 
 
@@ -63,6 +69,164 @@ Loading: 2 packages loaded
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_with_multiple_build_event_json_result.json')
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_test_with_follow_bep(self):
+        result = self.cli('record', 'tests', 'bazel', '--session', self.session,
+                          '--follow-bep', str(self.test_files_dir.joinpath("build_event.json")),
+                          str(self.test_files_dir) + "/")
+        self.assert_success(result)
+
+        # each test target is sent as soon as it's reported
+        requests = [self.decode_request_body(c.request.body) for c in responses.calls if c.request.url.endswith('/events')]
+        self.assertGreater(len(requests), 1)
+        payload = requests[0]
+        payload['events'] = [e for r in requests for e in r['events']]
+        self.assert_record_tests_payload('record_test_with_build_event_json_result.json', payload=payload)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_test_shares_test_log(self):
+        log = "INFO: running tests\n" * 100
+        with tempfile.TemporaryDirectory() as workspace:
+            target = Path(workspace, "bazel-testlogs", "foo", "bar")
+            target.mkdir(parents=True)
+            target.joinpath("test.log").write_text(log)
+            with target.joinpath("test.xml").open("w") as f:
+                f.write('<testsuites>')
+                for suite in ["FooTest", "BarTest"]:
+                    f.write(f'<testsuite name="{suite}" timestamp="2021-10-05T12:34:00">')
+                    for i in range(3):
+                        f.write(f'<testcase classname="{suite}" name="test{i}" time="0.1"/>')
+                    f.write('</testsuite>')
+                f.write('</testsuites>')
+
+            read_file = LogRetention.read_file
+            with mock.patch.object(LogRetention, "read_file", autospec=True, side_effect=read_file) as m:
+                # without --dedupe-logs, which Bazel doesn't need
+                result = self.cli('record', 'tests', 'bazel', '--session', self.session, workspace)
+                self.assert_success(result)
+                self.assertEqual(1, m.call_count)
+
+        body = self.find_request('/events').request.body
+        raw = json.loads(gzip.decompress(body).decode())
+        self.assertEqual(6, len(raw['events']))
+        self.assertEqual([log], list(raw['logBlobs'].values()))
+        self.assertTrue(all(e['stdout'] == log for e in self.decode_request_body(body)['events']))
+
+    def test_follow_build_event_json(self):
+        events = [
+            {"id": {"started": {}}},
+            {"id": {"testResult": {"label": "//foo/bar:zot", "run": 1}}},
+            {"id": {"testResult": {"label": "//foo:baz", "run": 1}}},
+            {"id": {"buildFinished": {}}},
+            {"id": {"testResult": {"label": "//never:reported", "run": 1}}},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = Path(tmpdir, "build_event.json")
+
+            def bazel():
+                # write events bit by bit, like Bazel does while running tests
+                with open(file, "w") as f:
+                    for e in events:
+                        line = json.dumps(e) + "\n"
+                        f.write(line[:10])
+                        f.flush()
+                        time.sleep(0.01)
+                        f.write(line[10:])
+                        f.flush()
+
+            t = threading.Thread(target=bazel)
+            t.start()
+            try:
+                labels = [r["label"] for r in follow_build_event_json(file, poll_interval=0.001, idle_timeout=10)]
+            finally:
+                t.join()
+        self.assertEqual(["//foo/bar:zot", "//foo:baz"], labels)
+
+    def test_follow_build_event_json_idle_timeout(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = Path(tmpdir, "build_event.json")
+            file.write_text(json.dumps({"id": {"testResult": {"label": "//foo:bar"}}}) + "\n")
+            self.assertEqual([{"label": "//foo:bar"}],
+                             list(follow_build_event_json(file, poll_interval=0.001, idle_timeout=0.05)))
+
+    def test_follow_build_event_json_from_earlier_build(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = Path(tmpdir, "build_event.json")
+            file.write_text(json.dumps({"id": {"testResult": {"label": "//foo:old"}}}) + "\n")
+            os.utime(file, (time.time() - 60, time.time() - 60))
+            self.assertEqual([], list(follow_build_event_json(file, poll_interval=0.001, idle_timeout=0.05,
+                                                              not_before=time.time() - 30)))
+
+            def bazel():
+                time.sleep(0.05)
+                file.write_text("".join(json.dumps(e) + "\n" for e in [
+                    {"id": {"testResult": {"label": "//foo:new"}}}, {"id": {"buildFinished": {}}}]))
+
+            t = threading.Thread(target=bazel)
+            t.start()
+            try:
+                results = list(follow_build_event_json(file, poll_interval=0.001, idle_timeout=10,
+                                                       not_before=time.time() - 30))
+            finally:
+                t.join()
+            self.assertEqual([{"label": "//foo:new"}], results)
+
+    def test_test_report_of(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = Path(tmpdir)
+            for f in ["foo/bar/test.xml", "foo/bar/test_attempts/attempt_1.xml", "foo/sharded/shard_2_of_2/test.xml",
+                      "foo/runs/run_3_of_3/test.xml", "foo/both/shard_1_of_2_run_2_of_2/test.xml"]:
+                base.joinpath(f).parent.mkdir(parents=True, exist_ok=True)
+                base.joinpath(f).write_text("")
+
+            for test_result, report in [
+                ({"label": "//foo:bar", "run": 1, "shard": 1, "attempt": 1}, "foo/bar/test_attempts/attempt_1.xml"),
+                ({"label": "//foo:bar", "run": 1, "shard": 1, "attempt": 2}, "foo/bar/test.xml"),
+                ({"label": "//foo:sharded", "run": 1, "shard": 2, "attempt": 1}, "foo/sharded/shard_2_of_2/test.xml"),
+                ({"label": "//foo:runs", "run": 3, "shard": 1, "attempt": 1}, "foo/runs/run_3_of_3/test.xml"),
+                ({"label": "//foo:both", "run": 2, "shard": 1, "attempt": 1}, "foo/both/shard_1_of_2_run_2_of_2/test.xml"),
+            ]:
+                self.assertEqual(base.joinpath(report), test_report_of(base, test_result))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_test_with_follow_bep_attempts_and_shards(self):
+        def report(*names: str) -> str:
+            return '<testsuite name="FooTest">' + "".join(f'<testcase classname="FooTest" name="{n}"/>' for n in names) + \
+                '</testsuite>'
+
+        with tempfile.TemporaryDirectory() as workspace:
+            testlogs = Path(workspace, "bazel-testlogs")
+            for f, content in [
+                ("foo/flaky/test_attempts/attempt_1.xml", report("attempt1")),
+                ("foo/flaky/test.xml", report("attempt2")),
+                ("foo/sharded/shard_1_of_2/test.xml", report("shard1")),
+                ("foo/sharded/shard_2_of_2/test.xml", report("shard2")),
+            ]:
+                testlogs.joinpath(f).parent.mkdir(parents=True, exist_ok=True)
+                testlogs.joinpath(f).write_text(content)
+            bep = Path(workspace, "build_event.json")
+            bep.write_text("".join(json.dumps(e) + "\n" for e in [
+                {"id": {"testResult": {"label": "//foo:flaky", "run": 1, "shard": 1, "attempt": 1}}},
+                {"id": {"testResult": {"label": "//foo:flaky", "run": 1, "shard": 1, "attempt": 2}}},
+                {"id": {"testResult": {"label": "//foo:sharded", "run": 1, "shard": 1, "attempt": 1}}},
+                {"id": {"testResult": {"label": "//foo:sharded", "run": 1, "shard": 2, "attempt": 1}}},
+                # announced again, e.g. by another event that refers to it
+                {"id": {"testResult": {"label": "//foo:sharded", "run": 1, "shard": 2, "attempt": 1}}},
+                {"id": {"buildFinished": {}}},
+            ]))
+
+            result = self.cli('record', 'tests', 'bazel', '--session', self.session, '--follow-bep', str(bep), workspace)
+            self.assert_success(result)
+
+        events = [e for c in responses.calls if c.request.url.endswith('/events')
+                  for e in self.decode_request_body(c.request.body)['events']]
+        self.assertEqual([("flaky", "attempt1"), ("flaky", "attempt2"), ("sharded", "shard1"), ("sharded", "shard2")],
+                         [(e['testPath'][1]['name'], e['testPath'][-1]['name']) for e in events])
+        self.assertEqual({"foo"}, {e['testPath'][0]['name'] for e in events})
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_subset_record_key_match(self):
@@ -55,14 +55,14 @@ class CTestTest(CliTestCase):
             rest_files.sort()
             if sys.version_info[:2] >= (3, 7):
                 self.assertEqual(subset_files, [
-                    '^FooTest\\.Bar$|^FooTest\\.Foo$',
+                    '^FooTest\\.(Bar|Foo)$',
                     '^\\*/ParameterizedTest\\.Bar/\\*$'
                 ])
             else:
                 # There was a change in re.escape behavior from Python 3.7. See
                 # https://docs.python.org/3/library/re.html#re.escape
                 self.assertEqual(subset_files, [
-                    '^FooTest\\.Bar$|^FooTest\\.Foo$',
+                    '^FooTest\\.(Bar|Foo)$',
                     '^\\*\\/ParameterizedTest\\.Bar\\/\\*$'
                 ])
             self.assertEqual(rest_files, ['^FooTest\\.Baz$'])
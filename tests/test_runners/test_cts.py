@@ -1,4 +1,6 @@
 import os
+import tempfile
+import tracemalloc
 from unittest import mock
 
 import responses
@@ -88,3 +90,74 @@ armeabi-v7a CtsAbiOverrideHostTestCases
                           str(self.test_files_dir) + "/test_result.xml")
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_result.json')
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_jobs(self):
+        with open(self.test_files_dir.joinpath("test_result.xml")) as f:
+            report = f.read()
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            reports = []
+            for i in range(3):
+                path = os.path.join(tempdir, f"test_result{i}.xml")
+                with open(path, "w") as f:
+                    f.write(report.replace('<Module name="', f'<Module name="copy{i}-'))
+                reports.append(path)
+
+            result = self.cli('record', 'tests', 'cts', '--session', self.session, '--jobs', '2', *reports)
+            self.assert_success(result)
+
+        payload = self.decode_request_body(self.find_request('/events').request.body)
+        for c in payload['events']:
+            del c['createdAt']
+
+        expected = self.load_json_from_file(self.test_files_dir.joinpath("record_test_result.json"))['events']
+        events = []
+        for i in range(3):
+            for e in expected:
+                module = dict(e['testPath'][0], name=f"copy{i}-{e['testPath'][0]['name']}")
+                events.append(dict(e, testPath=[module] + e['testPath'][1:]))
+        # in the order of the report files, even though they are parsed in parallel
+        self.assertEqual(events, payload['events'])
+
+    def test_parallel_parser_shutdown(self):
+        from smart_tests.test_runners.cts import ParallelParser
+
+        report = str(self.test_files_dir.joinpath("test_result.xml"))
+        client = mock.Mock(reports=[report, report + ".never-asked-for", report])
+        parser = ParallelParser(client, 2)
+        self.assertTrue(list(parser.parse_func(report)))
+        # the other report was submitted ahead of time, yet never asked for
+        self.assertIsNotNone(parser.executor)
+        parser.shutdown()
+        self.assertIsNone(parser.executor)
+        self.assertEqual({}, parser.futures)
+
+    def test_parse_func_discards_processed_subtrees(self):
+        from smart_tests.test_runners.cts import parse_func
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "test_result.xml")
+            metrics = "".join(f'<Metric key="metric{i}">{i}</Metric>' for i in range(100))
+            with open(path, "w") as f:
+                f.write('<Result><Module name="M" runtime="1000"><TestCase name="C">')
+                for i in range(2000):
+                    if i % 100 == 0:
+                        f.write(f'<Test result="fail" name="t{i}"><Failure message="m"><StackTrace>at Foo.bar(Foo.java:1)'
+                                f'</StackTrace></Failure>{metrics}</Test>')
+                    else:
+                        f.write(f'<Test result="pass" name="t{i}">{metrics}</Test>')
+                f.write('</TestCase></Module></Result>')
+            size = os.path.getsize(path)
+
+            tracemalloc.start()
+            try:
+                count = sum(1 for _ in parse_func(path))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(2000, count)
+        # test results of a module are held until the end of the module, but not the XML they came from
+        self.assertLess(peak, size / 5)
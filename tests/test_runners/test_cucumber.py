@@ -1,10 +1,13 @@
 import glob
 import os
+import tempfile
+import time
+from pathlib import Path
 from unittest import mock
 
 import responses  # type: ignore
 
-from smart_tests.test_runners.cucumber import _create_file_candidate_list, clean_uri
+from smart_tests.test_runners.cucumber import FeatureFileIndex, clean_uri
 from tests.cli_test_case import CliTestCase
 
 
@@ -36,10 +39,35 @@ class CucumberTest(CliTestCase):
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_json_result.json')
 
-    def test_create_file_candidate_list(self):
-        self.assertCountEqual(_create_file_candidate_list("a-b"), ["a/b", "a-b"])
-        self.assertCountEqual(_create_file_candidate_list("a-b-c"), ["a/b/c", "a-b/c", "a/b-c", "a-b-c"])
-        self.assertCountEqual(_create_file_candidate_list("a_b_c"), ["a_b_c"])
+    def test_feature_file_index(self):
+        with tempfile.TemporaryDirectory() as base:
+            for f in ['a-b-c.feature', 'x/y/z.feature', 'x/y-z.feature', 'x-y/z.feature', 'p/q-r/s.feature',
+                      'p-q/r/s.feature', 'p/q/r.txt']:
+                Path(base, f).parent.mkdir(parents=True, exist_ok=True)
+                Path(base, f).touch()
+
+            index = FeatureFileIndex(base)
+            self.assertEqual(Path(base, 'a-b-c.feature'), index.resolve('a-b-c'))
+            # dashes are preferred over directory separators, starting from the end
+            self.assertEqual(Path(base, 'x/y-z.feature'), index.resolve('x-y-z'))
+            self.assertEqual(Path(base, 'p/q-r/s.feature'), index.resolve('p-q-r-s'))
+            self.assertIsNone(index.resolve('p-q-r'))
+            self.assertIsNone(index.resolve('nothing-here'))
+
+    def test_feature_file_index_with_many_dashes(self):
+        # this used to probe 2^k file names for a report name with k dashes
+        name = "-".join(f"p{i}" for i in range(40))
+        with tempfile.TemporaryDirectory() as base:
+            f = Path(base, "features", "checkout", name + ".feature")
+            f.parent.mkdir(parents=True)
+            f.touch()
+
+            start = time.monotonic()
+            index = FeatureFileIndex(base)
+            for _ in range(1000):
+                self.assertEqual(f, index.resolve(f"features-checkout-{name}"))
+                self.assertIsNone(index.resolve(f"features-{name}"))
+            self.assertLess(time.monotonic() - start, 10)
 
     def test_clean_uri(self):
         self.assertEqual(clean_uri('foo/bar/baz.feature'), 'foo/bar/baz.feature')
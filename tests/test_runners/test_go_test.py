@@ -1,8 +1,14 @@
 import os
+import shutil
+import tempfile
+import time
 from unittest import mock
 
 import responses  # type: ignore
 
+from smart_tests.test_runners.go_test import GoTestJSONParser
+from smart_tests.utils.chunker import FLUSH, with_flushes
+from smart_tests.utils.http_client import get_base_url
 from tests.cli_test_case import CliTestCase
 
 
@@ -23,6 +29,36 @@ class GoTestTest(CliTestCase):
         self.assert_success(result)
         self.assert_subset_payload('subset_result.json')
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_output(self):
+        def tests(*names: str):
+            return [[{'type': 'class', 'name': 'pkg'}, {'type': 'testcase', 'name': n}] for n in names]
+
+        responses.replace(
+            responses.POST,
+            f"{get_base_url()}/intake/organizations/{self.organization}/workspaces/{self.workspace}/subset",
+            json={
+                "testPaths": tests('TestFooBar', 'TestFooBaz', 'TestQux'),
+                "rest": tests('TestFoo'),
+                "subsettingId": 456,
+                "summary": {
+                    "subset": {"candidates": 3, "duration": 3, "rate": 75},
+                    "rest": {"candidate": 1, "duration": 1, "rate": 25}
+                },
+                "isBrainless": False
+            },
+            status=200)
+        pipe = "TestFoo\nTestFooBar\nTestFooBaz\nTestQux\nok      github.com/example/pkg      0.268s"
+        with tempfile.TemporaryDirectory() as tempdir:
+            rest = os.path.join(tempdir, 'rest.txt')
+            result = self.cli('subset', 'go-test', '--session', self.session, '--target', '75%', '--rest', rest,
+                              input=pipe)
+            self.assert_success(result)
+            self.assertEqual('^Test(FooBa(r|z)|Qux)$', result.stdout.splitlines()[0])
+            with open(rest) as f:
+                self.assertEqual('^TestFoo$', f.read())
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_record_tests_with_session(self):
@@ -38,3 +74,51 @@ class GoTestTest(CliTestCase):
                           str(self.test_files_dir.joinpath('reportv2')) + "/")
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_result.json')
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_json(self):
+        result = self.cli('record', 'tests', 'go-test', '--session', self.session, '--json',
+                          str(self.test_files_dir.joinpath('gotest.json')))
+        self.assert_success(result)
+        self.assert_record_tests_payload('record_test_json_result.json')
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_json_paths(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            shutil.copy(self.test_files_dir.joinpath('gotest.json'), os.path.join(tempdir, 'gotest.json'))
+            # directories are scanned, like they are for JUnit XML reports
+            result = self.cli('record', 'tests', 'go-test', '--session', self.session, '--json', tempdir)
+            self.assert_success(result)
+            self.assert_record_tests_payload('record_test_json_result.json')
+
+            result = self.cli('record', 'tests', 'go-test', '--session', self.session, '--json',
+                              os.path.join(tempdir, 'missing.json'), mix_stderr=False)
+            self.assert_success(result)
+            self.assertIn("No matches found", result.stderr)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_json_from_stdin(self):
+        # the last test never finishes, e.g. because the test binary crashed
+        stream = self.test_files_dir.joinpath('gotest.json').read_text().splitlines(keepends=True)[:-4]
+        result = self.cli('record', 'tests', 'go-test', '--session', self.session, '--json', '-', input="".join(stream))
+        self.assert_success(result)
+
+        events = self.decode_request_body(self.find_request('/events').request.body)['events']
+        self.assertEqual([1, 0, 0, 0], [e['status'] for e in events])
+        self.assertEqual("=== RUN   TestExample3\n    example_test.go:30: not yet\n", events[3]['stderr'])
+
+    def test_parse_json_flushes(self):
+        def go_test():
+            yield '{"Action":"run","Package":"example.com/foo","Test":"TestA"}\n'
+            yield '{"Action":"pass","Package":"example.com/foo","Test":"TestA","Elapsed":0.1}\n'
+            # a slow test
+            time.sleep(0.5)
+            yield '{"Action":"pass","Package":"example.com/foo","Test":"TestB","Elapsed":0.5}\n'
+
+        events = list(GoTestJSONParser().parse(with_flushes(go_test(), 0.05)))
+        # TestA is sent before TestB finishes
+        self.assertIs(FLUSH, events[1])
+        self.assertEqual(["TestA", "TestB"], [e['testPath'][1]['name'] for e in events if e is not FLUSH])
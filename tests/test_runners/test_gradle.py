@@ -85,6 +85,39 @@ class GradleTest(CliTestCase):
         rest.close()
         os.unlink(rest.name)
 
+    @ignore_warnings
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_compact_output(self):
+        responses.replace(
+            responses.POST,
+            f"{get_base_url()}/intake/organizations/{self.organization}/workspaces/{self.workspace}/subset",
+            json={
+                "testPaths": [
+                    [{'type': 'class', 'name': 'com.example.sample_app_gradle.sub.App3Test'}],
+                    [{'type': 'class', 'name': 'com.example.sample_app_gradle.App2Test'}],
+                ],
+                "rest": [[{'type': 'class', 'name': 'com.example.sample_app_gradle.AppTest'}]],
+                "subsettingId": 456,
+                "summary": {
+                    "subset": {"candidates": 2, "duration": 2, "rate": 67},
+                    "rest": {"candidate": 1, "duration": 1, "rate": 33},
+                },
+                "isBrainless": False,
+            },
+            status=200)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            rest = os.path.join(tempdir, "rest.txt")
+            result = self.cli('subset', 'gradle', '--session', self.session, '--target', '10%', '--compact-output',
+                              '--rest', rest, str(self.test_files_dir.joinpath('java/app/src/test/java').resolve()))
+            self.assert_success(result)
+            # all the tests of the 'sub' package are selected, but not those of its parent
+            self.assertEqual("--tests com.example.sample_app_gradle.sub.* --tests com.example.sample_app_gradle.App2Test",
+                             result.output.splitlines()[0])
+            with open(rest) as f:
+                self.assertEqual("--tests com.example.sample_app_gradle.AppTest", f.read())
+
     @ignore_warnings
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
@@ -1,4 +1,6 @@
+import json
 import os
+import tempfile
 from unittest import mock
 
 import responses  # type: ignore
@@ -17,6 +19,35 @@ class KarmaTest(CliTestCase):
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_result.json')
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_json_invalid(self):
+        spec = {"fullName": "a", "description": "a", "suite": ["a.spec.ts"], "success": True, "time": 1, "log": []}
+        invalid = "does not appear to be valid Karma report format"
+        with tempfile.TemporaryDirectory() as tempdir:
+            for report, error in [
+                # nothing is recorded from a report that turns out to be invalid later
+                (json.dumps({"result": {"chrome": [spec, {"fullName": "b"}]}}), invalid),
+                (json.dumps({"result": {"chrome": [spec], "firefox": {}}}), invalid),
+                (json.dumps({"result": []}), invalid),
+                (json.dumps({"summary": {}}), invalid),
+                (json.dumps({"result": {"chrome": [spec]}})[:-10], "Failed to load Json report file"),
+                # a report without any specs is fine
+                (json.dumps({"result": {}}), None),
+                (json.dumps({"result": {"chrome": []}}), None),
+            ]:
+                with self.subTest(report=report):
+                    path = os.path.join(tempdir, "report.json")
+                    with open(path, "w") as f:
+                        f.write(report)
+                    responses.calls.reset()
+                    result = self.cli('record', 'tests', '--session', self.session, 'karma', path, mix_stderr=False)
+                    self.assert_success(result)
+                    self.assertEqual([], [c for c in responses.calls if c.request.url.endswith("/events")])
+                    self.assertEqual(0 if error is None else 1, result.stderr.count("Error: "), result.stderr)
+                    if error is not None:
+                        self.assertIn(error, result.stderr)
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_subset_with_base(self):
@@ -18,6 +18,19 @@ class MavenTest(CliTestCase):
         self.assert_success(result)
         self.assert_subset_payload('subset_result.json')
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_with_discovery_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                responses.calls.reset()
+                result = self.cli('subset', 'maven', '--session', self.session, '--target', '10%',
+                                  '--discovery-cache', cache_dir,
+                                  str(self.test_files_dir.joinpath('java/test/src/java/').resolve()))
+                self.assert_success(result)
+                self.assert_subset_payload('subset_result.json')
+            self.assertNotEqual([], os.listdir(cache_dir))
+
     @responses.activate
     @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
     def test_subset_from_file(self):
@@ -167,6 +180,16 @@ class MavenTest(CliTestCase):
         self.assert_success(result)
         self.assert_subset_payload('subset_with_exclude_rules_result.json')
 
+        # multiple rules, including the ones that can't be combined into one expression
+        for rules in [[r'\.e2e\.', r'NoSuchTest$'], [r'\.e2e\.', r'(?i)nosuchtest$'], [r'\.e2e\.', r'(No)\1Test']]:
+            responses.calls.reset()
+            result = self.cli('subset', '--target', '10%', '--session',
+                              self.session, 'maven',
+                              *[a for r in rules for a in ('--exclude', r)],
+                              str(self.test_files_dir.joinpath('java/test/src/java/').resolve()))
+            self.assert_success(result)
+            self.assert_subset_payload('subset_with_exclude_rules_result.json')
+
     def test_glob(self):
         for x in [
             'foo/BarTest.java',
@@ -1,8 +1,10 @@
 import os
+import tempfile
 from unittest import mock
 
 import responses  # type: ignore
 
+from smart_tests.test_runners.nunit import nunit_parse_func
 from smart_tests.utils.http_client import get_base_url
 from tests.cli_test_case import CliTestCase
 
@@ -63,3 +65,31 @@ class NUnitTest(CliTestCase):
         # turns out we collapse all TestFixtures to TestSuitest so the golden file has TestSuite=Outer+Inner,
         # not TestFixture=Outer+Inner
         self.assert_record_tests_payload("nunit-reporter-bug-with-nested-type.json")
+
+    def test_parse_deeply_nested_suites(self):
+        depth = 200
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "output.xml")
+            with open(path, "w") as f:
+                f.write('<test-run><test-suite type="Assembly" name="/path/to/Tests.dll" start-time="2021-01-01T00:00:00Z">')
+                for i in range(depth):
+                    f.write(f'<test-suite type="TestSuite" name="ns{i}">')
+                f.write('<test-suite type="TestFixture" name="Fixture">')
+                for i in range(1000):
+                    f.write(f'<test-case name="t{i}" methodname="t{i}" duration="0.5" result="{"Passed" if i else "Failed"}">'
+                            '<failure><message>boom</message><stack-trace>at Fixture.t0()</stack-trace></failure>'
+                            '</test-case>')
+                f.write('</test-suite>' * (depth + 2) + '</test-run>')
+
+            events = list(nunit_parse_func(path))
+
+        self.assertEqual(1000, len(events))
+        first = events[0]
+        self.assertEqual({"type": "Assembly", "name": "Tests.dll"}, first["testPath"][0])
+        self.assertEqual([{"type": "TestSuite", "name": "Fixture"}, {"type": "TestCase", "name": "t0"}],
+                         first["testPath"][-2:])
+        self.assertEqual(depth + 3, len(first["testPath"]))
+        self.assertEqual("boom\nat Fixture.t0()", first["stderr"])
+        self.assertEqual("2021-01-01T00:00:00+00:00", first["createdAt"])
+        # ancestors are shared among test cases, not rebuilt for each of them
+        self.assertIs(first["testPath"][depth], events[-1]["testPath"][depth])
@@ -1,12 +1,17 @@
 import gzip
 import json
 import os
+import shutil
+import subprocess
+import sys
 import tempfile
-from unittest import TestCase, mock
+from pathlib import Path
+from unittest import TestCase, mock, skipUnless
 
 import responses  # type: ignore
 
-from smart_tests.test_runners.pytest import PytestJSONReportParser, _parse_pytest_nodeid
+from smart_tests.test_runners.pytest import (ParallelCollector, PytestJSONReportParser, _collect_only, _CollectKeys,
+                                             _parse_pytest_nodeid)
 from tests.cli_test_case import CliTestCase
 
 
@@ -54,6 +59,25 @@ tests/fooo/filenameonly_test.py
         self.assert_success(result)
         self.assert_record_tests_payload('record_test_result_json.json')
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_subset_jobs(self):
+        result = self.cli('subset', 'pytest', '--target', '10%', '--session', self.session, '--jobs', '0', 'tests')
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("--jobs must be at least 1", result.output)
+
+        with mock.patch.object(ParallelCollector, "collect",
+                               return_value=["tests/test_mod.py::TestClass::test__can_print_aaa"]) as collect:
+            result = self.cli('subset', 'pytest', '--target', '10%', '--session', self.session, '--jobs', '2', 'tests')
+        self.assert_success(result)
+        collect.assert_called_once_with()
+        payload = json.loads(gzip.decompress(self.find_request('/subset').request.body).decode())
+        self.assertEqual([[
+            {"type": "file", "name": os.path.normpath("tests/test_mod.py")},
+            {"type": "class", "name": "tests.test_mod.TestClass"},
+            {"type": "testcase", "name": "test__can_print_aaa"},
+        ]], payload["testPaths"])
+
     def setUp(self):
         super().setUp()
         self.current_dir = os.getcwd()
@@ -137,3 +161,139 @@ class PytestJSONReportParserLongreprTest(TestCase):
         data = self._make_event_data("string message")
         events = self._parse_line(data)
         self._assert_stderr(events, "string message")
+
+
+class CollectTestBase(TestCase):
+    FILES = {
+        "tests/test_a.py": "def test_one(): pass\ndef test_two(): pass\nclass TestK:\n    def test_m(self): pass\n",
+        "tests/sub/conftest.py": "",
+        "tests/sub/test_b.py": "import pytest\n@pytest.mark.parametrize('x', [1, 2])\ndef test_p(x): pass\n",
+        "tests/other/test_c.py": "def test_c(): pass\n",
+        "tests/other/helper.py": "",
+    }
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, ".cache")
+        for f, content in self.FILES.items():
+            self.write(f, content)
+        self.cwd = os.getcwd()
+        os.chdir(self.dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def write(self, f: str, content: str):
+        p = Path(self.dir, f)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(content)
+
+
+class CollectKeysTest(CollectTestBase):
+    def test_keys(self):
+        keys = _CollectKeys(self.dir)
+        a, b, c = (os.path.join(self.dir, f) for f in ["tests/test_a.py", "tests/sub/test_b.py", "tests/other/test_c.py"])
+        before = [keys.of(a), keys.of(b), keys.of(c)]
+        self.assertIsNone(keys.of(os.path.join(self.dir, "tests/missing_test.py")))
+
+        # conftest.py affects its directory and below
+        self.write("tests/sub/conftest.py", "import pytest\n")
+        self.assertEqual([before[0], before[2]], [_CollectKeys(self.dir).of(f) for f in [a, c]])
+        self.assertNotEqual(before[1], _CollectKeys(self.dir).of(b))
+
+        # configuration affects everything
+        self.write("tests/sub/conftest.py", "")
+        self.assertEqual(before, [_CollectKeys(self.dir).of(f) for f in [a, b, c]])
+        self.write("pytest.ini", "[pytest]\n")
+        self.assertTrue(all(k != _CollectKeys(self.dir).of(f) for k, f in zip(before, [a, b, c])))
+
+
+class CollectOnlyTest(TestCase):
+    def test_node_ids_only(self):
+        output = "\n".join([
+            "some plugin header",
+            "",
+            "tests/test_a.py::test_one",
+            "tests/test_a.py::TestK::test_m",
+            "",
+            "tests/test.txt::test.txt",
+            "",
+            "==================================== warnings summary ====================================",
+            "tests/test_a.py::test_one",
+            "  tests/test_a.py:1: UserWarning: careful",
+            "",
+            "3 tests collected in 0.01s",
+        ])
+        command = [sys.executable, "-c", f"print({output!r})"]
+        self.assertEqual(["tests/test_a.py::test_one\n", "tests/test_a.py::TestK::test_m\n", "tests/test.txt::test.txt\n"],
+                         list(_collect_only(command)))
+
+
+def has_pytest() -> bool:
+    try:
+        return subprocess.run(["pytest", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+
+@skipUnless(has_pytest(), "needs the pytest command")
+class ParallelCollectorTest(CollectTestBase):
+    def collect(self, jobs: int = 1, cache: bool = False):
+        return ParallelCollector(["tests"], jobs, self.cache_dir if cache else None).collect()
+
+    def test_same_as_collect_only(self):
+        expected = [line.rstrip() for line in _collect_only(["pytest", "--collect-only", "-q", "tests"])]
+        self.assertEqual(6, len(expected))
+        for jobs in (1, 2, 5):
+            with self.subTest(jobs=jobs):
+                self.assertEqual(expected, self.collect(jobs))
+
+    def test_files(self):
+        # pytest collects files given on the command line without asking the plugin
+        files = ["tests/test_a.py", "tests/sub/test_b.py", "tests/other/test_c.py"]
+        expected = [line.rstrip() for line in _collect_only(["pytest", "--collect-only", "-q", *files])]
+        self.assertEqual(6, len(expected))
+        for jobs in (2, 5):
+            with self.subTest(jobs=jobs):
+                self.assertEqual(sorted(expected), sorted(ParallelCollector(files, jobs, None).collect()))
+
+    def test_non_python_files(self):
+        # doctests, like those of text files, are split across processes, too
+        for i in range(4):
+            self.write(f"tests/test_doc{i}.txt", ">>> 1 + 1\n2\n")
+        expected = [line.rstrip() for line in _collect_only(["pytest", "--collect-only", "-q", "tests"])]
+        self.assertEqual(10, len(expected))
+        for jobs in (2, 5):
+            with self.subTest(jobs=jobs):
+                self.assertEqual(sorted(expected), sorted(self.collect(jobs)))
+
+    def test_cache(self):
+        expected = self.collect()
+        self.write("tests/other/test_broken.py", "def test_broken(:\n")
+        runs = []
+        run = ParallelCollector._run
+
+        def spy(collector, skip):
+            runs.append(sorted(os.path.relpath(f, self.dir).replace(os.sep, "/") for f in skip))
+            return run(collector, skip)
+
+        with mock.patch.object(ParallelCollector, "_run", spy):
+            self.assertEqual(expected, self.collect(jobs=2, cache=True))
+            self.assertEqual([], runs.pop())
+
+            # everything that was collected fine is served from the cache
+            self.assertEqual(expected, self.collect(jobs=2, cache=True))
+            self.assertEqual(["tests/other/test_c.py", "tests/sub/test_b.py", "tests/test_a.py"], runs.pop())
+
+            # a change to conftest.py invalidates test files under it
+            self.write("tests/sub/conftest.py", "import pytest\n")
+            self.write("tests/other/test_broken.py", "def test_fixed(): pass\n")
+            Path(self.dir, "tests/test_a.py").unlink()
+            self.assertEqual([
+                "tests/other/test_broken.py::test_fixed",
+                "tests/other/test_c.py::test_c",
+                "tests/sub/test_b.py::test_p[1]",
+                "tests/sub/test_b.py::test_p[2]",
+            ], self.collect(jobs=2, cache=True))
+            self.assertEqual(["tests/other/test_c.py"], runs.pop())
@@ -1,13 +1,18 @@
+import errno
 import gzip
 import json
 import os
 import tempfile
+import threading
+import time
+from typing import IO, Callable, List
 from unittest import mock
 
 import dateutil.parser
 import responses  # type: ignore
 from dateutil.tz import tzlocal
 
+from smart_tests.test_runners import raw
 from smart_tests.test_runners.raw import _needs_test_path_file
 from smart_tests.utils.http_client import get_base_url
 from smart_tests.utils.input_snapshot import InputSnapshotId
@@ -368,3 +373,97 @@ class RawTest(CliTestCase):
                 "flavors": [],
                 "testSuite": "",
             })
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_stream(self):
+        lines = [
+            '{"testPath": "file=a.py#class=classA", "duration": 42, "status": "TEST_PASSED"}',
+            '',
+            '{"testPathComponents": [{"type": "file", "name": "b.py"}], "status": "TEST_FAILED", "stderr": "boom"}',
+        ]
+        result = self.cli('record', 'tests', 'raw', '--session', self.session, '--stream', '-', input="\n".join(lines))
+        self.assert_success(result)
+
+        events = self.decode_request_body(self.find_request('/events').request.body)['events']
+        self.assertEqual([[{"type": "file", "name": "a.py"}, {"type": "class", "name": "classA"}],
+                          [{"type": "file", "name": "b.py"}]], [e['testPath'] for e in events])
+        self.assertEqual([1, 0], [e['status'] for e in events])
+        self.assertEqual([42, 0], [e['duration'] for e in events])
+        self.assertEqual("boom", events[1]['stderr'])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_stream_from_named_pipe(self):
+        def harness(f: IO[str]):
+            for i in range(3):
+                f.write(json.dumps({"testPath": f"file=test{i}.py", "status": "TEST_PASSED"}) + "\n")
+                f.flush()
+
+        result = self.record_from_named_pipe(harness)
+        self.assert_success(result)
+
+        events = self.decode_request_body(self.find_request('/events').request.body)['events']
+        self.assertEqual(["test0.py", "test1.py", "test2.py"], [e['testPath'][0]['name'] for e in events])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    @mock.patch.object(raw, "STREAM_FLUSH_INTERVAL", 0.1)
+    def test_record_tests_stream_flushes_slow_producer(self):
+        sent_before_next: List[bool] = []
+
+        def events_requests():
+            return [c for c in responses.calls if "/events" in (c.request.url or "")]
+
+        def harness(f: IO[str]):
+            f.write(json.dumps({"testPath": "file=test0.py", "status": "TEST_PASSED"}) + "\n")
+            f.flush()
+            # the first result is sent on its own, without waiting for more to come or the pipe to close
+            deadline = time.monotonic() + 10
+            while not events_requests() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            sent_before_next.append(bool(events_requests()))
+            f.write(json.dumps({"testPath": "file=test1.py", "status": "TEST_PASSED"}) + "\n")
+
+        result = self.record_from_named_pipe(harness)
+        self.assert_success(result)
+        self.assertEqual([True], sent_before_next)
+        self.assertEqual([["test0.py"], ["test1.py"]],
+                         [[e['testPath'][0]['name'] for e in self.decode_request_body(c.request.body)['events']]
+                          for c in events_requests()])
+
+    def record_from_named_pipe(self, harness: Callable[[IO[str]], None]):
+        """Runs `record tests raw --stream` on a named pipe, which 'harness' writes test results to"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            fifo = os.path.join(tempdir, 'results')
+            os.mkfifo(fifo)
+
+            def run():
+                # a blocking open() would wait forever if the command failed before opening the pipe
+                deadline = time.monotonic() + 30
+                while True:
+                    try:
+                        fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+                        break
+                    except OSError as e:
+                        if e.errno != errno.ENXIO or time.monotonic() > deadline:
+                            return
+                        time.sleep(0.01)
+                os.set_blocking(fd, True)
+                with os.fdopen(fd, 'w') as f:
+                    harness(f)
+
+            t = threading.Thread(target=run, daemon=True)
+            t.start()
+            try:
+                return self.cli('record', 'tests', 'raw', '--session', self.session, '--stream', fifo)
+            finally:
+                t.join(timeout=30)
+                self.assertFalse(t.is_alive(), "the test harness is stuck")
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"SMART_TESTS_TOKEN": CliTestCase.smart_tests_token})
+    def test_record_tests_stream_invalid_line(self):
+        result = self.cli('record', 'tests', 'raw', '--session', self.session, '--stream', '-',
+                          input='{"testPath": "file=a.py", "status": "TEST_PASSED"}\nnot a json\n')
+        self.assertIn("Line 2 of - isn't a valid JSON", result.output)
@@ -1,8 +1,11 @@
 import os
+import tempfile
+import tracemalloc
 from unittest import mock
 
 import responses  # type: ignore
 
+from smart_tests.test_runners.robot import parse_tests
 from tests.cli_test_case import CliTestCase
 
 
@@ -39,3 +42,30 @@ class RobotTest(CliTestCase):
         result = self.cli('record', 'tests', 'robot', '--session', self.session, str(self.test_files_dir) + "/single-output.xml")
         self.assert_success(result)
         self.assert_record_tests_payload("record_test_executed_only_one_file_result.json")
+
+    def test_parse_tests_discards_processed_subtrees(self):
+        log = "".join(f'<msg time="2026-06-05T16:09:07.159445" level="INFO">log line {i} {"x" * 80}</msg>' for i in range(100))
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "output.xml")
+            with open(path, "w") as f:
+                f.write('<robot generator="Robot 7.0"><suite name="Top"><suite name="Leaf">')
+                for i in range(1000):
+                    f.write(f'<test name="t{i}">'
+                            f'<kw name="Setup"><kw name="Nested">{log}<status status="PASS" elapsed="0.1"/></kw>'
+                            '<status status="PASS" elapsed="0.1"/></kw>'
+                            '<kw name="Check"><msg level="FAIL">boom</msg><status status="FAIL" elapsed="0.2"/></kw>'
+                            '<status status="FAIL" elapsed="0.5"/></test>')
+                f.write('</suite></suite><statistics><suite><stat name="Top">Top</stat></suite></statistics></robot>')
+            size = os.path.getsize(path)
+
+            tracemalloc.start()
+            try:
+                results = list(parse_tests(path))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(1000, len(results))
+        self.assertEqual(("Leaf", "t999", "FAIL", "PASS", 0.5, "boom"), tuple(results[-1]))
+        # memory use is bounded by a test, not the whole file
+        self.assertLess(peak, size / 10)
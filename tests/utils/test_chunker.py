@@ -0,0 +1,84 @@
+import queue
+from unittest import TestCase
+
+from smart_tests.utils.chunker import FLUSH, AdaptiveChunker, with_flushes
+
+
+class AdaptiveChunkerTest(TestCase):
+    def split(self, chunker: AdaptiveChunker, items):
+        return [list(c) for c in chunker.chunks(items)]
+
+    def test_max_items(self):
+        chunker = AdaptiveChunker(max_items=3, max_bytes=0, sizer=len)
+        self.assertEqual([["a", "b", "c"], ["d", "e"]], self.split(chunker, "abcde"))
+        self.assertEqual([], self.split(chunker, []))
+
+    def test_max_bytes(self):
+        chunker = AdaptiveChunker(max_items=100, max_bytes=10, sizer=len, compression_ratio=1.0)
+        items = ["xxxx", "xxxx", "xxxx", "x" * 30, "x", "x"]
+        self.assertEqual([["xxxx", "xxxx"], ["xxxx"], ["x" * 30], ["x", "x"]], self.split(chunker, items))
+
+    def test_observe(self):
+        chunker = AdaptiveChunker(max_items=100, max_bytes=10, sizer=len, compression_ratio=1.0)
+        # payload turned out to compress 10x, so chunks can hold more items
+        chunker.observe(["x" * 100], 10)
+        self.assertAlmostEqual(0.55, chunker.compression_ratio)
+        chunker.observe(["x" * 100], 10)
+        chunker.observe(["x" * 100], 10)
+        self.assertAlmostEqual(0.2125, chunker.compression_ratio)
+        self.assertEqual([["xxxx"] * 11, ["xxxx"]], self.split(chunker, ["xxxx"] * 12))
+
+        # degenerate measurements are ignored
+        chunker.observe([], 10)
+        chunker.observe(["x"], 0)
+        self.assertAlmostEqual(0.2125, chunker.compression_ratio)
+
+    def test_exception(self):
+        def items():
+            yield "a"
+            yield "b"
+            raise ValueError("boom")
+
+        chunker = AdaptiveChunker(max_items=2, max_bytes=0, sizer=len)
+        chunks = chunker.chunks(items())
+        self.assertEqual(["a", "b"], list(next(chunks)))
+        with self.assertRaises(ValueError):
+            list(next(chunks))
+        self.assertEqual([], list(chunks))
+
+    def test_flush(self):
+        chunker = AdaptiveChunker(max_items=3, max_bytes=0, sizer=len)
+        self.assertEqual([["a"], ["b", "c", "d"], ["e"]],
+                         self.split(chunker, [FLUSH, "a", FLUSH, FLUSH, "b", "c", "d", FLUSH, "e", FLUSH]))
+
+
+class WithFlushesTest(TestCase):
+    def test_with_flushes(self):
+        q: queue.Queue = queue.Queue()
+
+        def items():
+            while True:
+                i = q.get()
+                if i is None:
+                    return
+                yield i
+
+        it = with_flushes(items(), 0.05)
+        q.put("a")
+        q.put("b")
+        self.assertEqual(["a", "b"], [next(it), next(it)])
+        # nothing more comes in for a while
+        self.assertIs(FLUSH, next(it))
+        q.put("c")
+        q.put(None)
+        self.assertEqual(["c"], list(it))
+
+    def test_exception(self):
+        def items():
+            yield "a"
+            raise ValueError("boom")
+
+        it = with_flushes(items(), 10)
+        self.assertEqual("a", next(it))
+        with self.assertRaises(ValueError):
+            next(it)
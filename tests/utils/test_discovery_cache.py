@@ -0,0 +1,88 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from smart_tests.utils.discovery_cache import DiscoveryCache
+
+
+class DiscoveryCacheTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.dir, "src")
+        self.cache = DiscoveryCache(os.path.join(self.dir, "cache"))
+        for f in ['a.xml', 'b.txt', 'sub/c.xml', 'sub/deep/d.xml', '.hidden/e.xml', 'sub/.f.xml', 'dir.xml/g.txt']:
+            self.write(f)
+        self.age()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, f: str):
+        p = Path(self.src, f)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text("")
+
+    def age(self, *dirs: str):
+        # pretend directories were modified a while ago, so that the cache trusts their mtime
+        t = time.time() - 60
+        for d in dirs or [d for d, _, _ in os.walk(self.src)]:
+            os.utime(os.path.join(self.src, d), (t, t))
+
+    def scan(self, pattern: str, key: str = "key"):
+        return sorted(self.cache.scan(self.src, pattern, lambda f: f.replace(os.sep, '/'), key))
+
+    def glob(self, pattern: str):
+        return sorted(os.path.relpath(t, self.src).replace(os.sep, '/')
+                      for t in glob.iglob(os.path.join(self.src, pattern), recursive=True))
+
+    def test_same_as_glob(self):
+        for pattern in ['**/*', '**/*.xml', '*.xml', 'sub/*.xml', '**/deep/*']:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(self.glob(pattern), self.scan(pattern))
+                # and the same from the cache
+                self.assertEqual(self.glob(pattern), self.scan(pattern))
+                self.assertEqual(0, self.cache.listed)
+
+    def test_incremental(self):
+        self.assertEqual(['a.xml', 'dir.xml', 'sub/c.xml', 'sub/deep/d.xml'], self.scan('**/*.xml'))
+        self.assertEqual(4, self.cache.listed)
+
+        self.scan('**/*.xml')
+        self.assertEqual((0, 4), (self.cache.listed, self.cache.reused))
+
+        self.write('sub/deep/new.xml')
+        self.age('sub/deep')
+        self.assertEqual(['a.xml', 'dir.xml', 'sub/c.xml', 'sub/deep/d.xml', 'sub/deep/new.xml'], self.scan('**/*.xml'))
+        self.assertEqual((1, 3), (self.cache.listed, self.cache.reused))
+
+        shutil.rmtree(os.path.join(self.src, 'sub'))
+        self.age('')
+        self.assertEqual(['a.xml', 'dir.xml'], self.scan('**/*.xml'))
+        self.assertEqual((1, 1), (self.cache.listed, self.cache.reused))
+
+    def test_recently_modified_directories_are_listed_again(self):
+        self.write('sub/new.xml')
+        self.scan('**/*.xml')
+        self.scan('**/*.xml')
+        # 'sub' was just modified, and could be modified again within the same mtime
+        self.assertEqual((1, 3), (self.cache.listed, self.cache.reused))
+
+    def test_keys_are_separate(self):
+        self.scan('**/*.xml', key="one")
+        self.scan('**/*.xml', key="two")
+        self.assertEqual(4, self.cache.listed)
+
+    def test_broken_cache(self):
+        self.scan('**/*.xml')
+        for f in os.listdir(self.cache.cache_dir):
+            Path(self.cache.cache_dir, f).write_text('{"version": 1, "dirs": ')
+
+        self.assertEqual(['a.xml', 'dir.xml', 'sub/c.xml', 'sub/deep/d.xml'], self.scan('**/*.xml'))
+        self.assertEqual(4, self.cache.listed)
+        # and the cache is rebuilt
+        self.scan('**/*.xml')
+        self.assertEqual(0, self.cache.listed)
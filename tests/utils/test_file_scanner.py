@@ -0,0 +1,57 @@
+import glob
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from smart_tests.utils.file_scanner import scan
+
+
+class FileScannerTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for f in [
+            'a.xml',
+            'b.txt',
+            'sub/c.xml',
+            'sub/deep/d.xml',
+            'sub/deep/test.xml',
+            'other/test.xml',
+            '.hidden/e.xml',
+            'sub/.f.xml',
+            'dir.xml/g.txt',
+        ]:
+            p = Path(self.dir, f)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text("<testsuite/>")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_same_as_glob(self, pattern: str):
+        expected = sorted(t for t in glob.iglob(os.path.join(self.dir, pattern), recursive=True) if os.path.isfile(t))
+        for workers in [1, 4]:
+            actual = sorted(f.path for f in scan(self.dir, pattern, max_workers=workers))
+            self.assertEqual(expected, actual, f"{pattern} with {workers} workers")
+
+    def test_same_as_glob(self):
+        self.check_same_as_glob('**/*.xml')
+        self.check_same_as_glob('*.xml')
+        self.check_same_as_glob('**/test.xml')
+        self.check_same_as_glob('sub/*.xml')
+        self.check_same_as_glob('**/*')
+
+    def test_relpath_and_stat(self):
+        files = {f.relpath: f for f in scan(self.dir, '**/*.xml', with_stat=True)}
+        self.assertCountEqual(['a.xml', 'sub/c.xml', 'sub/deep/d.xml', 'sub/deep/test.xml', 'other/test.xml'], files.keys())
+
+        f = files['sub/deep/d.xml']
+        self.assertEqual(os.path.join(self.dir, 'sub', 'deep', 'd.xml'), f.path)
+        assert f.stat is not None
+        self.assertEqual(os.stat(f.path).st_ctime, f.stat.st_ctime)
+
+        self.assertIsNone(next(scan(self.dir, '*.xml')).stat)
+
+    def test_missing_base(self):
+        self.assertEqual([], list(scan(os.path.join(self.dir, 'no-such-dir'), '**/*.xml')))
@@ -1,6 +1,9 @@
-from unittest import TestCase
+import os
+import random
+import time
+from unittest import TestCase, skipUnless
 
-from smart_tests.utils.glob import compile
+from smart_tests.utils.glob import PathMatcher, compile, union
 
 
 class GlobTest(TestCase):
@@ -64,3 +67,73 @@ class GlobTest(TestCase):
                 "foo/bar.class"
             ]
         )
+
+    def test_path_matcher(self):
+        for includes, excludes in [
+            (['**/Test*.*', '**/*Test.*'], ['**/*$*']),
+            # not just the file names
+            (['**/Test*.*', 'a/**/*Test.*'], ['**/*$*']),
+        ]:
+            m = PathMatcher(includes, excludes)
+            for p in ['TestFoo.java', 'a/b/FooTest.class', 'a/FooTest.kt']:
+                self.assertTrue(m.match(p), p)
+            for p in ['Foo.java', 'a/FooTest$Inner.class', 'FooTest', 'a/Test/Foo.java']:
+                self.assertFalse(m.match(p), p)
+
+        self.assertTrue(PathMatcher(['**/*Test.*']).file_name_only)
+        self.assertFalse(PathMatcher(['**/*Test.*', 'a/**/*.java']).file_name_only)
+        self.assertFalse(PathMatcher([]).match(''))
+        self.assertTrue(PathMatcher(['*.txt'], []).match('a.txt'))
+        self.assertFalse(PathMatcher(['*.txt'], []).match('a/a.txt'))
+
+    def test_union(self):
+        p = union([r'\.e2e\.', compile('Foo*')])
+        self.assertTrue(p.search('com.example.e2e.FooTest'))
+        self.assertTrue(p.fullmatch('FooBar'))
+        self.assertFalse(p.search('com.example.BarTest'))
+        self.assertFalse(union([]).search('anything'))
+
+
+@skipUnless(os.getenv("SMART_TESTS_BENCHMARK"), "set SMART_TESTS_BENCHMARK=1 to run benchmarks")
+class GlobBenchmark(TestCase):
+    """
+    Matching a million synthetic paths with the Surefire patterns maven uses, one by one vs combined.
+
+        $ SMART_TESTS_BENCHMARK=1 python -m unittest tests.utils.test_glob
+    """
+
+    def test_surefire_patterns(self):
+        from smart_tests.test_runners import maven
+
+        rnd = random.Random(42)
+        names = ['Foo', 'Bar', 'Util', 'Model', 'Service']
+        suffixes = ['Test', 'Tests', 'TestCase', 'Spec', '', 'Helper', 'Test$Inner']
+        exts = ['.java', '.kt', '.class', '.xml', '.properties']
+
+        def path() -> str:
+            dirs = [rnd.choice(['com', 'example', 'app', 'model', 'service']) for _ in range(rnd.randint(1, 6))]
+            name = rnd.choice(['', 'Test']) + rnd.choice(names) + rnd.choice(suffixes) + rnd.choice(exts)
+            return '/'.join(dirs + [name])
+
+        paths = [path() for _ in range(1000000)]
+
+        includes = [compile(g) for g in maven.includes]
+        excludes = [compile(g) for g in maven.excludes]
+
+        def one_by_one(f: str) -> bool:
+            if not f.endswith(maven.extensions):
+                return False
+            if any(p.fullmatch(f) for p in excludes):
+                return False
+            return any(p.fullmatch(f) for p in includes)
+
+        start = time.perf_counter()
+        expected = [one_by_one(f) for f in paths]
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [maven.is_file(f) for f in paths]
+        elapsed = time.perf_counter() - start
+
+        print(f"\none by one: {baseline:.2f}s, combined: {elapsed:.2f}s for {len(paths)} paths")
+        self.assertEqual(expected, actual)
@@ -0,0 +1,107 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from smart_tests.utils import guess_tests
+
+
+class GuessTestsTest(TestCase):
+    FILES = ['src/app.py', 'tests/test_app.py', 'tests/data/report.xml', 'web/button.spec.ts', 'web/button.ts',
+             'lib/FooTest.java', 'tests/new\nline_test.py', 'sparse/tests/test_gone.py']
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.repo = os.path.join(self.dir, "repo")
+        self.cache_dir = os.path.join(self.dir, "cache")
+        for f in self.FILES:
+            p = Path(self.repo, f)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text("")
+        self.git('init', '--quiet')
+        self.git('add', '.')
+        self.commit()
+        self.cwd = os.getcwd()
+        os.chdir(self.repo)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def git(self, *args: str):
+        subprocess.run(['git', *args], cwd=self.repo, check=True, stdout=subprocess.DEVNULL)
+
+    def commit(self):
+        self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '--quiet', '-m', 'commit')
+
+    def guess(self, *pathspecs: str, cache: bool = False):
+        return sorted(guess_tests.guess_test_files(pathspecs, cache_dir=self.cache_dir if cache else None))
+
+    def test_guess(self):
+        expected = ['lib/FooTest.java', 'sparse/tests/test_gone.py', 'tests/new\nline_test.py', 'tests/test_app.py',
+                    'web/button.spec.ts']
+        self.assertEqual(expected, self.guess())
+        # same as the patterns applied one by one
+        self.assertEqual(expected, sorted(
+            f for f in self.FILES
+            if re.search(guess_tests.LOOSE_TEST_FILE_PATTERN, f) and not re.search(guess_tests.EXCLUDE_PATTERN, f)))
+
+    def test_pathspecs(self):
+        self.assertEqual(['tests/new\nline_test.py', 'tests/test_app.py'], self.guess('tests'))
+        self.assertEqual(['lib/FooTest.java', 'web/button.spec.ts'], self.guess('lib', ':(glob)**/*.ts'))
+
+    def test_outside_of_sparse_checkout(self):
+        self.git('update-index', '--skip-worktree', 'sparse/tests/test_gone.py')
+        Path(self.repo, 'sparse/tests/test_gone.py').unlink()
+        self.assertNotIn('sparse/tests/test_gone.py', self.guess())
+
+    def test_skip_worktree_in_worktree(self):
+        # set by hand, e.g. to keep local changes to the file out of commits. The file is still there
+        self.git('update-index', '--skip-worktree', 'tests/test_app.py')
+        self.assertIn('tests/test_app.py', self.guess())
+
+    def test_small_chunks(self):
+        with subprocess.Popen(['git', 'ls-files', '-z', '-t'], stdout=subprocess.PIPE) as proc:
+            entries = list(guess_tests._read_entries(proc.stdout, 3))  # type: ignore
+        self.assertEqual(sorted(self.FILES), sorted(entries))
+
+    def test_not_a_git_repository(self):
+        os.chdir(self.dir)
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.guess(cache=True)
+
+    def test_cache(self):
+        expected = self.guess()
+        self.assertEqual(expected, self.guess(cache=True))
+
+        # the second run on the same commit doesn't list files
+        with mock.patch.object(guess_tests, "ls_files", side_effect=AssertionError("listed files")):
+            self.assertEqual(expected, self.guess(cache=True))
+        # pathspecs and the current directory are a part of the key
+        self.assertEqual(['tests/test_app.py'], self.guess(':(glob)**/test_app.py', cache=True))
+        os.chdir("tests")
+        # names are relative to the current directory, where 'test_app.py' no longer looks like a test
+        self.assertEqual(['new\nline_test.py'], self.guess(cache=True))
+        os.chdir(self.repo)
+
+        # staged, but not committed yet. The index no longer matches HEAD, so the cache can't be used
+        Path(self.repo, "tests/test_new.py").write_text("")
+        self.git('add', 'tests/test_new.py')
+        with mock.patch.object(guess_tests, "_save", side_effect=AssertionError("cached")):
+            self.assertIn('tests/test_new.py', self.guess(cache=True))
+
+        # a new commit is a new tree
+        self.commit()
+        self.assertIn('tests/test_new.py', self.guess(cache=True))
+        with mock.patch.object(guess_tests, "ls_files", side_effect=AssertionError("listed files")):
+            self.assertIn('tests/test_new.py', self.guess(cache=True))
+
+    def test_broken_cache(self):
+        self.guess(cache=True)
+        for f in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, f), "ab") as w:
+                w.write(b"truncated")
+        self.assertEqual(self.guess(), self.guess(cache=True))
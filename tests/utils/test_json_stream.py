@@ -0,0 +1,186 @@
+import io
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable
+from unittest import TestCase, skipUnless
+
+from smart_tests.test_runners import cucumber, karma, playwright
+from smart_tests.utils import json_stream
+
+
+def items(doc: str, *paths: str, chunk_size: int = json_stream.DEFAULT_CHUNK_SIZE):
+    return list(json_stream.items(io.StringIO(doc), *paths, chunk_size=chunk_size))
+
+
+class JSONStreamTest(TestCase):
+    def test_items(self):
+        doc = json.dumps({
+            "config": {"rootDir": "/repo", "nested": [1, 2, {"suites": ["not this one"]}]},
+            "suites": [{"title": "a"}, {"title": "b", "suites": [{"title": "c"}]}],
+            "stats": {"duration": 1.5},
+        })
+        self.assertEqual([("suites.item", {"title": "a"}), ("suites.item", {"title": "b", "suites": [{"title": "c"}]})],
+                         items(doc, "suites.item"))
+        self.assertEqual(
+            ["config", "suites.item", "suites.item"],
+            [p for p, _ in items(doc, "config", "suites.item")])
+        self.assertEqual([("stats.duration", 1.5)], items(doc, "stats.duration"))
+        self.assertEqual([("", json.loads(doc))], items(doc, ""))
+        self.assertEqual([], items(doc, "missing.item"))
+
+    def test_top_level_array(self):
+        self.assertEqual([1, "two", None, [3]], [v for _, v in items(' [1, "two", null, [3]] ', "item")])
+        self.assertEqual([], items("[]", "item"))
+        self.assertEqual([], items("{}", "item"))
+
+    def test_any_key(self):
+        doc = '{"result": {"chrome": [{"id": 1}, {"id": 2}], "firefox": [], "safari": [{"id": 3}]}, "summary": {}}'
+        self.assertEqual([1, 2, 3], [v["id"] for _, v in items(doc, "result.*.item")])
+        # '*' doesn't match array elements
+        self.assertEqual([], items('{"result": [[{"id": 1}]]}', "result.*.item"))
+
+    def test_strict(self):
+        doc = '{"result": {"chrome": [{"id": 1}], "firefox": [{"id": 2}]}, "summary": 3}'
+        self.assertEqual([1, 2], [v["id"] for _, v in json_stream.items(io.StringIO(doc), "result.*.item", strict=True)])
+        for doc in ('[]', '{"result": []}', '{"result": null}', '{"result": {"chrome": [{"id": 1}], "firefox": {}}}'):
+            with self.subTest(doc=doc):
+                # passed over, unless strict
+                self.assertEqual(doc.count('"id"'), len(items(doc, "result.*.item")))
+                with self.assertRaises(json_stream.UnexpectedType):
+                    list(json_stream.items(io.StringIO(doc), "result.*.item", strict=True))
+
+    def test_small_chunks(self):
+        # values, keys, and even numbers get split across chunks
+        doc = json.dumps({
+            "testCases": [
+                {"testPath": f"file=a{i}.py#testcase=tést \\\"{i}\\\"", "duration": 12345.678 * i, "ok": i % 2 == 0}
+                for i in range(50)
+            ],
+            "other": 1234567890,
+        }, indent=2)
+        expected = items(doc, "testCases.item", "other")
+        self.assertEqual(51, len(expected))
+        for chunk_size in (1, 2, 3, 7, 64):
+            self.assertEqual(expected, items(doc, "testCases.item", "other", chunk_size=chunk_size))
+
+    def test_malformed(self):
+        for doc in ('{"testCases": [{"a": 1}', '{"testCases": [{"a": 1}}', '{"testCases" [1]}', '{"testCases": [1]} x',
+                    '{testCases: []}', ''):
+            with self.subTest(doc=doc), self.assertRaises(json.JSONDecodeError):
+                items(doc, "testCases.item", chunk_size=4)
+
+    def test_lazy(self):
+        # values are yielded as they are read, before the rest of the document
+        def chunks():
+            yield '{"testCases": [{"id": 1}, '
+            raise AssertionError("read too far")
+
+        class Reader:
+            def __init__(self):
+                self.it = chunks()
+
+            def read(self, size):
+                return next(self.it)
+
+        self.assertEqual(("testCases.item", {"id": 1}), next(json_stream.items(Reader(), "testCases.item")))  # type: ignore
+
+
+@skipUnless(os.getenv("SMART_TESTS_BENCHMARK"), "set SMART_TESTS_BENCHMARK=1 to run benchmarks")
+class JSONReportParserBenchmark(TestCase):
+    """
+    Parse throughput of the JSON report plugins, against the json.load() baseline.
+
+        $ SMART_TESTS_BENCHMARK=1 python -m unittest tests.utils.test_json_stream
+    """
+    N = 20000
+
+    client = SimpleNamespace(
+        base_path=None,
+        no_base_path_inference=True,
+        make_file_path_component=lambda f: {"type": "file", "name": f})
+
+    def run_benchmark(self, name: str, report: object, parse: Callable[[str], int]):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "report.json")
+            with open(path, "w") as f:
+                json.dump(report, f)
+            size = os.path.getsize(path) / 1024 / 1024
+
+            start = time.perf_counter()
+            with open(path) as f:
+                json.load(f)
+            baseline = time.perf_counter() - start
+
+            start = time.perf_counter()
+            count = parse(path)
+            elapsed = time.perf_counter() - start
+
+        print(f"\n{name}: {size:.1f} MB, {count} tests, {size / elapsed:.1f} MB/s "
+              f"(json.load alone: {size / baseline:.1f} MB/s)")
+        self.assertGreater(count, 0)
+
+    def test_cucumber(self):
+        report = [{
+            "uri": f"features/f{i}.feature",
+            "name": f"Feature {i}",
+            "elements": [{
+                "name": f"Scenario {j}",
+                "type": "scenario",
+                "steps": [{"keyword": "Given ", "name": "a step", "result": {"status": "passed", "duration": 1000}}] * 5,
+            } for j in range(10)],
+        } for i in range(self.N // 10)]
+        parser = cucumber.JSONReportParser(self.client)
+        self.run_benchmark("cucumber", report, lambda path: sum(1 for _ in parser.parse_func(path)))
+
+    def test_playwright(self):
+        report = {
+            "config": {"rootDir": "/repo/tests", "configFile": "/repo/playwright.config.ts"},
+            "suites": [{
+                "title": f"t{i}.spec.ts",
+                "specs": [{
+                    "title": f"spec {j}",
+                    "line": j,
+                    "tests": [{"results": [{"duration": 100, "status": "passed", "stdout": [], "errors": []}]}],
+                } for j in range(10)],
+            } for i in range(self.N // 10)],
+        }
+        parser = playwright.JSONReportParser(self.client)
+        self.run_benchmark("playwright", report, lambda path: sum(1 for _ in parser.parse_func(path)))
+
+    def test_karma(self):
+        report = {
+            "browsers": {},
+            "result": {
+                "chrome": [{
+                    "fullName": f"spec {i}",
+                    "description": f"spec {i}",
+                    "suite": [f"src/s{i // 10}.spec.ts"],
+                    "success": True,
+                    "time": 10,
+                    "log": [],
+                } for i in range(self.N)],
+            },
+        }
+        parser = karma.JSONReportParser(self.client)
+        self.run_benchmark("karma", report, lambda path: sum(1 for _ in parser.parse_func(path)))
+
+    def test_raw(self):
+        report = {
+            "testCases": [{
+                "testPath": f"file=a{i // 10}.py#class=C#testcase=t{i}",
+                "duration": 1.5,
+                "status": "TEST_PASSED",
+                "stdout": "",
+                "stderr": "",
+                "createdAt": "2021-10-05T12:34:00",
+            } for i in range(self.N)],
+        }
+
+        def parse(path: str) -> int:
+            with open(path) as f:
+                return sum(1 for _ in json_stream.items(f, "testCases.item"))
+
+        self.run_benchmark("raw", report, parse)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from smart_tests.utils.log_retention import LogRetention
+
+
+class LogRetentionTest(TestCase):
+    retention = LogRetention(head=100, tail=200)
+
+    def test_truncate(self):
+        log = "a" * 100 + "b" * 1000 + "c" * 200
+        truncated = self.retention.truncate(log)
+        self.assertTrue(truncated.startswith("a" * 100 + "\n"))
+        self.assertTrue(truncated.endswith("\n" + "c" * 200))
+        self.assertIn("1000 characters truncated", truncated)
+
+        # already truncated logs and short logs are left alone
+        self.assertEqual(truncated, self.retention.truncate(truncated))
+        self.assertEqual("short", self.retention.truncate("short"))
+
+        self.assertEqual(log, LogRetention.unlimited().truncate(log))
+        self.assertNotIn("b", LogRetention(head=100, tail=0).truncate(log))
+
+    def test_buffer(self):
+        log = "".join(str(i % 10) * (i % 37) for i in range(300))
+        buffer = self.retention.buffer()
+        for i in range(300):
+            buffer.write(str(i % 10) * (i % 37))
+        self.assertEqual(self.retention.truncate(log), buffer.getvalue())
+
+        buffer = self.retention.buffer()
+        buffer.write("short")
+        buffer.write("")
+        buffer.write("log")
+        self.assertEqual("shortlog", buffer.getvalue())
+
+        buffer = LogRetention.unlimited().buffer()
+        for i in range(300):
+            buffer.write(str(i % 10) * (i % 37))
+        self.assertEqual(log, buffer.getvalue())
+
+    def test_read_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.log')
+            with open(path, 'w') as f:
+                f.write("a" * 100 + "b" * 1000 + "c" * 200)
+
+            log = self.retention.read_file(path)
+            self.assertTrue(log.startswith("a" * 100 + "\n"))
+            self.assertTrue(log.endswith("\n" + "c" * 200))
+            self.assertIn("1000 bytes truncated", log)
+            self.assertEqual(1300, len(LogRetention.unlimited().read_file(path)))
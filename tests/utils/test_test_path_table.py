@@ -0,0 +1,101 @@
+import gzip
+import json
+import os
+import random
+import time
+from unittest import TestCase, skipUnless
+
+from smart_tests.utils import test_path_table
+
+
+def java_tests(n: int):
+    return [[{"type": "class", "name": f"com.example.module{i // 1000}.service.Service{i // 10}Test"},
+             {"type": "testcase", "name": f"testSomethingImportant{i % 10}"}] for i in range(n)]
+
+
+class TestPathTableTest(TestCase):
+    def assert_round_trip(self, test_paths):
+        table, paths = test_path_table.encode(test_paths)
+        # what goes over the wire is JSON
+        table, paths = json.loads(json.dumps(table)), json.loads(json.dumps(paths))
+        self.assertEqual(test_paths, test_path_table.decode(table, paths))
+        return table, paths
+
+    def test_encode(self):
+        table, paths = self.assert_round_trip([
+            [{"type": "class", "name": "com.example.FooTest"}, {"type": "testcase", "name": "testBar"}],
+            [{"type": "class", "name": "com.example.FooTest"}, {"type": "testcase", "name": "testBaz"}],
+            [{"type": "class", "name": "com.example.FooTest2"}],
+        ])
+        self.assertEqual({
+            "types": ["class", "testcase"],
+            "components": [[0, 0, "com.example.FooTest"], [1, 0, "testBar"], [1, 6, "z"], [0, 0, "com.example.FooTest2"]],
+        }, table)
+        self.assertEqual([[0, 1], [0, 2], [3]], paths)
+
+    def test_unusual_components(self):
+        self.assert_round_trip([
+            [],
+            [{"type": "file", "name": ""}, {"type": "file", "name": "a"}],
+            # not just a type and a name
+            [{"type": "file", "name": "a", "lineno": "3"}, {"name": "b"}, {}],
+            [{"name": "b"}, {"type": "file", "name": "a", "lineno": "3"}],
+            [{"type": "testcase", "name": "日本語 \"quoted\"\n"}, {"type": "testcase", "name": "日本"}],
+        ])
+
+    def test_random(self):
+        rand = random.Random(0)
+        for _ in range(20):
+            test_paths = [[{"type": rand.choice(["file", "class", "testcase"]),
+                            "name": "".join(rand.choice("ab/.é") for _ in range(rand.randint(0, 6)))}
+                           for _ in range(rand.randint(0, 3))]
+                          for _ in range(rand.randint(0, 50))]
+            self.assert_round_trip(test_paths)
+
+    def test_malformed(self):
+        for table, paths in [
+            ({"types": ["file"], "components": [[1, 0, "a"]]}, []),
+            ({"types": ["file"], "components": [[0, 1, "a"]]}, []),
+            ({"types": ["file"], "components": [[0, 0]]}, []),
+            ({"types": ["file"], "components": [[0, 0, "a"]]}, [[1]]),
+            ({"types": ["file"], "components": [[0, 0, "a"]]}, [[-1]]),
+            ({"types": ["file"], "components": [[0, 0, "a"]]}, [["0"]]),
+        ]:
+            with self.assertRaises(ValueError, msg=(table, paths)):
+                test_path_table.decode(table, paths)
+
+
+@skipUnless(os.getenv("SMART_TESTS_BENCHMARK"), "set SMART_TESTS_BENCHMARK=1 to run benchmarks")
+class TestPathTableBenchmark(TestCase):
+    """
+    Size and encode time of the compact encoding, against the plain list of test paths.
+
+        $ SMART_TESTS_BENCHMARK=1 python -m unittest tests.utils.test_test_path_table
+    """
+
+    def test_java(self):
+        test_paths = java_tests(300000)
+
+        # the payload is sent gzipped, so that's a part of the cost
+        start = time.perf_counter()
+        plain = json.dumps(test_paths).encode()
+        plain_gzipped = gzip.compress(plain)
+        plain_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compact = json.dumps(test_path_table.encode(test_paths)).encode()
+        compact_gzipped = gzip.compress(compact)
+        compact_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table, paths = json.loads(compact)
+        test_path_table.decode(table, paths)
+        decode_time = time.perf_counter() - start
+
+        def mb(b: bytes) -> str:
+            return f"{len(b) / 1024 / 1024:.1f} MB"
+
+        print(f"\nplain: {mb(plain)}, {mb(plain_gzipped)} gzipped in {plain_time:.2f}s"
+              f"\ncompact: {mb(compact)}, {mb(compact_gzipped)} gzipped in {compact_time:.2f}s, "
+              f"decoded in {decode_time:.2f}s")
+        self.assertLess(len(compact), len(plain))
@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from smart_tests.utils import tests_mapping
+
+MAPPING = {
+    "format": "prioritized-tests-v1",
+    "mappings": {
+        "main": {
+            "src/payment": ["file=test/payment_test.py", "file=test/new_payment_test.py"],
+            "src/payment/refund/": ["file=test/refund_test.py"],
+            "src/pay": ["file=test/pay_test.py"],
+            "./docs": ["file=test/docs_test.py"],
+            ".": ["file=test/smoke_test.py"],
+        },
+        "lib": {
+            "src/payment": ["file=lib/test/payment_test.py"],
+        },
+    },
+}
+
+
+class TestsMappingTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, "cache")
+        self.mapping_file = os.path.join(self.dir, "mapping.json")
+        with open(self.mapping_file, "w") as f:
+            json.dump(MAPPING, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def prune(self, *changed_files: str, cache: bool = False):
+        with open(self.mapping_file) as f:
+            return tests_mapping.prune(f, changed_files, cache_dir=self.cache_dir if cache else None)
+
+    def test_prune(self):
+        self.assertEqual({"format": "prioritized-tests-v1", "mappings": {
+            "main": {
+                "src/payment": ["file=test/payment_test.py", "file=test/new_payment_test.py"],
+                ".": ["file=test/smoke_test.py"],
+            },
+            "lib": {"src/payment": ["file=lib/test/payment_test.py"]},
+        }}, self.prune("src/payment/api.py"))
+
+        # 'src/pay' isn't a parent of 'src/payment'
+        self.assertEqual({"main": {"src/payment", "src/payment/refund/", "."}, "lib": {"src/payment"}},
+                         {repo: set(m) for repo, m in self.prune("./src/payment/refund/a.py")["mappings"].items()})
+        self.assertEqual({"main": {"./docs", "."}}, {repo: set(m) for repo, m in self.prune("docs")["mappings"].items()})
+        self.assertEqual({"format": "prioritized-tests-v1", "mappings": {}}, self.prune())
+
+    def test_cache(self):
+        for changed in (["src/payment/api.py"], ["docs/index.md", "src/pay/x"], []):
+            expected = self.prune(*changed)
+            self.assertEqual(expected, self.prune(*changed, cache=True))
+            # served from the cache without parsing the mapping
+            with mock.patch.object(tests_mapping.json_stream, "entries", side_effect=AssertionError("parsed")):
+                self.assertEqual(expected, self.prune(*changed, cache=True))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        # a different mapping is a different cache
+        with open(self.mapping_file, "w") as f:
+            json.dump({"format": "prioritized-tests-v1", "mappings": {"main": {"src": ["file=a.py"]}}}, f)
+        self.assertEqual({"main": {"src": ["file=a.py"]}}, self.prune("src/a.py", cache=True)["mappings"])
+
+    def test_broken_cache(self):
+        expected = self.prune("src/payment/api.py")
+        self.prune(cache=True)
+        for f in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, f), "r+b") as w:
+                w.seek(-3, os.SEEK_END)
+                w.write(b"\xff\xff\xff")
+        self.assertEqual(expected, self.prune("src/payment/api.py", cache=True))
+
+    def test_not_a_file(self):
+        # e.g. a pipe, which can't be hashed ahead of reading it
+        f = io.StringIO(json.dumps(MAPPING))
+        self.assertEqual({"format": "prioritized-tests-v1", "mappings": {"main": {".": ["file=test/smoke_test.py"]}}},
+                         tests_mapping.prune(f, ["README.md"], cache_dir=self.cache_dir))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_unknown_format(self):
+        mapping = {"format": "prioritized-tests-v2", "mappings": {"main": {"src": {"tests": []}}}}
+        with open(self.mapping_file, "w") as f:
+            json.dump(mapping, f)
+        self.assertEqual(mapping, self.prune("src/a.py", cache=True))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+        # a pipe can't be read again
+        for m in (mapping, {"mappings": {"main": {"src": []}}, "format": "prioritized-tests-v2"}, {"mappings": {}}):
+            r, w = os.pipe()
+            with os.fdopen(w, "w") as f:
+                json.dump(m, f)
+            with os.fdopen(r) as f:
+                self.assertFalse(f.seekable())
+                self.assertEqual(m, tests_mapping.prune(f, ["src/a.py"]))
+
+    def test_repositories_share_directory_names(self):
+        # changed files don't tell which repository they're in
+        self.assertEqual({"main", "lib"}, set(self.prune("src/payment/api.py")["mappings"]))
+
+    def test_changed_files_since(self):
+        repo = os.path.join(self.dir, "repo")
+        os.makedirs(os.path.join(repo, "src"))
+
+        def git(*args: str):
+            subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args], cwd=repo,
+                           check=True, stdout=subprocess.DEVNULL)
+
+        Path(repo, "src", "a.py").write_text("a")
+        Path(repo, "README.md").write_text("")
+        git("init", "--quiet")
+        git("add", ".")
+        git("commit", "--quiet", "-m", "base")
+        Path(repo, "src", "a.py").write_text("changed")
+        Path(repo, "src", "new\nline.py").write_text("")
+        git("add", ".")
+        git("commit", "--quiet", "-m", "change")
+
+        cwd = os.getcwd()
+        os.chdir(os.path.join(repo, "src"))
+        try:
+            # relative to the root, wherever it's run
+            self.assertEqual(["src/a.py", "src/new\nline.py"], sorted(tests_mapping.changed_files_since("HEAD~1")))
+            with self.assertRaises(subprocess.CalledProcessError):
+                tests_mapping.changed_files_since("no-such-commit")
+        finally:
+            os.chdir(cwd)
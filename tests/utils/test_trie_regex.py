@@ -0,0 +1,51 @@
+import random
+import re
+from unittest import TestCase
+
+from smart_tests.utils import trie_regex
+
+
+class TrieRegexTest(TestCase):
+    def assert_matches_exactly(self, names, patterns):
+        compiled = [re.compile(p) for p in patterns]
+        for n in names:
+            self.assertTrue(any(p.search(n) for p in compiled), n)
+        # near misses: prefixes, extensions, and one character changed
+        misses = set()
+        for n in names:
+            misses.update({n[:-1], n + "x", "x" + n, n[:-1] + "?", n.upper(), n.lower()})
+        for m in misses - set(names):
+            self.assertFalse(any(p.search(m) for p in compiled), m)
+
+    def test_build(self):
+        self.assertEqual("^Test(FooBa(r|z)|Qux)$", trie_regex.build(["TestFooBar", "TestFooBaz", "TestQux"]))
+        # a name that's a prefix of others makes the rest optional
+        self.assertEqual("^Fo(o(Bar)?)?$", trie_regex.build(["Fo", "Foo", "FooBar"]))
+        self.assertEqual("^a$", trie_regex.build(["a", "a"]))
+        self.assertEqual("^\\*/Param\\.(Bar/\\*|Foo/\\*)$", trie_regex.build(["*/Param.Foo/*", "*/Param.Bar/*"]))
+
+    def test_same_names_as_listing_them(self):
+        rand = random.Random(0)
+        alphabet = "abAB._/*+?()[]|$^\\"
+        for _ in range(50):
+            names = list({"".join(rand.choice(alphabet) for _ in range(rand.randint(1, 8)))
+                          for _ in range(rand.randint(1, 60))})
+            self.assert_matches_exactly(names, [trie_regex.build(names)])
+            for max_size in (1, 10, 40):
+                self.assert_matches_exactly(names, trie_regex.build_chunks(names, max_size))
+                self.assert_matches_exactly(names, trie_regex.build_chunks(names, max_size, max_groups=2))
+
+    def test_build_chunks(self):
+        names = ["TestFoo%d" % i for i in range(100)] + ["TestBar%d" % i for i in range(100)]
+        self.assertEqual([trie_regex.build(names)], trie_regex.build_chunks(names, 10000))
+
+        for max_size, max_groups in ((40, None), (100, 3), (200, 1)):
+            chunks = trie_regex.build_chunks(names, max_size, max_groups)
+            self.assertGreater(len(chunks), 1)
+            for c in chunks:
+                self.assertLessEqual(len(c), max_size)
+                self.assertLessEqual(re.compile(c).groups, max_groups or 100)
+            self.assert_matches_exactly(names, chunks)
+
+        # a name that doesn't fit by itself gets a pattern of its own
+        self.assertEqual(["^a$", "^bbbbbbbbbb$", "^c$"], trie_regex.build_chunks(["a", "bbbbbbbbbb", "c"], 5))